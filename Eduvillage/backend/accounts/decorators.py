@@ -1,13 +1,26 @@
+from functools import wraps
+
 from django.shortcuts import redirect
 
-def student_required(view_func):
-    def wrapper(request, *args, **kwargs):
-        if request.user.profile.role != 'student':
-            return redirect('courses:home')
-        return view_func(request, *args, **kwargs)
-    return wrapper
+
+def role_required(*roles, redirect_to='courses:home'):
+    """Only let users whose request.role is one of `roles` through."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.role not in roles:
+                return redirect(redirect_to)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+student_required = role_required('student')
+teacher_required = role_required('teacher')
+
 
 def admin_required(view_func):
+    @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_staff:
             return redirect('courses:home')
@@ -11,5 +11,12 @@ class Profile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored role so signals can tell when it changes
+        instance._loaded_role = instance.__dict__.get('role')
+        return instance
+
     def __str__(self):
         return f"{self.user.username} - {self.role}"
@@ -0,0 +1,36 @@
+"""
+Role resolution.
+
+Profile.role is the one place a user's role is stored and edited;
+User.role is a read-only copy kept in step by accounts/signals.py.
+
+ProfileModelBackend loads the profile together with request.user, and
+RoleMiddleware exposes the result as request.role (resolved lazily,
+once per request), so views and the decorators in accounts/decorators.py
+check roles without querying. A role change is visible on the next
+request, since the profile is read again with the user.
+"""
+from django.utils.functional import SimpleLazyObject
+
+from .models import Profile
+
+
+def user_role(user):
+    """The user's Profile.role, or None (anonymous or no profile)"""
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.profile.role
+    except Profile.DoesNotExist:
+        return None
+
+
+class RoleMiddleware:
+    """Set request.role; must come after AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: user_role(request.user))
+        return self.get_response(request)
@@ -1,3 +1,4 @@
+from django.contrib.auth import get_user_model
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Profile
@@ -10,3 +11,15 @@ User = settings.AUTH_USER_MODEL
 def create_user_profile(sender, instance, created, **_kwargs):
     if created:
         Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Profile)
+def copy_role_to_user(sender, instance, raw=False, **_kwargs):
+    # User.role is a read-only copy of Profile.role (see accounts/roles.py)
+    if raw:
+        return
+    get_user_model().objects.filter(pk=instance.user_id).exclude(
+        role=instance.role
+    ).update(role=instance.role)
+    if Profile.user.is_cached(instance):
+        instance.user.role = instance.role
@@ -4,8 +4,9 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from .forms import LoginForm
-from .models import Profile
+from .roles import user_role
 from courses.models import Enrollment, Course, LessonCompletion, Lesson, Progress
+from courses.services import student_progress_summary
 
 User = get_user_model()
 
@@ -31,14 +32,13 @@ def role_login(request):
                     return redirect_to_dashboard(user)
                 
                 # For non-admin users, verify role matches user's profile
-                try:
-                    profile = Profile.objects.get(user=user)
-                    if profile.role != role:
-                        messages.error(request, "Invalid role for this user.")
-                        return redirect('accounts:role_login')
-                except Profile.DoesNotExist:
+                user_role_name = user_role(user)
+                if user_role_name is None:
                     messages.error(request, "User profile not found.")
                     return redirect('accounts:role_login')
+                if user_role_name != role:
+                    messages.error(request, "Invalid role for this user.")
+                    return redirect('accounts:role_login')
                 
                 login(request, user)
                 messages.success(request, f"Login successful! Welcome {username} 🎉")
@@ -92,7 +92,7 @@ def register(request):
             )
             
             # Update the profile created by signal with the role
-            profile = Profile.objects.get(user=user)
+            profile = user.profile
             profile.role = role
             profile.save()
             
@@ -110,17 +110,13 @@ def redirect_to_dashboard(user):
     if user.is_superuser:
         return redirect('admin:index')
     
-    try:
-        profile = Profile.objects.get(user=user)
-        
-        if profile.role == 'student':
-            return redirect('courses:student_dashboard')
-        elif profile.role == 'teacher':
-            return redirect('courses:teacher_dashboard')
-        elif profile.role == 'admin':
-            return redirect('admin:index')
-    except Profile.DoesNotExist:
-        return redirect('home')
+    role = user_role(user)
+    if role == 'student':
+        return redirect('courses:student_dashboard')
+    elif role == 'teacher':
+        return redirect('courses:teacher_dashboard')
+    elif role == 'admin':
+        return redirect('admin:index')
     
     return redirect('home')
 
@@ -136,60 +132,20 @@ def logout_view(request):
 def student_profile(request):
     user = request.user
 
-    # Verify student role
-    try:
-        profile = Profile.objects.get(user=user)
-        if profile.role != 'student':
-            return redirect('home')
-    except Profile.DoesNotExist:
+    # Verify student role (the profile was loaded with request.user)
+    if request.role != 'student':
         return redirect('home')
+    profile = user.profile
 
-    # Get enrollments
-    enrollments = Enrollment.objects.filter(user=user).select_related('course')
+    # Per-enrollment progress and certificates in one query
+    summary = student_progress_summary(user)
 
-    # Certificates
-    certificates = [
-        enrollment.certificate
-        for enrollment in enrollments
-        if hasattr(enrollment, 'certificate')
+    courses_in_progress = [
+        item for item in summary['courses'] if not item['is_completed']
+    ]
+    completed_courses = [
+        item for item in summary['courses'] if item['is_completed']
     ]
-
-    courses_in_progress = []
-    completed_courses = []
-
-    total_lessons_completed = 0
-
-    for enrollment in enrollments:
-        course = enrollment.course
-
-        total_lessons = Lesson.objects.filter(
-            course=course,
-            is_active=True
-        ).count()
-
-        completed = Progress.objects.filter(
-            enrollment=enrollment,
-            completed=True
-        ).count()
-
-        total_lessons_completed += completed
-
-        progress_percent = (
-            round((completed / total_lessons) * 100, 0)
-            if total_lessons > 0 else 0
-        )
-
-        progress_data = {
-            'course': course,
-            'completed': completed,
-            'total': total_lessons,
-            'progress_percent': progress_percent
-        }
-
-        if completed >= total_lessons and total_lessons > 0:
-            completed_courses.append(progress_data)
-        else:
-            courses_in_progress.append(progress_data)
 
     # Sort in-progress courses by progress
     courses_in_progress.sort(
@@ -202,10 +158,10 @@ def student_profile(request):
         'profile': profile,
         'courses_in_progress': courses_in_progress,
         'completed_courses': completed_courses,
-        'certificates': certificates,
-        'total_lessons_completed': total_lessons_completed,
-        'total_courses_enrolled': enrollments.count(),
-        'total_certificates': len(certificates),
+        'certificates': summary['certificates'],
+        'total_lessons_completed': summary['total_lessons_completed'],
+        'total_courses_enrolled': summary['total_courses_enrolled'],
+        'total_certificates': len(summary['certificates']),
     }
 
     return render(request, 'accounts/student_profile.html', context)
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Certificate ZIP archives requested from the admin dashboard.
+
+Building an archive renders every certificate that is not cached yet, which
+takes far longer than a web request may. start_archive() only records the
+certificate ids and queues the build on a single background thread per
+process, so concurrent requests queue instead of each starting a process
+pool. The build renders in that thread (bulk.write_archive with one
+worker) into ARCHIVE_DIR/<job>.zip.part and renames it to <job>.zip when
+done; the status page polls until then and streams the finished file.
+
+Whole cohorts are better rendered with `python manage.py
+generate_certificates`, which uses every core.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from . import bulk
+from .models import Certificate
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "certificates/archives"
+# Finished archives are deleted after a day
+ARCHIVE_MAX_AGE = 24 * 60 * 60
+# A build that has not written anything for this long died with its worker
+BUILD_STALE_AFTER = 60 * 60
+
+READY = "ready"
+BUILDING = "building"
+FAILED = "failed"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="certificate-archive",
+            )
+        return _executor
+
+
+def _path(job_id, suffix=".zip"):
+    return os.path.join(settings.MEDIA_ROOT, ARCHIVE_DIR, f"{job_id}{suffix}")
+
+
+def _is_job_id(job_id):
+    try:
+        return uuid.UUID(hex=job_id).hex == job_id
+    except ValueError:
+        return False
+
+
+def _delete_expired():
+    directory = os.path.join(settings.MEDIA_ROOT, ARCHIVE_DIR)
+    cutoff = time.time() - ARCHIVE_MAX_AGE
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def start_archive(certificates, base_url=None):
+    """Queue a ZIP of `certificates` (a queryset); returns the job id."""
+    job_id = uuid.uuid4().hex
+    os.makedirs(os.path.dirname(_path(job_id)), exist_ok=True)
+    _delete_expired()
+
+    certificate_ids = list(certificates.order_by("issued_at", "id").values_list("id", flat=True))
+    # Exists from now on, so the status page sees the queued job
+    open(_path(job_id, ".zip.part"), "wb").close()
+    _get_executor().submit(_build, job_id, certificate_ids, base_url)
+    return job_id
+
+
+def _build(job_id, certificate_ids, base_url):
+    part_path = _path(job_id, ".zip.part")
+    try:
+        result = bulk.write_archive(
+            Certificate.objects.filter(id__in=certificate_ids).order_by("issued_at", "id"),
+            part_path,
+            workers=1,
+            base_url=base_url,
+        )
+        os.replace(part_path, _path(job_id))
+        logger.info(
+            "Certificate archive %s: %d certificates in %.1fs",
+            job_id, result.count, result.seconds,
+        )
+    except Exception:
+        logger.exception("Building certificate archive %s failed", job_id)
+        open(_path(job_id, ".failed"), "wb").close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    finally:
+        # The build thread holds its own database connection
+        connection.close()
+
+
+def archive_status(job_id):
+    """(READY, path), (BUILDING, None), (FAILED, None) or (None, None) if unknown"""
+    if not _is_job_id(job_id):
+        return None, None
+    if os.path.exists(_path(job_id)):
+        return READY, _path(job_id)
+    try:
+        if time.time() - os.path.getmtime(_path(job_id, ".zip.part")) < BUILD_STALE_AFTER:
+            return BUILDING, None
+        return FAILED, None
+    except FileNotFoundError:
+        pass
+    if os.path.exists(_path(job_id, ".failed")):
+        return FAILED, None
+    return None, None
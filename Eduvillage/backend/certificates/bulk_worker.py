@@ -0,0 +1,40 @@
+"""
+Worker side of certificates/bulk.py.
+
+Worker processes are spawned from a clean interpreter and import this
+module before Django is set up, so it must not import models at module
+level; render_chunk() imports them once init_worker() has run.
+"""
+import os
+
+import django
+from django.utils.text import slugify
+
+from . import pdf_cache
+from .pdf import certificate_display_name
+
+
+def init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def archive_name(certificate):
+    name = slugify(certificate_display_name(certificate.enrollment)) or "student"
+    return f"certificate_{certificate.id}_{name}.pdf"
+
+
+def render_chunk(certificate_ids, base_url=None):
+    """Render certificates into the PDF cache; return (archive name, path) pairs."""
+    from .models import Certificate
+
+    certificates = (
+        Certificate.objects.select_related("enrollment__course", "enrollment__user")
+        .filter(id__in=certificate_ids)
+        .order_by("issued_at", "id")
+    )
+    return [
+        (archive_name(certificate),
+         pdf_cache.ensure_certificate_pdf(certificate, base_url=base_url))
+        for certificate in certificates
+    ]
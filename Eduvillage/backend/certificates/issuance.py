@@ -0,0 +1,77 @@
+"""
+Certificate issuance on course completion.
+
+Issuing a certificate is a single INSERT and happens in the completing
+request, so the student can be sent straight to it. Rendering the PDF is
+the slow part: issue_certificate() only schedules it, and once the
+transaction commits a small thread pool renders the PDF into the on-disk
+cache (certificates/pdf_cache.py) and warms the QR code of the HTML
+certificate page. By the time the student clicks download the PDF is
+usually a static file; if not, the download renders it as before.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+
+from .models import Certificate
+from .pdf import build_verify_url
+from .pdf_cache import ensure_certificate_pdf
+from .qr import qr_svg
+
+logger = logging.getLogger(__name__)
+
+PRERENDER_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=PRERENDER_WORKERS,
+                thread_name_prefix="certificate-prerender",
+            )
+        return _executor
+
+
+def issue_certificate(enrollment, base_url=None):
+    """
+    The enrollment's certificate, created if needed. A new certificate
+    is pre-rendered in the background once the transaction commits.
+    """
+    certificate, created = Certificate.objects.get_or_create(enrollment=enrollment)
+    if created:
+        schedule_prerender([certificate.id], base_url)
+    return certificate
+
+
+def schedule_prerender(certificate_ids, base_url=None):
+    """Pre-render these certificates in the background after commit."""
+    certificate_ids = list(certificate_ids)
+    if not certificate_ids:
+        return
+    transaction.on_commit(
+        lambda: _get_executor().submit(prerender, certificate_ids, base_url)
+    )
+
+
+def prerender(certificate_ids, base_url=None):
+    """Render the certificates' PDFs and QR codes into the caches."""
+    try:
+        certificates = Certificate.objects.select_related(
+            "enrollment__user", "enrollment__course"
+        ).filter(id__in=certificate_ids, revoked=False)
+        for certificate in certificates:
+            ensure_certificate_pdf(certificate, base_url=base_url)
+            qr_svg(build_verify_url(certificate, base_url=base_url))
+    except Exception:
+        # Nothing is lost: the download renders on demand instead
+        logger.exception("Pre-rendering certificates %s failed", certificate_ids)
+    finally:
+        # Worker threads hold their own database connection
+        connection.close()
@@ -0,0 +1,80 @@
+import time
+import tracemalloc
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from certificates.models import Certificate
+from certificates.pdf import CertificateTemplate, generate_certificate_pdf
+from courses.models import Course, Enrollment
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure certificate render time and allocations, rebuilding the '
+        'template for every render (cold) and reusing it (warm)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=50,
+            help='Certificates to render per mode (default 50)',
+        )
+
+    def _sample_certificate(self):
+        # Unsaved objects: the benchmark never touches the database
+        course = Course(title='Introduction to Distributed Systems and Cloud Computing')
+        enrollment = Enrollment(course=course, full_name='Sample Student')
+        return Certificate(
+            enrollment=enrollment,
+            verification_code=uuid.uuid4(),
+            issued_at=timezone.now(),
+        )
+
+    def _measure(self, certificate, count, cold):
+        def render():
+            template = CertificateTemplate() if cold else None
+            return generate_certificate_pdf(certificate, template=template)
+
+        # Warm-up render, so one-off imports and font loading are not counted
+        size = len(render().getvalue())
+
+        started = time.perf_counter()
+        for _ in range(count):
+            render()
+        elapsed = time.perf_counter() - started
+
+        peaks = []
+        tracemalloc.start()
+        try:
+            for _ in range(min(count, 10)):
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                render()
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - baseline)
+        finally:
+            tracemalloc.stop()
+
+        return elapsed / count, sum(peaks) / len(peaks), size
+
+    def handle(self, *args, **options):
+        count = max(options['count'], 1)
+        certificate = self._sample_certificate()
+
+        results = {}
+        for mode, cold in (('cold', True), ('warm', False)):
+            per_render, peak, size = self._measure(certificate, count, cold)
+            results[mode] = per_render
+            self.stdout.write(
+                f'{mode}: {per_render * 1000:.1f} ms/render, '
+                f'{peak / 1024:.0f} KiB peak allocated/render, '
+                f'{size / 1024:.1f} KiB PDF'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reusing the template saves {(results["cold"] - results["warm"]) * 1000:.1f} '
+            f'ms per certificate ({count} renders per mode)'
+        ))
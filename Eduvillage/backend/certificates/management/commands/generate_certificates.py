@@ -0,0 +1,68 @@
+import datetime
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from certificates import bulk
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Render certificates for a course, issue date range or id list into a ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP archive to write')
+        parser.add_argument('--course', type=int, help='Only certificates for this course id')
+        parser.add_argument('--from', dest='issued_from', type=_date,
+                            help='Issued on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='issued_to', type=_date,
+                            help='Issued on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--id', type=int, action='append', dest='ids',
+                            help='Only this certificate id (may be repeated)')
+        parser.add_argument('--include-revoked', action='store_true',
+                            help='Also render revoked certificates')
+        parser.add_argument('--workers', type=int,
+                            help='Worker processes (default: one per CPU core)')
+        parser.add_argument('--base-url',
+                            help='Site URL for the verification QR codes (default: the SITE_URL setting)')
+
+    def handle(self, *args, **options):
+        certificates = bulk.select_certificates(
+            course_id=options['course'],
+            issued_from=options['issued_from'],
+            issued_to=options['issued_to'],
+            ids=options['ids'],
+            include_revoked=options['include_revoked'],
+        )
+        total = certificates.count()
+        if not total:
+            raise CommandError('No certificates match the given filters')
+
+        output = os.path.abspath(options['output'])
+        workers = options['workers'] or os.cpu_count() or 1
+        self.stdout.write(f'Rendering {total} certificates with {workers} workers...')
+
+        # Write next to the destination and rename, so a failed run never
+        # leaves a truncated archive behind
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output), suffix='.zip.tmp')
+        os.close(fd)
+        try:
+            result = bulk.write_archive(
+                certificates, tmp_path, workers=workers, base_url=options['base_url']
+            )
+            os.replace(tmp_path, output)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {result.count} certificates to {output} '
+            f'({result.archive_bytes / (1024 * 1024):.1f} MiB) in {result.seconds:.1f}s '
+            f'- {result.per_second:.1f} certificates/s'
+        ))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from certificates import signing
+
+
+class Command(BaseCommand):
+    help = 'Print a new Ed25519 key for the CERTIFICATE_SIGNING_KEY environment variable'
+
+    def handle(self, *args, **options):
+        self.stdout.write(signing.generate_private_key())
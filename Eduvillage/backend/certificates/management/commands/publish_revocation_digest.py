@@ -0,0 +1,33 @@
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from certificates import signing
+from certificates.models import Certificate, DeletedCertificateCode
+
+
+class Command(BaseCommand):
+    help = 'Write the signed digest of revoked and deleted certificate codes for offline verifiers'
+
+    def handle(self, *args, **options):
+        if not signing.public_key():
+            self.stdout.write(self.style.WARNING(
+                'CERTIFICATE_SIGNING_KEY is not set; the digest will be unsigned'
+            ))
+
+        # Deleted certificates keep a validly signed QR code, so they are
+        # listed like revoked ones
+        revoked_codes = chain(
+            Certificate.objects.filter(revoked=True).values_list(
+                'verification_code', flat=True
+            ).iterator(),
+            DeletedCertificateCode.objects.values_list(
+                'verification_code', flat=True
+            ).iterator(),
+        )
+        path, digest = signing.publish_revocation_digest(revoked_codes)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Published {len(digest["revoked"])} revoked codes to {path}, '
+            f'served at {reverse("certificates:revocation_digest")}'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from certificates import revocation
+from certificates.models import Certificate
+
+
+class Command(BaseCommand):
+    help = 'Revoke (or reissue) every certificate of a course, or the given ids, in one statement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help='Every certificate for this course id')
+        parser.add_argument('--id', type=int, action='append', dest='ids',
+                            help='This certificate id (may be repeated)')
+        parser.add_argument('--reissue', action='store_true',
+                            help='Reissue instead of revoking')
+
+    def handle(self, *args, **options):
+        if not options['course'] and not options['ids']:
+            raise CommandError('Pass --course and/or --id')
+
+        certificates = Certificate.objects.all()
+        if options['course']:
+            certificates = certificates.filter(enrollment__course_id=options['course'])
+        if options['ids']:
+            certificates = certificates.filter(id__in=options['ids'])
+
+        changed = revocation.set_revoked(certificates, revoked=not options['reissue'])
+        action = 'Reissued' if options['reissue'] else 'Revoked'
+        self.stdout.write(self.style.SUCCESS(f'{action} {changed} certificates'))
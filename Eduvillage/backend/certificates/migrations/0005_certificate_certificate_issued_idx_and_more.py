@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0004_certificate_revoked'),
+        ('courses', '0017_enrollment_frontier'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['-issued_at', '-id'], name='certificate_issued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['revoked', '-issued_at', '-id'], name='certificate_revoked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['downloaded', '-issued_at', '-id'], name='certificate_downloaded_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0005_certificate_certificate_issued_idx_and_more'),
+        ('courses', '0018_enrollment_enrollment_enrolled_at_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='downloaded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='revoked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['downloaded_at'], name='certificate_downloaded_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['revoked_at'], name='certificate_revoked_at_idx'),
+        ),
+    ]
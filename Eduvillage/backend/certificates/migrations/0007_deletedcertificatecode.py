@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0006_certificate_downloaded_at_certificate_revoked_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedCertificateCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verification_code', models.UUIDField(unique=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
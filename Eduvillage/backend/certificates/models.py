@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from courses.models import Enrollment
 
 class Certificate(models.Model):
@@ -24,10 +25,55 @@ class Certificate(models.Model):
     downloaded = models.BooleanField(default=False)
     revoked = models.BooleanField(default=False)
 
+    # When the flags were last set, for the daily rollups (dashboard/rollups.py)
+    downloaded_at = models.DateTimeField(blank=True, null=True)
+    revoked_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Admin dashboard: newest first, optionally filtered by flag
+            models.Index(fields=["-issued_at", "-id"], name="certificate_issued_idx"),
+            models.Index(fields=["revoked", "-issued_at", "-id"], name="certificate_revoked_idx"),
+            models.Index(fields=["downloaded", "-issued_at", "-id"], name="certificate_downloaded_idx"),
+            # Rollup watermark scans
+            models.Index(fields=["downloaded_at"], name="certificate_downloaded_at_idx"),
+            models.Index(fields=["revoked_at"], name="certificate_revoked_at_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.verification_code:
             self.verification_code = f"CVN-{uuid.uuid4().hex[:10].upper()}"
+
+        # Keep revoked_at in step with the flag
+        if self.revoked and self.revoked_at is None:
+            self.revoked_at = timezone.now()
+        elif not self.revoked:
+            self.revoked_at = None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "revoked" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "revoked_at"}
+
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so signals can tell what changed
+        instance._loaded_revoked = instance.__dict__.get('revoked')
+        return instance
+
     def __str__(self):
         return f"Certificate - {self.enrollment.full_name}"
+
+
+class DeletedCertificateCode(models.Model):
+    """
+    Verification code of a deleted certificate. Its signed QR payload has
+    no expiry and still checks out offline, so the revocation digest keeps
+    listing the code (certificates/signing.py).
+    """
+    verification_code = models.UUIDField(unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Deleted certificate {self.verification_code}"
@@ -1,233 +1,312 @@
+from contextlib import contextmanager
+from functools import lru_cache
 from io import BytesIO
 import os
-import qrcode
+from xml.sax.saxutils import escape
+from reportlab import rl_config
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Paragraph
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.colors import HexColor
+from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 from django.conf import settings
+from . import signing
+from .qr import QUIET_ZONE, dark_runs, qr_rows
 
+# Bump whenever the certificate layout changes so cached PDFs are re-rendered
+TEMPLATE_VERSION = 4
 
-def draw_border_and_qr(canvas_obj, doc, qr_image_buffer):
-    """Draw professional certificate border and QR code in bottom right"""
-    canvas_obj.saveState()
-    width, height = landscape(A4)
-    margin = 22
-
-    # Main border with Civora brand colors
-    canvas_obj.setStrokeColor(HexColor("#1B9AAA"))
-    canvas_obj.setLineWidth(3)
-    canvas_obj.rect(
-        margin,
-        margin,
-        width - (2 * margin),
-        height - (2 * margin),
-    )
-    
-    # Inner accent border
-    canvas_obj.setStrokeColor(HexColor("#142C52"))
-    canvas_obj.setLineWidth(1)
-    canvas_obj.rect(
-        margin + 4,
-        margin + 4,
-        width - (2 * margin) - 8,
-        height - (2 * margin) - 8,
-    )
-
-    # Draw QR code in bottom right corner
-    if qr_image_buffer:
-        qr_img = Image(qr_image_buffer, width=1 * inch, height=1 * inch)
-        qr_img.drawOn(canvas_obj, width - margin - 1.2 * inch, margin + 0.3 * inch)
-    
-    canvas_obj.restoreState()
+PAGE_WIDTH, PAGE_HEIGHT = landscape(A4)
+BORDER_MARGIN = 22
+SIDE_MARGIN = 60
+TOP_MARGIN = 50
+FRAME_WIDTH = PAGE_WIDTH - 2 * SIDE_MARGIN
 
+STATIC_FORM = "certificateStatic"
+# Large enough for a signed payload (see signing.py) to scan reliably
+QR_SIZE = 1.4 * inch
 
-def generate_certificate_pdf(certificate, request=None):
-    """Generate professional Civora Nexus certificate PDF"""
-    
-    # Generate QR code first
-    if request:
-        host = request.get_host()
-        protocol = 'https' if request.is_secure() else 'http'
-        verify_url = f"{protocol}://{host}/certificates/verify/{certificate.verification_code}/"
-    else:
-        verify_url = f"http://127.0.0.1:8000/certificates/verify/{certificate.verification_code}/"
-    
-    qr = qrcode.make(verify_url)
-    qr_buffer = BytesIO()
-    qr.save(qr_buffer, format='PNG')
-    qr_buffer.seek(0)
-
-    buffer = BytesIO()
-
-    # Create a custom callback that includes the QR code
-    def draw_page(canvas_obj, doc):
-        draw_border_and_qr(canvas_obj, doc, qr_buffer)
-
-    pdf = SimpleDocTemplate(
-        buffer,
-        pagesize=landscape(A4),
-        rightMargin=60,
-        leftMargin=60,
-        topMargin=50,
-        bottomMargin=50,
-    )
 
-    styles = getSampleStyleSheet()
+@contextmanager
+def _binary_streams():
+    """
+    Write streams as binary instead of ASCII85 while rendering. Without the
+    optional C accelerator ReportLab ASCII85-encodes every image in pure
+    Python, which was most of the render time for the logo. useA85 is a
+    module global, so it is restored for other ReportLab users.
+    """
+    previous = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        rl_config.useA85 = previous
 
-    # Professional title style with Civora colors
-    title_style = ParagraphStyle(
-        "TitleStyle",
-        fontSize=44,
-        alignment=1,
-        textColor=HexColor("#1B9AAA"),
-        spaceAfter=4,
-        fontName="Helvetica-Bold",
-        leading=46,
-    )
-
-    subtitle_style = ParagraphStyle(
-        "SubTitleStyle",
-        fontSize=13,
-        alignment=1,
-        textColor=HexColor("#666666"),
-        spaceAfter=22,
-        fontName="Helvetica",
-        leading=15,
-    )
 
-    # Student name style
-    name_style = ParagraphStyle(
-        "NameStyle",
-        fontSize=36,
+def _style(name, size, color, leading, font="Helvetica", space_before=0, space_after=0):
+    return ParagraphStyle(
+        name,
+        fontSize=size,
         alignment=1,
-        textColor=HexColor("#1B9AAA"),
-        spaceAfter=10,
-        fontName="Helvetica-Bold",
-        leading=40,
+        textColor=HexColor(color),
+        spaceBefore=space_before,
+        spaceAfter=space_after,
+        fontName=font,
+        leading=leading,
     )
 
-    # Course name style
-    course_style = ParagraphStyle(
-        "CourseStyle",
-        fontSize=28,
-        alignment=1,
-        textColor=HexColor("#1F3C88"),
-        spaceAfter=16,
-        fontName="Helvetica-Bold",
-        leading=32,
-    )
 
-    # Body text style
-    body_style = ParagraphStyle(
-        "BodyStyle",
-        fontSize=12,
-        alignment=1,
-        textColor=HexColor("#444444"),
-        spaceAfter=8,
-        fontName="Helvetica",
-        leading=14,
-    )
+# Professional styles with Civora colors, shared by every render
+TITLE_STYLE = _style("TitleStyle", 44, "#1B9AAA", 46, "Helvetica-Bold", space_after=4)
+SUBTITLE_STYLE = _style("SubTitleStyle", 13, "#666666", 15, space_after=22)
+NAME_STYLE = _style("NameStyle", 36, "#1B9AAA", 40, "Helvetica-Bold", space_after=10)
+COURSE_STYLE = _style("CourseStyle", 28, "#1F3C88", 32, "Helvetica-Bold", space_after=16)
+BODY_STYLE = _style("BodyStyle", 12, "#444444", 14, space_after=8)
+FOOTER_STYLE = _style("FooterStyle", 10, "#888888", 11, space_before=10, space_after=6)
 
-    # Footer/ID style
-    footer_style = ParagraphStyle(
-        "FooterStyle",
-        fontSize=10,
-        alignment=1,
-        textColor=HexColor("#888888"),
-        spaceBefore=10,
-        spaceAfter=6,
-        fontName="Helvetica",
-        leading=11,
-    )
+# Room reserved for the per-certificate text; longer text is shrunk to fit
+NAME_LINES = 1
+COURSE_LINES = 2
 
-    elements = []
 
-    # 🔷 LOGO
-    logo_path = os.path.join(
+def _static_image(filename):
+    """Decoded image from certificates/static/certificates, or None"""
+    path = os.path.join(
         settings.BASE_DIR,
         "certificates",
         "static",
         "certificates",
-        "civora_logo.png",
+        filename,
     )
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=2.8 * inch, height=1 * inch)
-        logo.hAlign = "CENTER"
-        elements.append(logo)
-        elements.append(Spacer(1, 12))
-    else:
-        elements.append(Spacer(1, 8))
+    if not os.path.exists(path):
+        return None
+    return ImageReader(path)
 
-    # 🔷 TITLE
-    elements.append(Paragraph("Certificate of Completion", title_style))
 
-    # 🔷 SUBTITLE
-    elements.append(Paragraph("This is proudly presented to", subtitle_style))
-
-    # 🔷 STUDENT NAME
-    enrollment = certificate.enrollment
-    display_name = (
-        enrollment.full_name.strip()
-        if enrollment.full_name
-        else enrollment.user.get_username()
-    )
-    elements.append(Paragraph(display_name, name_style))
-
-    # 🔷 COURSE TEXT
-    elements.append(Paragraph("For successfully completing the course", body_style))
-    
-    # 🔷 COURSE NAME
-    elements.append(
-        Paragraph(
-            certificate.enrollment.course.title,
-            course_style,
+def _fit_paragraph(text, style, max_lines):
+    """Paragraph for `text`, shrinking the font until it fits `max_lines`"""
+    size = style.fontSize
+    while True:
+        fitted = style if size == style.fontSize else ParagraphStyle(
+            f"{style.name}-{size}",
+            parent=style,
+            fontSize=size,
+            leading=size * style.leading / style.fontSize,
         )
-    )
+        paragraph = Paragraph(escape(text), fitted)
+        _, height = paragraph.wrap(FRAME_WIDTH, PAGE_HEIGHT)
+        if height <= style.leading * max_lines + 0.01 or size <= 8:
+            return paragraph, height
+        size -= 2
+
+
+class CertificateTemplate:
+    """
+    Certificate layout, built once per process.
+
+    Styles, decoded images, the wrapped fixed copy and every position on
+    the page are computed here. Each render draws that static layer into a
+    form XObject and only lays out the student name, course title,
+    certificate id and QR code on top of it.
+    """
+
+    def __init__(self):
+        self.logo = _static_image("civora_logo.png")
+        self.signature = _static_image("signature.png")
+        self.static_items = []
+        self.slots = {}
+        self._layout()
 
-    # 🔷 ISSUER TEXT
-    elements.append(Spacer(1, 6))
-    elements.append(
-        Paragraph(
+    def _paragraph(self, text, style):
+        paragraph = Paragraph(text, style)
+        _, height = paragraph.wrap(FRAME_WIDTH, PAGE_HEIGHT)
+        return paragraph, height
+
+    def _layout(self):
+        """Walk down the page once, placing fixed copy and reserving slots"""
+        y = PAGE_HEIGHT - TOP_MARGIN
+
+        def place_static(text, style, space_before=0):
+            nonlocal y
+            paragraph, height = self._paragraph(text, style)
+            y -= space_before + style.spaceBefore + height
+            self.static_items.append(("paragraph", paragraph, y))
+            y -= style.spaceAfter
+
+        def reserve(key, style, lines, space_before=0):
+            nonlocal y
+            top = y - space_before - style.spaceBefore
+            height = style.leading * lines
+            self.slots[key] = (top, height)
+            y = top - height - style.spaceAfter
+
+        # 🔷 LOGO
+        if self.logo:
+            y -= 1 * inch
+            self.static_items.append(("logo", None, y))
+            y -= 12
+        else:
+            y -= 8
+
+        # 🔷 TITLE / SUBTITLE
+        place_static("Certificate of Completion", TITLE_STYLE)
+        place_static("This is proudly presented to", SUBTITLE_STYLE)
+
+        # 🔷 STUDENT NAME
+        reserve("name", NAME_STYLE, NAME_LINES)
+
+        # 🔷 COURSE NAME
+        place_static("For successfully completing the course", BODY_STYLE)
+        reserve("course", COURSE_STYLE, COURSE_LINES)
+
+        # 🔷 ISSUER TEXT
+        place_static(
             "Issued by <b>Civora Nexus</b> — empowering future developers.",
-            body_style,
+            BODY_STYLE,
+            space_before=6,
         )
-    )
 
-    # 🔷 CERTIFICATE ID
-    elements.append(Spacer(1, 12))
-    elements.append(
-        Paragraph(
-            f"Certificate ID: {certificate.verification_code}",
-            footer_style,
-        )
-    )
+        # 🔷 CERTIFICATE ID
+        reserve("certificate_id", FOOTER_STYLE, 1, space_before=12)
 
-    # 🔷 SIGNATURE SECTION
-    elements.append(Spacer(1, 18))
-    
-    signature_path = os.path.join(
-        settings.BASE_DIR,
-        "certificates",
-        "static",
-        "certificates",
-        "signature.png",
-    )
-    if os.path.exists(signature_path):
-        signature = Image(signature_path, width=1.6 * inch, height=0.6 * inch)
-        signature.hAlign = "CENTER"
-        elements.append(signature)
-    
-    elements.append(Spacer(1, 4))
-    elements.append(
-        Paragraph(
+        # 🔷 SIGNATURE SECTION
+        y -= 18
+        if self.signature:
+            y -= 0.6 * inch
+            self.static_items.append(("signature", None, y))
+        place_static(
             "Authorized Signatory<br/><b>CEO, Civora Nexus</b>",
-            footer_style,
+            FOOTER_STYLE,
+            space_before=4,
+        )
+
+    def draw_static(self, canvas_obj):
+        """Borders, logo, signature and fixed copy"""
+        canvas_obj.saveState()
+
+        # Main border with Civora brand colors
+        canvas_obj.setStrokeColor(HexColor("#1B9AAA"))
+        canvas_obj.setLineWidth(3)
+        canvas_obj.rect(
+            BORDER_MARGIN,
+            BORDER_MARGIN,
+            PAGE_WIDTH - (2 * BORDER_MARGIN),
+            PAGE_HEIGHT - (2 * BORDER_MARGIN),
+        )
+
+        # Inner accent border
+        canvas_obj.setStrokeColor(HexColor("#142C52"))
+        canvas_obj.setLineWidth(1)
+        canvas_obj.rect(
+            BORDER_MARGIN + 4,
+            BORDER_MARGIN + 4,
+            PAGE_WIDTH - (2 * BORDER_MARGIN) - 8,
+            PAGE_HEIGHT - (2 * BORDER_MARGIN) - 8,
         )
+        canvas_obj.restoreState()
+
+        for kind, paragraph, y in self.static_items:
+            if kind == "paragraph":
+                paragraph.drawOn(canvas_obj, SIDE_MARGIN, y)
+            elif kind == "logo":
+                width = 2.8 * inch
+                canvas_obj.drawImage(
+                    self.logo, (PAGE_WIDTH - width) / 2, y, width, 1 * inch
+                )
+            elif kind == "signature":
+                width = 1.6 * inch
+                canvas_obj.drawImage(
+                    self.signature, (PAGE_WIDTH - width) / 2, y, width, 0.6 * inch,
+                    mask="auto",
+                )
+
+    def draw_text(self, canvas_obj, key, text, style, max_lines):
+        """Draw per-certificate text centred in its reserved slot"""
+        top, height = self.slots[key]
+        paragraph, text_height = _fit_paragraph(text, style, max_lines)
+        paragraph.drawOn(canvas_obj, SIDE_MARGIN, top - (height + text_height) / 2)
+
+    def draw_qr(self, canvas_obj, rows):
+        """QR code in the bottom right corner, drawn as vector rectangles"""
+        module = QR_SIZE / (len(rows) + 2 * QUIET_ZONE)
+        left = PAGE_WIDTH - BORDER_MARGIN - QR_SIZE - 0.2 * inch + QUIET_ZONE * module
+        top = BORDER_MARGIN + 0.3 * inch + QR_SIZE - QUIET_ZONE * module
+
+        canvas_obj.saveState()
+        canvas_obj.setFillColor(HexColor("#000000"))
+        path = canvas_obj.beginPath()
+        for x, y, width in dark_runs(rows):
+            path.rect(left + x * module, top - (y + 1) * module, width * module, module)
+        canvas_obj.drawPath(path, stroke=0, fill=1)
+        canvas_obj.restoreState()
+
+    def render(self, display_name, course_title, certificate_id, rows):
+        buffer = BytesIO()
+        with _binary_streams():
+            canvas_obj = canvas.Canvas(buffer, pagesize=(PAGE_WIDTH, PAGE_HEIGHT))
+
+            canvas_obj.beginForm(STATIC_FORM)
+            self.draw_static(canvas_obj)
+            canvas_obj.endForm()
+            canvas_obj.doForm(STATIC_FORM)
+
+            self.draw_text(canvas_obj, "name", display_name, NAME_STYLE, NAME_LINES)
+            self.draw_text(canvas_obj, "course", course_title, COURSE_STYLE, COURSE_LINES)
+            self.draw_text(
+                canvas_obj,
+                "certificate_id",
+                f"Certificate ID: {certificate_id}",
+                FOOTER_STYLE,
+                1,
+            )
+            self.draw_qr(canvas_obj, rows)
+
+            canvas_obj.showPage()
+            canvas_obj.save()
+        buffer.seek(0)
+        return buffer
+
+
+@lru_cache(maxsize=1)
+def get_certificate_template():
+    """The process-wide CertificateTemplate"""
+    return CertificateTemplate()
+
+
+def build_verify_url(certificate, base_url=None):
+    """
+    Public verification URL printed in the certificate's QR code, on
+    settings.SITE_URL or on `base_url` when given. Never on the request's
+    Host header: the URL is part of the PDF and QR cache keys, so any
+    client could otherwise fill the caches by varying the Host.
+    """
+    base_url = (base_url or settings.SITE_URL).rstrip("/")
+    return f"{base_url}/certificates/verify/{certificate.verification_code}/"
+
+
+def certificate_display_name(enrollment):
+    """Name printed on the certificate"""
+    return (
+        enrollment.full_name.strip()
+        if enrollment.full_name
+        else enrollment.user.get_username()
     )
 
-    pdf.build(elements, onFirstPage=draw_page)
-    buffer.seek(0)
-    return buffer
+
+def generate_certificate_pdf(certificate, template=None, base_url=None):
+    """Generate professional Civora Nexus certificate PDF"""
+    template = template or get_certificate_template()
+
+    verify_url = build_verify_url(certificate, base_url)
+
+    enrollment = certificate.enrollment
+    display_name = certificate_display_name(enrollment)
+    return template.render(
+        display_name,
+        enrollment.course.title,
+        certificate.verification_code,
+        # Verification link, plus a signed payload when signing is enabled
+        qr_rows(signing.qr_content(verify_url, certificate, display_name)),
+    )
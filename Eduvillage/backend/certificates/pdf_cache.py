@@ -0,0 +1,105 @@
+"""
+On-disk cache of rendered certificate PDFs.
+
+Rendering a certificate (styles, logo and signature decode, QR encode)
+costs tens of milliseconds of CPU, and downloads spike at course
+deadlines. Rendered PDFs are stored under MEDIA_ROOT/certificates/pdf/,
+one directory per certificate, with file names derived from a hash of
+everything printed on the page:
+
+    certificate id, display name, course title, verification code,
+    verification URL, QR signing key and TEMPLATE_VERSION
+
+so a changed name or title simply hashes to a new file. invalidate()
+removes a certificate's directory and is called on revoke / reissue and
+when the enrollment name changes (see certificates/signals.py).
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+
+from . import signing
+from .pdf import (
+    TEMPLATE_VERSION,
+    build_verify_url,
+    certificate_display_name,
+    generate_certificate_pdf,
+)
+
+CACHE_DIR = "certificates/pdf"
+
+
+def certificate_dir(certificate_id):
+    return os.path.join(settings.MEDIA_ROOT, CACHE_DIR, str(certificate_id))
+
+
+def cache_path(certificate, base_url=None):
+    """Where the PDF for the certificate's current content is stored"""
+    enrollment = certificate.enrollment
+    key = "\n".join([
+        str(certificate.id),
+        certificate_display_name(enrollment),
+        enrollment.course.title,
+        str(certificate.verification_code),
+        build_verify_url(certificate, base_url),
+        signing.public_key() or "",
+        str(TEMPLATE_VERSION),
+    ])
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(certificate_dir(certificate.id), f"{digest}.pdf")
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary file and rename it into place, so concurrent
+    # downloads never see a half-written PDF
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_certificate_pdf(certificate, base_url=None):
+    """
+    Return an open binary file with the certificate's PDF, rendering and
+    storing it first on a cache miss.
+    """
+    path = cache_path(certificate, base_url)
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        pass
+
+    data = generate_certificate_pdf(certificate, base_url=base_url).getvalue()
+    try:
+        _write(path, data)
+        return open(path, "rb")
+    except OSError:
+        # Read-only or full disk: still serve the freshly rendered PDF
+        return BytesIO(data)
+
+
+def ensure_certificate_pdf(certificate, base_url=None):
+    """Render the certificate into the cache if needed; return its path."""
+    path = cache_path(certificate, base_url)
+    if not os.path.exists(path):
+        data = generate_certificate_pdf(certificate, base_url=base_url).getvalue()
+        _write(path, data)
+    return path
+
+
+def invalidate(*certificate_ids):
+    """Delete every cached PDF of the given certificates."""
+    for certificate_id in certificate_ids:
+        shutil.rmtree(certificate_dir(certificate_id), ignore_errors=True)
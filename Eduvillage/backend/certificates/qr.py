@@ -0,0 +1,133 @@
+"""
+Memoized QR codes for certificate verification URLs.
+
+Encoding a URL into a QR matrix is the expensive part, and the same
+verification URL is encoded on every certificate page view and PDF
+render. The matrix is cached per process (LRU) in front of the shared
+Django cache, keyed by the URL. From the matrix:
+
+* qr_svg() builds a compact SVG path without touching PIL, used for the
+  HTML certificate page
+* qr_png() renders a PNG through PIL (imported only when used), for
+  callers that need a bitmap
+* certificates/pdf.py draws the modules as vector rectangles
+"""
+import base64
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+from urllib.parse import quote
+
+import qrcode
+from django.core.cache import cache
+
+# Modules of white space around the code, as the QR spec recommends
+QUIET_ZONE = 4
+
+LRU_SIZE = 1024
+CACHE_TIMEOUT = 30 * 24 * 60 * 60
+# Bump if the encoding parameters change
+CACHE_VERSION = 1
+
+
+def _cache_key(kind, url):
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return f"certificates:qr:{CACHE_VERSION}:{kind}:{digest}"
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def qr_rows(url):
+    """
+    The QR matrix for `url` as a tuple of strings of "0"/"1", one per row,
+    without the quiet zone.
+    """
+    key = _cache_key("rows", url)
+    rows = cache.get(key)
+    if rows is None:
+        qr = qrcode.QRCode(
+            error_correction=qrcode.constants.ERROR_CORRECT_M,
+            border=0,
+        )
+        qr.add_data(url)
+        qr.make(fit=True)
+        rows = tuple(
+            "".join("1" if module else "0" for module in row)
+            for row in qr.get_matrix()
+        )
+        cache.set(key, rows, CACHE_TIMEOUT)
+    return tuple(rows)
+
+
+def dark_runs(rows):
+    """Yield (x, y, width) for every horizontal run of dark modules."""
+    for y, row in enumerate(rows):
+        x = 0
+        while x < len(row):
+            if row[x] == "1":
+                start = x
+                while x < len(row) and row[x] == "1":
+                    x += 1
+                yield start, y, x - start
+            else:
+                x += 1
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def qr_svg(url):
+    """Standalone SVG document for `url`; scales to any size."""
+    key = _cache_key("svg", url)
+    svg = cache.get(key)
+    if svg is None:
+        rows = qr_rows(url)
+        size = len(rows) + 2 * QUIET_ZONE
+
+        # One stroked horizontal line per run of dark modules, with moves
+        # relative to the end of the previous run: about 6 bytes per run
+        commands = []
+        row_y = None
+        for x, y, width in dark_runs(rows):
+            if y != row_y:
+                commands.append(f"M{QUIET_ZONE + x} {QUIET_ZONE + y + 0.5}h{width}")
+                row_y = y
+            else:
+                commands.append(f"m{x - end} 0h{width}")
+            end = x + width
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+            f'shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/>'
+            f'<path d="{"".join(commands)}" stroke="#000"/></svg>'
+        )
+        cache.set(key, svg, CACHE_TIMEOUT)
+    return svg
+
+
+def qr_png(url, box_size=10):
+    """PNG bytes for `url`"""
+    key = _cache_key(f"png{box_size}", url)
+    png = cache.get(key)
+    if png is None:
+        from PIL import Image
+
+        rows = qr_rows(url)
+        size = len(rows) + 2 * QUIET_ZONE
+        image = Image.new("1", (size, size), 1)
+        for x, y, width in dark_runs(rows):
+            left, top = x + QUIET_ZONE, y + QUIET_ZONE
+            image.paste(0, (left, top, left + width, top + 1))
+        image = image.resize((size * box_size, size * box_size), Image.NEAREST)
+
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        png = buffer.getvalue()
+        cache.set(key, png, CACHE_TIMEOUT)
+    return png
+
+
+def qr_data_uri(url, image_format="svg"):
+    """data: URI for an <img> tag, as SVG (default) or PNG"""
+    if image_format == "svg":
+        # SVG is plain text: percent-encoding is smaller than base64
+        return "data:image/svg+xml," + quote(qr_svg(url), safe=" =/:")
+    encoded = base64.b64encode(qr_png(url)).decode()
+    return f"data:image/png;base64,{encoded}"
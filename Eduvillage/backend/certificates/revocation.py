@@ -0,0 +1,56 @@
+"""
+Revoking and reissuing certificates in bulk.
+
+set_revoked() flips the flag on any number of certificates with a single
+UPDATE ... WHERE id IN (...) inside a transaction. QuerySet.update() does
+not send post_save, so what certificates/signals.py would normally do is
+done here: once the change commits, the changed codes' cached
+verification answers are invalidated and their cached PDFs deleted.
+"""
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import pdf_cache, verification
+from .models import Certificate
+
+
+def set_revoked(certificates, revoked=True):
+    """
+    Revoke (or, with revoked=False, reissue) the given certificates: a
+    queryset or an iterable of ids. Certificates already in that state
+    are left alone. Returns the number of certificates changed.
+    """
+    if not isinstance(certificates, QuerySet):
+        certificates = Certificate.objects.filter(id__in=list(certificates))
+
+    with transaction.atomic():
+        # Lock the rows so a concurrent call cannot flip them in between
+        rows = list(
+            certificates.exclude(revoked=revoked)
+            .select_for_update(of=("self",))
+            .order_by()
+            .values_list("id", "verification_code")
+        )
+        if not rows:
+            return 0
+        changed = [certificate_id for certificate_id, _ in rows]
+
+        Certificate.objects.filter(id__in=changed).update(
+            revoked=revoked,
+            revoked_at=timezone.now() if revoked else None,
+        )
+
+        verification.invalidate(*(code for _, code in rows))
+        transaction.on_commit(lambda: pdf_cache.invalidate(*changed))
+
+    return len(changed)
+
+
+def revoke(certificates):
+    return set_revoked(certificates, revoked=True)
+
+
+def reissue(certificates):
+    return set_revoked(certificates, revoked=False)
+
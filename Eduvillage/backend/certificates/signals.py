@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from courses.models import Enrollment
+from . import pdf_cache, verification
+from .models import Certificate, DeletedCertificateCode
+
+
+@receiver(post_save, sender=Certificate)
+def invalidate_revoked_pdf(sender, instance, created, **_kwargs):
+    if created:
+        # Forget an earlier "invalid" answer for this code
+        verification.invalidate(instance.verification_code)
+    elif getattr(instance, '_loaded_revoked', instance.revoked) != instance.revoked:
+        # Revoke / reissue: drop the rendered PDF and the cached status
+        pdf_cache.invalidate(instance.id)
+        verification.invalidate(instance.verification_code)
+    instance._loaded_revoked = instance.revoked
+
+
+@receiver(post_delete, sender=Certificate)
+def delete_cached_pdf(sender, instance, **_kwargs):
+    pdf_cache.invalidate(instance.id)
+    verification.invalidate(instance.verification_code)
+
+
+@receiver(post_delete, sender=Certificate)
+def tombstone_verification_code(sender, instance, **_kwargs):
+    # Offline verifiers learn about deleted certificates from the digest
+    DeletedCertificateCode.objects.get_or_create(
+        verification_code=instance.verification_code
+    )
+
+
+@receiver(post_save, sender=Enrollment)
+def invalidate_renamed_pdf(sender, instance, created, **_kwargs):
+    previous_name = getattr(instance, '_loaded_full_name', instance.full_name)
+    if not created and previous_name != instance.full_name:
+        certificates = list(
+            Certificate.objects.filter(enrollment=instance)
+            .values_list('id', 'verification_code')
+        )
+        if certificates:
+            pdf_cache.invalidate(*(certificate_id for certificate_id, _ in certificates))
+            verification.invalidate(*(code for _, code in certificates))
+    instance._loaded_full_name = instance.full_name
@@ -0,0 +1,208 @@
+"""
+Offline-verifiable certificates.
+
+When CERTIFICATE_SIGNING_KEY is set, the QR code on each certificate
+carries a signed payload after the verification URL:
+
+    https://<site>/certificates/verify/<code>/#cert=<payload>.<signature>
+
+The payload is compact JSON (code, student name, course, issue date)
+signed with Ed25519, both base64url encoded. The fragment never reaches
+our server, so people scanning the code still land on the normal
+verification page, while verifiers with the public key can check it
+without contacting us.
+
+Revocations are published by `python manage.py publish_revocation_digest`
+as a signed JSON file: a sorted list of truncated SHA-256 hashes of the
+verification codes of revoked and deleted certificates. Deleted ones are
+listed too because signed payloads carry no expiry. Verifiers download it
+from /certificates/verify/revocations.json (certificates.views.revocation_digest).
+The file lives under MEDIA_ROOT (REVOCATION_DIGEST_PATH) but is always
+served through that view, since media files are not served in production.
+Run the command periodically (e.g. every few minutes from cron);
+verify_token() shows how a verifier combines the two.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import (
+    Ed25519PrivateKey,
+    Ed25519PublicKey,
+)
+from django.conf import settings
+from django.utils import timezone
+
+PAYLOAD_VERSION = 1
+FRAGMENT_PREFIX = "#cert="
+
+REVOCATION_DIGEST_PATH = "certificates/revocations.json"
+# Bytes of SHA-256 kept per revoked code; 8 bytes make collisions with a
+# valid code vanishingly unlikely while keeping the file small
+REVOCATION_HASH_BYTES = 8
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def generate_private_key():
+    """A new private key in the CERTIFICATE_SIGNING_KEY format"""
+    raw = Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.Raw,
+        serialization.PrivateFormat.Raw,
+        serialization.NoEncryption(),
+    )
+    return _b64encode(raw)
+
+
+@lru_cache(maxsize=4)
+def _load_private_key(encoded):
+    return Ed25519PrivateKey.from_private_bytes(_b64decode(encoded))
+
+
+def _private_key():
+    if not settings.CERTIFICATE_SIGNING_KEY:
+        return None
+    return _load_private_key(settings.CERTIFICATE_SIGNING_KEY)
+
+
+def public_key():
+    """The base64url raw public key verifiers need, or None"""
+    private_key = _private_key()
+    if private_key is None:
+        return None
+    return _b64encode(private_key.public_key().public_bytes(
+        serialization.Encoding.Raw,
+        serialization.PublicFormat.Raw,
+    ))
+
+
+def _sign(private_key, data):
+    return _b64encode(private_key.sign(data))
+
+
+def _canonical(data):
+    return json.dumps(
+        data, separators=(",", ":"), sort_keys=True, ensure_ascii=False
+    ).encode("utf-8")
+
+
+def certificate_payload(certificate, display_name):
+    return {
+        "v": PAYLOAD_VERSION,
+        "c": str(certificate.verification_code),
+        "n": display_name,
+        "t": certificate.enrollment.course.title,
+        "d": timezone.localdate(certificate.issued_at).isoformat(),
+    }
+
+
+def sign_certificate(certificate, display_name):
+    """Signed token for the certificate, or None when signing is disabled"""
+    private_key = _private_key()
+    if private_key is None:
+        return None
+    payload = _b64encode(_canonical(certificate_payload(certificate, display_name)))
+    return f"{payload}.{_sign(private_key, payload.encode('ascii'))}"
+
+
+def qr_content(verify_url, certificate, display_name):
+    """What the certificate's QR code encodes"""
+    token = sign_certificate(certificate, display_name)
+    if token is None:
+        return verify_url
+    return f"{verify_url}{FRAGMENT_PREFIX}{token}"
+
+
+def revocation_hash(code):
+    digest = hashlib.sha256(str(code).encode("utf-8")).digest()
+    return digest[:REVOCATION_HASH_BYTES].hex()
+
+
+def build_revocation_digest(revoked_codes):
+    """Signed revocation digest for the given revoked verification codes"""
+    digest = {
+        "version": PAYLOAD_VERSION,
+        "generated_at": timezone.now().replace(microsecond=0).isoformat(),
+        "hash": f"sha256/{REVOCATION_HASH_BYTES}",
+        "public_key": public_key(),
+        "revoked": sorted({revocation_hash(code) for code in revoked_codes}),
+    }
+    private_key = _private_key()
+    if private_key is not None:
+        digest["signature"] = _sign(private_key, _canonical(digest))
+    return digest
+
+
+def revocation_digest_path():
+    return os.path.join(settings.MEDIA_ROOT, REVOCATION_DIGEST_PATH)
+
+
+def publish_revocation_digest(revoked_codes):
+    """Write the digest atomically; return (path, digest)."""
+    digest = build_revocation_digest(revoked_codes)
+    path = revocation_digest_path()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    # A unique temporary file in the same directory, so concurrent runs
+    # never write into each other's file and os.replace stays atomic
+    digest_file = tempfile.NamedTemporaryFile(
+        dir=directory, prefix=".revocations-", suffix=".tmp", delete=False
+    )
+    try:
+        with digest_file:
+            digest_file.write(_canonical(digest))
+        # Created 0600; the web server may run as another user than cron
+        os.chmod(digest_file.name, 0o644)
+        os.replace(digest_file.name, path)
+    except BaseException:
+        os.remove(digest_file.name)
+        raise
+    return path, digest
+
+
+def verify_digest(digest, public_key_b64):
+    """True if the revocation digest was signed with our key"""
+    unsigned = {key: value for key, value in digest.items() if key != "signature"}
+    try:
+        Ed25519PublicKey.from_public_bytes(_b64decode(public_key_b64)).verify(
+            _b64decode(digest.get("signature", "")), _canonical(unsigned)
+        )
+    except (ValueError, InvalidSignature):
+        return False
+    return True
+
+
+def verify_token(token, public_key_b64, digest=None):
+    """
+    Reference verifier: check a token from a QR code (with or without the
+    URL in front) against the public key and, if given, a revocation
+    digest (already checked with verify_digest). Returns (status, payload)
+    with status "valid", "revoked" or "invalid"; payload is None when the
+    signature does not check out.
+    """
+    if FRAGMENT_PREFIX in token:
+        token = token.split(FRAGMENT_PREFIX, 1)[1]
+    try:
+        payload_b64, signature_b64 = token.split(".", 1)
+        Ed25519PublicKey.from_public_bytes(_b64decode(public_key_b64)).verify(
+            _b64decode(signature_b64), payload_b64.encode("ascii")
+        )
+        payload = json.loads(_b64decode(payload_b64))
+    except (ValueError, InvalidSignature):
+        return "invalid", None
+
+    if digest is not None and revocation_hash(payload["c"]) in set(digest["revoked"]):
+        return "revoked", payload
+    return "valid", payload
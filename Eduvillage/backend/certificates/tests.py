@@ -1,3 +1,281 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from reportlab import rl_config
+
+from courses.models import Course, Enrollment
+from . import issuance, pdf, pdf_cache, revocation, signing, verification
+from .models import Certificate
+
+User = get_user_model()
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, MEDIA_ROOT=tempfile.mkdtemp())
+class RevocationVerificationTests(TestCase):
+    """Revoking or reissuing stops cached verification answers at once"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher", password="pw")
+        course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.certificates = []
+        for n in range(3):
+            student = User.objects.create_user(username=f"student{n}", password="pw")
+            enrollment = Enrollment.objects.create(
+                user=student, course=course, full_name=f"Student {n}", phone_number="1"
+            )
+            self.certificates.append(Certificate.objects.create(enrollment=enrollment))
+        self.codes = [str(certificate.verification_code) for certificate in self.certificates]
+
+    def statuses(self):
+        return [result["status"] for result in verification.verify_codes(self.codes)]
+
+    def test_answers_are_cached(self):
+        self.assertEqual(self.statuses(), ["valid"] * 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.statuses(), ["valid"] * 3)
+
+    def test_bulk_revoke_invalidates_cached_answers(self):
+        self.statuses()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(revocation.revoke([self.certificates[0].id, self.certificates[1].id]), 2)
+        self.assertEqual(self.statuses(), ["revoked", "revoked", "valid"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(revocation.reissue([self.certificates[0].id]), 1)
+        self.assertEqual(self.statuses(), ["valid", "revoked", "valid"])
+
+    def test_revoke_keeps_other_answers_cached(self):
+        self.statuses()
+        with self.captureOnCommitCallbacks(execute=True):
+            revocation.revoke([self.certificates[0].id])
+        with self.assertNumQueries(0):
+            verification.verify_codes(self.codes[1:])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.statuses(), ["revoked", "valid", "valid"])
+
+    def test_revoking_twice_changes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            revocation.revoke([self.certificates[0].id])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(revocation.revoke([self.certificates[0].id]), 0)
+        self.assertEqual(callbacks, [])
+
+    def test_answer_cached_by_another_worker_is_not_served(self):
+        # Another worker cached "valid" under the code's current token; its
+        # cache is never told about the revoke
+        stale = {"status": "valid", "student_name": "x", "course_name": "x", "issued_at": "x"}
+        generation = verification._generations([self.codes[0]])[self.codes[0]]
+        cache.set(verification._cache_key(generation, self.codes[0]), stale)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            revocation.revoke([self.certificates[0].id])
+        self.assertEqual(self.statuses()[0], "revoked")
+
+    def test_save_delete_and_rename_invalidate(self):
+        self.statuses()
+
+        certificate = Certificate.objects.get(pk=self.certificates[0].pk)
+        certificate.revoked = True
+        with self.captureOnCommitCallbacks(execute=True):
+            certificate.save()
+        self.assertEqual(self.statuses()[0], "revoked")
+
+        enrollment = Enrollment.objects.get(pk=self.certificates[1].enrollment_id)
+        enrollment.full_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.save()
+        self.assertEqual(verification.verify_codes(self.codes)[1]["student_name"], "Renamed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Certificate.objects.get(pk=self.certificates[2].pk).delete()
+        self.assertEqual(self.statuses()[2], "invalid")
+
+    def test_staff_revoke_and_batch_endpoint(self):
+        staff = User.objects.create_user(username="staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        url = reverse("certificates:verify_certificates_batch")
+
+        def batch_statuses():
+            response = self.client.post(url, json.dumps({"codes": self.codes}), content_type="application/json")
+            return [result["status"] for result in response.json()["results"]]
+
+        self.assertEqual(batch_statuses(), ["valid"] * 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("certificates:revoke_certificate", args=[self.certificates[2].id]))
+        self.assertEqual(batch_statuses(), ["valid", "valid", "revoked"])
+
+    def test_unknown_and_malformed_codes_are_invalid(self):
+        results = verification.verify_codes(["not-a-code", "00000000-0000-0000-0000-000000000000"])
+        self.assertEqual([result["status"] for result in results], ["invalid", "invalid"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CERTIFICATE_SIGNING_KEY=signing.generate_private_key())
+class RevocationDigestTests(TestCase):
+    """publish_revocation_digest and the view verifiers download it from"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media = self.settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        teacher = User.objects.create_user(username="teacher")
+        course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.certificates = []
+        for n in range(2):
+            student = User.objects.create_user(username=f"student{n}")
+            enrollment = Enrollment.objects.create(
+                user=student, course=course, full_name=f"Student {n}", phone_number="1"
+            )
+            self.certificates.append(Certificate.objects.create(enrollment=enrollment))
+
+    def test_not_found_before_the_first_publish(self):
+        self.assertEqual(self.client.get(reverse("certificates:revocation_digest")).status_code, 404)
+
+    def test_published_digest_is_served_and_verifies(self):
+        revoked = self.certificates[0]
+        revocation.revoke([revoked.id])
+        call_command("publish_revocation_digest", stdout=io.StringIO())
+
+        response = self.client.get(reverse("certificates:revocation_digest"))
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("max-age", response["Cache-Control"])
+        digest = json.loads(b"".join(response.streaming_content))
+
+        public_key = signing.public_key()
+        self.assertTrue(signing.verify_digest(digest, public_key))
+        for certificate, status in zip(self.certificates, ["revoked", "valid"]):
+            certificate.refresh_from_db()
+            token = signing.sign_certificate(certificate, "Student")
+            self.assertEqual(signing.verify_token(token, public_key, digest)[0], status)
+
+    def test_deleted_certificates_stay_listed(self):
+        deleted = self.certificates[1]
+        token = signing.sign_certificate(deleted, "Student")
+        deleted.enrollment.delete()
+        call_command("publish_revocation_digest", stdout=io.StringIO())
+
+        with open(signing.revocation_digest_path(), "rb") as digest_file:
+            digest = json.load(digest_file)
+        self.assertEqual(signing.verify_token(token, signing.public_key(), digest)[0], "revoked")
+        self.assertEqual(digest["revoked"], [signing.revocation_hash(deleted.verification_code)])
+
+    def test_republishing_replaces_the_file_without_leftovers(self):
+        signing.publish_revocation_digest([])
+        path, digest = signing.publish_revocation_digest([self.certificates[1].verification_code])
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+        self.assertEqual(oct(os.stat(path).st_mode & 0o777), oct(0o644))
+        with open(path, "rb") as digest_file:
+            self.assertEqual(json.load(digest_file)["revoked"], digest["revoked"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CertificatePdfTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_render_leaves_reportlab_settings_alone(self):
+        previous = rl_config.useA85
+        rl_config.useA85 = 1
+        try:
+            rows = [[True, False] * 5 for _ in range(10)]
+            buffer = pdf.get_certificate_template().render("Student", "Course", 1, rows)
+            self.assertTrue(buffer.getvalue().startswith(b"%PDF"))
+            # Image streams are still written without the ASCII85 filter
+            self.assertNotIn(b"/ASCII85Decode", buffer.getvalue())
+            self.assertEqual(rl_config.useA85, 1)
+        finally:
+            rl_config.useA85 = previous
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE, MEDIA_ROOT=tempfile.mkdtemp(), SITE_URL="https://example.com"
+)
+class CertificateDownloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.student = User.objects.create_user(username="student")
+        enrollment = Enrollment.objects.create(
+            user=self.student, course=course, full_name="Student", phone_number="1"
+        )
+        self.certificate = Certificate.objects.create(enrollment=enrollment)
+
+    def test_host_header_does_not_change_the_cached_pdf(self):
+        self.client.force_login(self.student)
+        url = reverse("certificates:download_certificate", args=[self.certificate.id])
+        for host in ["a.example.net", "b.example.net"]:
+            response = self.client.get(url, HTTP_HOST=host)
+            self.assertEqual(response.status_code, 200)
+            response.close()
+
+        self.assertEqual(
+            os.listdir(pdf_cache.certificate_dir(self.certificate.id)),
+            [os.path.basename(pdf_cache.cache_path(self.certificate))],
+        )
+        self.assertEqual(
+            pdf.build_verify_url(self.certificate),
+            f"https://example.com/certificates/verify/{self.certificate.verification_code}/",
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE, MEDIA_ROOT=tempfile.mkdtemp())
+class CertificateIssuanceTests(TestCase):
+    """Issuing on completion and pre-rendering in the background (certificates/issuance.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.enrollments = [
+            Enrollment.objects.create(
+                user=User.objects.create_user(username=f"student{n}"),
+                course=course, full_name=f"Student {n}", phone_number="1",
+            )
+            for n in range(2)
+        ]
+
+    def prerender(self, certificate_ids):
+        # The worker closes its thread's connection, which is the test's here
+        with mock.patch("certificates.issuance.connection"):
+            issuance.prerender(certificate_ids)
+
+    def test_new_certificate_is_prerendered_after_commit(self):
+        with mock.patch("certificates.issuance._get_executor") as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                certificate = issuance.issue_certificate(self.enrollments[0])
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(issuance.issue_certificate(self.enrollments[0]), certificate)
+        executor.return_value.submit.assert_called_once_with(
+            issuance.prerender, [certificate.id], None
+        )
+
+    def test_prerender_fills_the_pdf_cache_and_skips_revoked(self):
+        certificates = [
+            Certificate.objects.create(enrollment=enrollment) for enrollment in self.enrollments
+        ]
+        Certificate.objects.filter(pk=certificates[1].pk).update(revoked=True)
+        self.prerender([certificate.id for certificate in certificates])
+
+        self.assertTrue(os.path.exists(pdf_cache.cache_path(certificates[0])))
+        self.assertFalse(os.path.exists(pdf_cache.certificate_dir(certificates[1].id)))
+
+    def test_prerender_failure_is_logged_not_raised(self):
+        certificate = Certificate.objects.create(enrollment=self.enrollments[0])
+        with mock.patch(
+            "certificates.issuance.ensure_certificate_pdf", side_effect=OSError("disk full")
+        ), self.assertLogs("certificates.issuance", "ERROR"):
+            self.prerender([certificate.id])
@@ -16,6 +16,16 @@ urlpatterns = [
         views.verify_certificate,
         name="verify_certificate"
     ),
+    path(
+        "verify/batch/",
+        views.verify_certificates_batch,
+        name="verify_certificates_batch"
+    ),
+    path(
+        "verify/revocations.json",
+        views.revocation_digest,
+        name="revocation_digest"
+    ),
 
     # 📄 Certificate Views
     path(
@@ -42,6 +52,26 @@ urlpatterns = [
         views.admin_dashboard,
         name="admin_dashboard"
     ),
+    path(
+        "admin-dashboard/export.csv",
+        views.export_certificates_csv,
+        name="export_certificates_csv"
+    ),
+    path(
+        "admin-dashboard/download/",
+        views.bulk_download_certificates,
+        name="bulk_download_certificates"
+    ),
+    path(
+        "admin-dashboard/download/<str:job_id>/",
+        views.certificate_archive,
+        name="certificate_archive"
+    ),
+    path(
+        "admin-dashboard/revoke/",
+        views.bulk_revoke_certificates,
+        name="bulk_revoke_certificates"
+    ),
     path(
     "admin/revoke/<int:pk>/",
     views.revoke_certificate,
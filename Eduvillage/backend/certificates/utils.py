@@ -1,8 +1,6 @@
-from courses.models import Enrollment, Lesson, Progress
+from courses.models import Enrollment
 from certificates.models import Certificate
-import qrcode
-from io import BytesIO
-import base64
+from certificates.qr import qr_data_uri
 
 def sync_certificate(user, course):
     try:
@@ -10,40 +8,25 @@ def sync_certificate(user, course):
     except Enrollment.DoesNotExist:
         return
 
-    total_lessons = Lesson.objects.filter(course=course).count()
-    completed_lessons = Progress.objects.filter(
-        enrollment=enrollment,
-        completed=True
-    ).count()
-
-    if total_lessons == completed_lessons and total_lessons > 0:
+    # completed_at is only set once every active lesson is completed
+    if enrollment.is_completed:
         Certificate.objects.get_or_create(enrollment=enrollment)
 
 
-def generate_qr_code_base64(data):
+def generate_qr_code_base64(data, image_format="png"):
     """
-    Generate QR code as base64 data URI for HTML img tag.
-    
+    Generate a QR code as a data URI for an HTML img tag.
+
+    Despite the name, only PNG output is base64: SVG output is a
+    percent-encoded "data:image/svg+xml," URI. It needs no PIL and scales
+    crisply, but is larger than the PNG one.
+
     Args:
         data: String to encode in QR code
-    
+        image_format: "png" or "svg" (no PIL, scales crisply; larger than PNG)
+
     Returns:
-        Base64 data URI string for use in <img src="data:...">
+        Data URI string for use in <img src="data:...">
     """
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=2,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert PIL image to base64
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    
-    return f"data:image/png;base64,{img_str}"
+    # Memoized per process and in the shared cache (see certificates/qr.py)
+    return qr_data_uri(data, image_format)
@@ -0,0 +1,148 @@
+"""
+Batch certificate verification.
+
+Employers verify many certificates at once. verify_codes() answers a whole
+batch with one IN query (joined to the enrollment, student and course)
+and keeps each code's answer in the cache, so hot codes are served with
+no query at all.
+
+Each code's cached answer is keyed on that code's own generation, a
+random token kept in the cache. Revoke / reissue, rename, issue and
+delete replace the tokens of just the codes they touch once their
+transaction commits (see certificates/signals.py and
+certificates/revocation.py), so other codes keep their answers. The
+token is read before the certificate: an answer computed from data older
+than the change is stored under the replaced token and never read again.
+Anything else, such as a renamed course, is picked up when the entry
+expires.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Certificate
+
+MAX_BATCH_CODES = 200
+
+RESULT_TIMEOUT = 60 * 60
+# Unknown codes are remembered for less time than real ones
+INVALID_TIMEOUT = 5 * 60
+# An expired token only costs a miss: its answers are orphaned, not served
+GENERATION_TIMEOUT = 24 * 60 * 60
+
+
+class VerificationError(ValueError):
+    """The batch is malformed; nothing was looked up."""
+
+
+def _generation_key(code):
+    return f"certificates:verify-generation:{code}"
+
+
+def _cache_key(generation, code):
+    return f"certificates:verify:{code}:{generation}"
+
+
+def _generations(codes):
+    """The current generation token of each code, creating missing ones"""
+    generations = cache.get_many([_generation_key(code) for code in codes])
+    found = {key.rsplit(":", 1)[1]: generation for key, generation in generations.items()}
+    # Any fresh token is safe, even one that overwrites a concurrent
+    # reader's or invalidate()'s: it is written before the certificates
+    # are read, and tokens are never reused
+    created = {code: uuid.uuid4().hex for code in set(codes) - found.keys()}
+    cache.set_many(
+        {_generation_key(code): generation for code, generation in created.items()},
+        GENERATION_TIMEOUT,
+    )
+    found.update(created)
+    return found
+
+
+def invalidate(*codes):
+    """
+    Stop serving the cached answers of these codes. Call it inside the
+    transaction that changes them: the tokens are replaced once it
+    commits, so no answer cached before then is read again.
+    """
+    codes = [str(code) for code in codes]
+    if codes:
+        transaction.on_commit(lambda: cache.set_many(
+            {_generation_key(code): uuid.uuid4().hex for code in codes},
+            GENERATION_TIMEOUT,
+        ))
+
+
+def parse_codes(payload):
+    """Validate a batch payload ({"codes": [...]}) and return the codes."""
+    codes = payload.get("codes") if isinstance(payload, dict) else None
+    if not isinstance(codes, list):
+        raise VerificationError("Expected an object with a 'codes' list.")
+    if len(codes) > MAX_BATCH_CODES:
+        raise VerificationError(f"At most {MAX_BATCH_CODES} codes per request.")
+    if not all(isinstance(code, str) for code in codes):
+        raise VerificationError("Every code must be a string.")
+    return [code.strip() for code in codes]
+
+
+def _normalize(code):
+    """Canonical form of a verification code, or None if it cannot exist"""
+    try:
+        return str(uuid.UUID(code))
+    except ValueError:
+        return None
+
+
+def _result(certificate):
+    enrollment = certificate.enrollment
+    user = enrollment.user
+    return {
+        "status": "revoked" if certificate.revoked else "valid",
+        "student_name": enrollment.full_name or user.get_full_name() or user.username,
+        "course_name": enrollment.course.title,
+        "issued_at": certificate.issued_at.isoformat(),
+    }
+
+
+def verify_codes(codes):
+    """
+    Verify a list of codes. Returns one result per code, in order, each
+    with the code and a status of "valid", "revoked" or "invalid".
+    """
+    normalized = {code: _normalize(code) for code in codes}
+    wanted = {code for code in normalized.values() if code}
+
+    # Read before the certificates: a change committed after this point
+    # replaces the tokens of anything cached below
+    generations = _generations(wanted)
+    keys = {_cache_key(generations[code], code): code for code in wanted}
+    found = {keys[key]: result for key, result in cache.get_many(list(keys)).items()}
+
+    missing = wanted - found.keys()
+    if missing:
+        certificates = Certificate.objects.select_related(
+            "enrollment__user", "enrollment__course"
+        ).filter(verification_code__in=missing)
+
+        looked_up = {
+            str(certificate.verification_code): _result(certificate)
+            for certificate in certificates
+        }
+        cache.set_many(
+            {_cache_key(generations[code], code): result for code, result in looked_up.items()},
+            RESULT_TIMEOUT,
+        )
+
+        invalid = {code: {"status": "invalid"} for code in missing - looked_up.keys()}
+        cache.set_many(
+            {_cache_key(generations[code], code): result for code, result in invalid.items()},
+            INVALID_TIMEOUT,
+        )
+        found.update(looked_up)
+        found.update(invalid)
+
+    return [
+        {"code": code, **found.get(normalized[code], {"status": "invalid"})}
+        for code in codes
+    ]
@@ -1,14 +1,36 @@
 
 from urllib import request
+import csv
+import json
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import HttpResponse
+from django.db.models import Q
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    QueryDict,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from .models import Certificate
-from .pdf import generate_certificate_pdf
+from . import archives, revocation, signing, verification
+from .pdf import build_verify_url
+from .pdf_cache import open_certificate_pdf
 from .utils import generate_qr_code_base64
-from courses.models import Course, Enrollment, Lesson, Progress
+from courses.models import Course, Enrollment
+from eduvillage.pagination import paginate_keyset
+
+ADMIN_DASHBOARD_PAGE_SIZE = 50
+ADMIN_DASHBOARD_ORDERING = ["-issued_at", "-id"]
+CSV_EXPORT_CHUNK_SIZE = 2000
+REVOCATION_DIGEST_MAX_AGE = 5 * 60
 
 
 
@@ -16,42 +38,37 @@ from courses.models import Course, Enrollment, Lesson, Progress
 @login_required
 def download_certificate(request, pk):
     certificate = get_object_or_404(
-        Certificate,
+        Certificate.objects.select_related("enrollment__course", "enrollment__user"),
         id=pk,
         enrollment__user=request.user
     )
 
     enrollment = certificate.enrollment
 
-    # ✅ Check completion FIRST
-    total_lessons = Lesson.objects.filter(course=enrollment.course).count()
-    completed_lessons = Progress.objects.filter(
-        enrollment=enrollment,
-        completed=True
-    ).count()
-
-    if completed_lessons < total_lessons:
+    # ✅ Check completion FIRST (stored progress counters)
+    if enrollment.completed_count < enrollment.total_lessons:
         messages.warning(
             request,
             "⚠ Complete all lessons to download your certificate."
         )
         return redirect("courses:dashboard")
 
-    # ✅ Generate PDF
-    pdf_buffer = generate_certificate_pdf(certificate, request)
+    # ✅ Rendered PDF (served from disk when already rendered)
+    pdf_file = open_certificate_pdf(certificate)
 
     # ✅ Mark downloaded AFTER generating
     if not certificate.downloaded:
         certificate.downloaded = True
-        certificate.save()
-
-    response = HttpResponse(pdf_buffer, content_type="application/pdf")
-    response["Content-Disposition"] = (
-        f'attachment; filename="certificate_{certificate.id}.pdf"'
+        certificate.downloaded_at = timezone.now()
+        certificate.save(update_fields=["downloaded", "downloaded_at"])
+
+    return FileResponse(
+        pdf_file,
+        as_attachment=True,
+        filename=f"certificate_{certificate.id}.pdf",
+        content_type="application/pdf",
     )
 
-    return response
-
 
 
 
@@ -130,6 +147,41 @@ def verify_certificate(request, verification_code=None):
 
 
 
+@csrf_exempt
+def verify_certificates_batch(request):
+    """
+    Verify up to MAX_BATCH_CODES certificates at once (JSON POST).
+    Public, like the verification page.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "error": "POST required"}, status=405)
+
+    try:
+        codes = verification.parse_codes(json.loads(request.body))
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "error": str(exc)}, status=400)
+
+    return JsonResponse({
+        "status": "ok",
+        "results": verification.verify_codes(codes),
+    })
+
+
+def revocation_digest(request):
+    """
+    The signed revocation digest for offline verifiers, as last written
+    by `python manage.py publish_revocation_digest`. Public.
+    """
+    try:
+        digest_file = open(signing.revocation_digest_path(), "rb")
+    except FileNotFoundError:
+        raise Http404("No revocation digest has been published")
+    response = FileResponse(digest_file, content_type="application/json")
+    # Verifiers may cache it until the next scheduled publish
+    patch_cache_control(response, public=True, max_age=REVOCATION_DIGEST_MAX_AGE)
+    return response
+
+
 @login_required
 def view_certificate(request, course_id):
     enrollment = Enrollment.objects.filter(
@@ -161,17 +213,15 @@ def view_certificate(request, course_id):
         return redirect("courses:dashboard")
 
     # Generate QR code for certificate verification
-    protocol = 'https' if request.is_secure() else 'http'
-    host = request.get_host()
-    verify_url = f"{protocol}://{host}/certificates/verify/{certificate.verification_code}/"
-    qr_code_base64 = generate_qr_code_base64(verify_url)
+    verify_url = build_verify_url(certificate)
+    qr_code_uri = generate_qr_code_base64(verify_url, image_format="svg")
 
     return render(
         request,
         "certificates/certificate.html",
         {
             "certificate": certificate,
-            "qr_code": qr_code_base64,
+            "qr_code": qr_code_uri,
             "verify_url": verify_url
         }
     )
@@ -190,69 +240,167 @@ def my_certificates(request):
         {"certificates": certificates}
     )
 
-@staff_member_required
-def admin_dashboard(request):
-    if not request.user.is_staff:
-        return redirect('courses:home')
-    
+def _filter_certificates(params):
+    """Admin dashboard filters (search, course, downloaded, revoked)"""
     certificates = Certificate.objects.select_related(
         "enrollment",
         "enrollment__user",
         "enrollment__course"
     )
 
-    # 🔍 Search by student name or username
-    query = request.GET.get("q")
+    # 🔍 Search student name or username (substring, one combined predicate).
+    # No index can serve a substring LIKE; the page query walks
+    # certificate_issued_idx newest first and stops after one page of matches.
+    query = (params.get("q") or "").strip()
     if query:
         certificates = certificates.filter(
-            enrollment__full_name__icontains=query
-        ) | certificates.filter(
-            enrollment__user__username__icontains=query
+            Q(enrollment__full_name__icontains=query) |
+            Q(enrollment__user__username__icontains=query)
         )
 
     # 🎓 Filter by course
-    course_id = request.GET.get("course")
+    course_id = params.get("course")
     if course_id:
         certificates = certificates.filter(
             enrollment__course__id=course_id
         )
 
     # ⬇ Downloaded filter
-    downloaded = request.GET.get("downloaded")
+    downloaded = params.get("downloaded")
     if downloaded == "true":
         certificates = certificates.filter(downloaded=True)
     elif downloaded == "false":
         certificates = certificates.filter(downloaded=False)
 
     # 🚫 Revoked filter
-    revoked = request.GET.get("revoked")
+    revoked = params.get("revoked")
     if revoked == "true":
         certificates = certificates.filter(revoked=True)
     elif revoked == "false":
         certificates = certificates.filter(revoked=False)
 
-    courses = Course.objects.all()
+    return certificates, query
+
+
+@staff_member_required
+def admin_dashboard(request):
+    if not request.user.is_staff:
+        return redirect('courses:home')
+    
+    certificates, query = _filter_certificates(request.GET)
+
+    # Keyset pages, newest first: every page is a bounded index range scan
+    cursor = request.GET.get("after")
+    page = paginate_keyset(
+        certificates,
+        ADMIN_DASHBOARD_ORDERING,
+        cursor,
+        ADMIN_DASHBOARD_PAGE_SIZE,
+    )
+
+    # Filters without the cursor, for the pager and export links
+    filters = request.GET.copy()
+    filters.pop("after", None)
+
+    courses = Course.objects.only("id", "title")
 
     return render(
         request,
         "certificates/admin_dashboard.html",
         {
-            "students_data": certificates,
+            "students_data": page,
             "courses": courses,
             "query": query,
+            "cursor": cursor,
+            "filters": filters.urlencode(),
+            "selected": request.GET,
         }
     )
 
 
+class _Echo:
+    """File-like object whose write() hands back the CSV line"""
+
+    def write(self, value):
+        return value
+
+
+@staff_member_required
+def export_certificates_csv(request):
+    """Stream every certificate matching the dashboard filters as CSV"""
+    certificates, _ = _filter_certificates(request.GET)
+    rows = certificates.order_by(*ADMIN_DASHBOARD_ORDERING).values_list(
+        "id",
+        "enrollment__full_name",
+        "enrollment__user__username",
+        "enrollment__course__title",
+        "verification_code",
+        "issued_at",
+        "downloaded",
+        "revoked",
+    )
+
+    writer = csv.writer(_Echo())
+    header = [
+        "id", "student", "username", "course",
+        "verification_code", "issued_at", "downloaded", "revoked",
+    ]
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows.iterator(chunk_size=CSV_EXPORT_CHUNK_SIZE):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = 'attachment; filename="certificates.csv"'
+    return response
+
+
+@staff_member_required
+def bulk_download_certificates(request):
+    """
+    Start building a ZIP of every certificate matching the admin dashboard
+    filters (POST) and send the browser to its status page.
+    """
+    if request.method != "POST":
+        return redirect("certificates:admin_dashboard")
+
+    filters = QueryDict(request.POST.get("filters", ""))
+    certificates, _ = _filter_certificates(filters)
+    if filters.get("revoked") != "true":
+        certificates = certificates.filter(revoked=False)
+
+    job_id = archives.start_archive(certificates)
+    return redirect("certificates:certificate_archive", job_id=job_id)
+
+
+@staff_member_required
+def certificate_archive(request, job_id):
+    """Stream a finished archive, or show that it is still being built."""
+    status, path = archives.archive_status(job_id)
+    if status is None:
+        raise Http404("Unknown archive")
+    if status == archives.READY:
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename="certificates.zip",
+            content_type="application/zip",
+        )
+    return render(request, "certificates/archive_status.html", {"status": status})
+
+
 @login_required
 def certificate_detail(request, pk):
-    certificate = get_object_or_404(Certificate, id=pk, enrollment__user=request.user)
+    certificate = get_object_or_404(
+        Certificate.objects.select_related("enrollment__course"),
+        id=pk,
+        enrollment__user=request.user
+    )
     enrollment = certificate.enrollment
     course = enrollment.course
-    total_lessons = Lesson.objects.filter(course=course).count()
-    completed_lessons = Progress.objects.filter(
-        enrollment=enrollment, completed=True
-    ).count()
+    total_lessons = enrollment.total_lessons
+    completed_lessons = enrollment.completed_count
     is_completed = completed_lessons == total_lessons
     context = {
         "certificate": certificate,
@@ -266,18 +414,49 @@ def certificate_detail(request, pk):
 @staff_member_required
 def revoke_certificate(request, pk):
     cert = get_object_or_404(Certificate, id=pk)
-    cert.revoked = True
-    cert.save()
+    revocation.revoke([cert.id])
     return redirect("certificates:admin_dashboard")
 
 
 @staff_member_required
 def reissue_certificate(request, pk):
     cert = get_object_or_404(Certificate, id=pk)
-    cert.revoked = False
-    cert.save()
+    revocation.reissue([cert.id])
     return redirect("certificates:admin_dashboard")
 
 
+@staff_member_required
+def bulk_revoke_certificates(request):
+    """
+    Revoke or reissue the ticked certificates, or every certificate
+    matching the dashboard filters, in one statement.
+    """
+    if request.method != "POST":
+        return redirect("certificates:admin_dashboard")
+
+    action = request.POST.get("action")
+    if action not in ("revoke", "reissue"):
+        messages.error(request, "Unknown action.")
+        return redirect("certificates:admin_dashboard")
+
+    filters = QueryDict(request.POST.get("filters", ""))
+    if request.POST.get("scope") == "filtered":
+        certificates, _ = _filter_certificates(filters)
+    else:
+        ids = [value for value in request.POST.getlist("ids") if value.isdigit()]
+        certificates = Certificate.objects.filter(id__in=ids)
+
+    changed = revocation.set_revoked(certificates, revoked=action == "revoke")
+    messages.success(
+        request,
+        f"{'Revoked' if action == 'revoke' else 'Reissued'} {changed} certificate(s)."
+    )
+
+    dashboard_url = reverse("certificates:admin_dashboard")
+    if filters:
+        dashboard_url = f"{dashboard_url}?{filters.urlencode()}"
+    return redirect(dashboard_url)
+
+
 
 
@@ -0,0 +1,143 @@
+"""
+Data layer for the public course catalog (courses.views.course_list).
+
+Course cards only need id, title, category and the start of the
+description, so listings never load the full description text.
+Browsing is paginated per category with keyset cursors on
+(category, title, id), matching Course.Meta.ordering, and the
+per-category facet counts come from one cached GROUP BY query.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber, Substr
+
+from eduvillage.pagination import encode_cursor, paginate_keyset
+from .models import Course
+from .search import search_courses
+
+CATALOG_PAGE_SIZE = 12
+CATALOG_ORDERING = ["category", "title", "id"]
+
+# The card shows 20 words of description; this is comfortably more
+CARD_SUMMARY_LENGTH = 300
+
+FACETS_CACHE_KEY = "courses:catalog:facets"
+FACETS_CACHE_TIMEOUT = 60 * 60
+
+FEATURED_CACHE_KEY = "courses:catalog:featured"
+FEATURED_COURSES_COUNT = 6
+
+
+def card_queryset(queryset):
+    """Restrict a Course queryset to the columns a catalog card renders."""
+    return queryset.only("id", "title", "category").annotate(
+        summary=Substr("description", 1, CARD_SUMMARY_LENGTH)
+    )
+
+
+def category_facets():
+    """Return {category: course count}, cached until a course changes."""
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = dict(
+            Course.objects.order_by()
+            .values_list("category")
+            .annotate(total=Count("id"))
+        )
+        cache.set(FACETS_CACHE_KEY, facets, FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def featured_courses(count=FEATURED_COURSES_COUNT):
+    """Course cards for the home page, cached until a course changes."""
+    courses = cache.get(FEATURED_CACHE_KEY)
+    if courses is None:
+        courses = list(card_queryset(Course.objects.all())[:count])
+        cache.set(FEATURED_CACHE_KEY, courses, FACETS_CACHE_TIMEOUT)
+    return courses
+
+
+def invalidate_cache():
+    cache.delete_many([FACETS_CACHE_KEY, FEATURED_CACHE_KEY])
+
+
+def _section(category, courses, total, next_cursor=None):
+    return {
+        "display_name": dict(Course.CATEGORY_CHOICES).get(category, "Other"),
+        "courses": courses,
+        "total": total,
+        "next_cursor": next_cursor,
+    }
+
+
+def browse_first_pages(per_page=CATALOG_PAGE_SIZE):
+    """
+    First page of every category in a single query, using ROW_NUMBER()
+    partitioned by category instead of one query per category.
+    """
+    facets = category_facets()
+    rows = (
+        card_queryset(Course.objects.all())
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F("category")],
+                order_by=[F("title").asc(), F("id").asc()],
+            )
+        )
+        .filter(position__lte=per_page + 1)
+        .order_by(*CATALOG_ORDERING)
+    )
+
+    grouped = {}
+    for course in rows:
+        grouped.setdefault(course.category, []).append(course)
+
+    sections = []
+    for category, courses in sorted(grouped.items()):
+        next_cursor = None
+        if len(courses) > per_page:
+            courses = courses[:per_page]
+            last = courses[-1]
+            next_cursor = encode_cursor([last.category, last.title, last.id])
+        sections.append((
+            category,
+            _section(category, courses, facets.get(category, len(courses)), next_cursor),
+        ))
+    return sections
+
+
+def browse_category(category, cursor=None, per_page=CATALOG_PAGE_SIZE):
+    """One keyset page of a single category."""
+    page = paginate_keyset(
+        card_queryset(Course.objects.filter(category=category)),
+        CATALOG_ORDERING,
+        cursor,
+        per_page,
+    )
+    if not page.object_list:
+        return []
+
+    total = category_facets().get(category, len(page.object_list))
+    return [(category, _section(category, page.object_list, total, page.next_cursor))]
+
+
+def search_catalog(query, category=None, cursor=None):
+    """
+    One page of ranked search results, grouped by category.
+    Returns (sections, next_cursor); the next page continues after the
+    last result of this one.
+    """
+    page = search_courses(
+        card_queryset(Course.objects.all()), query, cursor, category=category
+    )
+
+    grouped = {}
+    for course in page:
+        grouped.setdefault(course.category, []).append(course)
+
+    sections = [
+        (category_key, _section(category_key, matches, len(matches)))
+        for category_key, matches in sorted(grouped.items())
+    ]
+    return sections, page.next_cursor
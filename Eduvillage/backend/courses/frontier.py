@@ -0,0 +1,117 @@
+"""
+Stored unlock frontier per enrollment.
+
+Lessons unlock in order: the completed prefix of the course outline plus
+the first lesson after it. Each Enrollment stores that frontier
+(frontier_position = length of the completed prefix, next_lesson = first
+lesson after it) together with the Course.content_version it was computed
+for, so progress-aware pages read it instead of walking the lesson list.
+
+* advance() moves the frontier forward when a lesson is completed; it is
+  the only place a frontier is written
+* a reorder, edit or deactivation bumps the course version, which makes
+  every stored frontier of that course stale; get_frontier() and
+  get_frontiers() compute a stale frontier in memory, so pages never
+  write, and the next advance() stores it again
+"""
+from dataclasses import dataclass
+
+from .models import Enrollment, Progress
+from .outline import active_lessons, get_active_outline, get_course_outlines
+
+
+@dataclass
+class Frontier:
+    position: int
+    next_lesson_id: int
+    lesson_ids: list
+
+    @property
+    def unlocked_ids(self):
+        return set(self.lesson_ids[:self.position + 1])
+
+
+def compute(lesson_ids, completed_ids, start=0):
+    """Return (position, next lesson id) for an ordered list of lesson ids."""
+    position = start
+    while position < len(lesson_ids) and lesson_ids[position] in completed_ids:
+        position += 1
+    next_lesson_id = lesson_ids[position] if position < len(lesson_ids) else None
+    return position, next_lesson_id
+
+
+def completed_lesson_ids(enrollment):
+    return set(
+        Progress.objects.filter(enrollment=enrollment, completed=True)
+        .values_list("lesson_id", flat=True)
+    )
+
+
+def _store(enrollment, course, position, next_lesson_id):
+    enrollment.frontier_position = position
+    enrollment.next_lesson_id = next_lesson_id
+    enrollment.frontier_version = course.content_version
+    Enrollment.objects.filter(pk=enrollment.pk).update(
+        frontier_position=position,
+        next_lesson_id=next_lesson_id,
+        frontier_version=course.content_version,
+    )
+
+
+def is_current(enrollment, course):
+    return enrollment.frontier_version == course.content_version
+
+
+def _frontier(enrollment, course, lesson_ids, completed_ids):
+    if is_current(enrollment, course):
+        return Frontier(enrollment.frontier_position, enrollment.next_lesson_id, lesson_ids)
+    if completed_ids is None:
+        completed_ids = completed_lesson_ids(enrollment)
+    position, next_lesson_id = compute(lesson_ids, completed_ids)
+    return Frontier(position, next_lesson_id, lesson_ids)
+
+
+def get_frontier(enrollment, course, completed_ids=None):
+    """
+    Return the enrollment's Frontier. A stale one is recomputed in memory
+    (from `completed_ids` when given) and not stored.
+    """
+    lesson_ids = [lesson["id"] for lesson in get_active_outline(course)]
+    return _frontier(enrollment, course, lesson_ids, completed_ids)
+
+
+def get_frontiers(enrollments, completed_by_enrollment):
+    """
+    {enrollment id: Frontier} for enrollments with their course loaded.
+    The outlines are read together (see get_course_outlines) and
+    `completed_by_enrollment` must hold the completed lesson ids of every
+    stale enrollment, so this runs at most one query and never writes.
+    """
+    outlines = get_course_outlines([enrollment.course for enrollment in enrollments])
+    return {
+        enrollment.id: _frontier(
+            enrollment,
+            enrollment.course,
+            [lesson["id"] for lesson in active_lessons(outlines[enrollment.course_id])],
+            completed_by_enrollment.get(enrollment.id, set()),
+        )
+        for enrollment in enrollments
+    }
+
+
+def advance(enrollment, course, lesson_id):
+    """Update the stored frontier after `lesson_id` was completed."""
+    if is_current(enrollment, course) and lesson_id != enrollment.next_lesson_id:
+        # Completing a lesson past the frontier does not move it
+        return
+
+    lesson_ids = [lesson["id"] for lesson in get_active_outline(course)]
+    completed_ids = completed_lesson_ids(enrollment)
+    start = enrollment.frontier_position if is_current(enrollment, course) else 0
+    position, next_lesson_id = compute(lesson_ids, completed_ids, start)
+    _store(enrollment, course, position, next_lesson_id)
+
+
+def invalidate(enrollment_ids):
+    """Force the given enrollments to recompute their frontier on next read."""
+    Enrollment.objects.filter(pk__in=enrollment_ids).update(frontier_version=0)
@@ -0,0 +1,110 @@
+"""
+Per-lesson drop-off funnel for teachers.
+
+For every active lesson of a course, in order: how many enrollments
+completed it and how many fewer than completed the lesson before (the
+first lesson is compared with the number of enrollments).
+
+The counts are stored in the database so they stay exact under
+concurrent completions: enrollments are Course.enrollment_count and
+completions are one FunnelCounter row per lesson, adjusted with F()
+updates in the transaction that completes the lessons (complete_lesson()
+and progress sync) or deletes an enrollment. A lesson without a counter
+row is counted from Progress the first time it is needed, and
+`python manage.py recount_progress` rebuilds them all.
+"""
+from dataclasses import dataclass
+
+from django.db.models import Count, F
+
+from .models import FunnelCounter, Progress
+from .outline import get_active_outline
+
+
+@dataclass
+class FunnelStep:
+    lesson_id: int
+    title: str
+    position: int
+    completed: int
+    previous: int
+
+    @property
+    def dropoff(self):
+        return max(self.previous - self.completed, 0)
+
+    @property
+    def dropoff_percent(self):
+        return round(100 * self.dropoff / self.previous) if self.previous else 0
+
+
+def rebuild(lesson_ids):
+    """Count the lessons' completions from Progress and store them; returns {lesson id: count}."""
+    counts = dict.fromkeys(lesson_ids, 0)
+    counts.update(
+        Progress.objects.filter(lesson_id__in=lesson_ids, completed=True)
+        .order_by()
+        .values("lesson_id")
+        .annotate(total=Count("pk"))
+        .values_list("lesson_id", "total")
+    )
+    FunnelCounter.objects.bulk_create(
+        [FunnelCounter(lesson_id=lesson_id, completed=total) for lesson_id, total in counts.items()],
+        update_conflicts=True,
+        unique_fields=["lesson"],
+        update_fields=["completed"],
+    )
+    return counts
+
+
+def get_funnel(course):
+    """
+    Return (enrolled, [FunnelStep, ...]) for the course's active lessons
+    in order.
+    """
+    lessons = get_active_outline(course)
+    lesson_ids = [lesson["id"] for lesson in lessons]
+
+    counts = dict(
+        FunnelCounter.objects.filter(lesson_id__in=lesson_ids)
+        .values_list("lesson_id", "completed")
+    )
+    missing = [lesson_id for lesson_id in lesson_ids if lesson_id not in counts]
+    if missing:
+        counts.update(rebuild(missing))
+
+    enrolled = course.enrollment_count
+    steps = []
+    previous = enrolled
+    for position, lesson in enumerate(lessons, start=1):
+        completed = counts[lesson["id"]]
+        steps.append(FunnelStep(lesson["id"], lesson["title"], position, completed, previous))
+        previous = completed
+    return enrolled, steps
+
+
+def record_completions(completed):
+    """
+    Add {lesson id: newly completed count} to the stored funnel. Call it in
+    the transaction that writes the Progress rows.
+    """
+    missing = []
+    for lesson_id, delta in completed.items():
+        updated = FunnelCounter.objects.filter(lesson_id=lesson_id).update(
+            completed=F("completed") + delta
+        )
+        if not updated:
+            missing.append(lesson_id)
+    if missing:
+        # Counted from Progress, which already holds the new completions
+        rebuild(missing)
+
+
+def enrollment_deleted(enrollment_id):
+    """Take an enrollment's completions off the funnel before its Progress rows go."""
+    lesson_ids = Progress.objects.filter(
+        enrollment_id=enrollment_id, completed=True
+    ).values("lesson_id")
+    FunnelCounter.objects.filter(lesson_id__in=lesson_ids).update(
+        completed=F("completed") - 1
+    )
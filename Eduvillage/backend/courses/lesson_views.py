@@ -0,0 +1,158 @@
+"""
+Buffered "lesson viewed" events.
+
+Opening a lesson used to get_or_create a Progress row on every GET, which
+turned page views into writes. Views are now queued and written in batches
+by `python manage.py flush_lesson_views`, which should run periodically
+(e.g. every minute from cron). lesson_detail only queues the first view of
+a lesson, before any Progress row exists for it.
+
+Where the queue lives depends on the cache (see CACHES in settings):
+
+* Redis: a sequence counter plus one cache entry per event slot. A view
+  claims a slot with incr() and writes the event into it with add(); both
+  are atomic on Redis, so two views never share a slot. Between those two
+  calls the slot is claimed but still empty, so a flush only processes
+  slots claimed before the previous flush started (READY_KEY); by then
+  their events are written. A slot that is still empty is an event lost
+  to a worker crash and is skipped. Redis must not evict keys without a
+  timeout (maxmemory-policy noeviction or volatile-*).
+* Any other cache: the file and local-memory caches have no atomic
+  incr()/add() and cull entries at random, which would lose events and
+  the queue's bookkeeping. Views are inserted into the LessonView table
+  instead, an insert-only queue that the flush drains.
+"""
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+
+from .models import Enrollment, Lesson, LessonView, Progress
+
+KEY_PREFIX = "courses:lesson-views"
+SEQUENCE_KEY = f"{KEY_PREFIX}:seq"
+FLUSHED_KEY = f"{KEY_PREFIX}:flushed"
+READY_KEY = f"{KEY_PREFIX}:ready"
+
+# A given student/lesson pair is queued at most once per this window
+SEEN_TIMEOUT = 60 * 60
+# Events older than this are dropped if the flush never runs
+EVENT_TIMEOUT = 7 * 24 * 60 * 60
+
+FLUSH_BATCH_SIZE = 500
+
+
+def buffers_in_cache():
+    """True when views are queued in the cache rather than the database"""
+    return isinstance(caches["default"], RedisCache)
+
+
+def _event_key(slot):
+    return f"{KEY_PREFIX}:event:{slot}"
+
+
+def _next_slot():
+    try:
+        return cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        return cache.incr(SEQUENCE_KEY)
+
+
+def record_lesson_view(enrollment_id, lesson_id):
+    """Queue a view of `lesson_id` by `enrollment_id`."""
+    if not buffers_in_cache():
+        LessonView.objects.create(enrollment_id=enrollment_id, lesson_id=lesson_id)
+        return
+
+    seen_key = f"{KEY_PREFIX}:seen:{enrollment_id}:{lesson_id}"
+    if cache.add(seen_key, 1, SEEN_TIMEOUT):
+        cache.add(_event_key(_next_slot()), (enrollment_id, lesson_id), EVENT_TIMEOUT)
+
+
+def pending_count():
+    queued = LessonView.objects.count()
+    if buffers_in_cache():
+        queued += max(cache.get(SEQUENCE_KEY, 0) - cache.get(FLUSHED_KEY, 0), 0)
+    return queued
+
+
+def _write_progress(events, batch_size):
+    # Skip enrollments and lessons deleted since the view
+    enrollment_ids = set(Enrollment.objects.filter(
+        id__in={enrollment_id for enrollment_id, _ in events}
+    ).values_list("id", flat=True))
+    lesson_ids = set(Lesson.objects.filter(
+        id__in={lesson_id for _, lesson_id in events}
+    ).values_list("id", flat=True))
+
+    Progress.objects.bulk_create(
+        [
+            Progress(enrollment_id=enrollment_id, lesson_id=lesson_id)
+            for enrollment_id, lesson_id in events
+            if enrollment_id in enrollment_ids and lesson_id in lesson_ids
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def _flush_table(batch_size):
+    processed = 0
+    while True:
+        rows = list(
+            LessonView.objects.order_by("id")
+            .values_list("id", "enrollment_id", "lesson_id")[:batch_size]
+        )
+        if not rows:
+            return processed
+
+        events = {(enrollment_id, lesson_id) for _, enrollment_id, lesson_id in rows}
+        with transaction.atomic():
+            _write_progress(events, batch_size)
+            # By id, not id range: a row with a lower id may commit later
+            LessonView.objects.filter(id__in=[row[0] for row in rows]).delete()
+        processed += len(events)
+
+
+def _flush_cache(batch_size):
+    last_slot = cache.get(READY_KEY, 0)
+    flushed = cache.get(FLUSHED_KEY, 0)
+    claimed = cache.get(SEQUENCE_KEY, 0)
+    if claimed < max(flushed, last_slot):
+        # The sequence was lost (Redis restarted) and restarted from zero
+        last_slot = flushed = 0
+        cache.set(FLUSHED_KEY, 0, timeout=None)
+    next_slot = flushed + 1
+    processed = 0
+
+    while next_slot <= last_slot:
+        end_slot = min(next_slot + batch_size, last_slot + 1)
+        keys = [_event_key(slot) for slot in range(next_slot, end_slot)]
+        events = set(cache.get_many(keys).values())
+
+        if events:
+            _write_progress(events, batch_size)
+            processed += len(events)
+
+        cache.delete_many(keys)
+        cache.set(FLUSHED_KEY, end_slot - 1, timeout=None)
+        next_slot = end_slot
+
+    # Everything claimed so far is written by the time the next flush runs
+    cache.set(READY_KEY, claimed, timeout=None)
+    return processed
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Write queued views as Progress rows with bulk inserts that skip rows
+    which already exist. Returns the number of events processed.
+
+    The LessonView table is always drained, so nothing queued there is
+    left behind when Redis is configured later. Cache slots claimed since
+    the previous flush are left for the next run.
+    """
+    processed = _flush_table(batch_size)
+    if buffers_in_cache():
+        processed += _flush_cache(batch_size)
+    return processed
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from courses import lesson_views
+
+
+class Command(BaseCommand):
+    help = 'Write buffered lesson view events to the Progress table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=lesson_views.FLUSH_BATCH_SIZE,
+            help='Number of events written per bulk insert',
+        )
+
+    def handle(self, *args, **options):
+        processed = lesson_views.flush(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {processed} lesson views'))
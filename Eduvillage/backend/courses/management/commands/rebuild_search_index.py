@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from courses import search
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for the course catalog'
+
+    def handle(self, *args, **options):
+        if not search.is_supported(connection):
+            self.stdout.write(self.style.WARNING(
+                f'Full-text search is not available on {connection.vendor}; '
+                'the catalog falls back to substring matching.'
+            ))
+            return
+
+        with transaction.atomic():
+            indexed = search.rebuild_index(
+                Course.objects.values_list('id', 'title', 'description').iterator()
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} courses'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from courses import progress
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored lesson, enrollment, progress and funnel counters on courses, enrollments and lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='courses',
+            help='Only recount this course id (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        progress.recount(options['courses'])
+        self.stdout.write(self.style.SUCCESS('Progress counters recounted'))
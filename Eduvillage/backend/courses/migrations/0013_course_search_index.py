@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from courses import search
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if not search.is_supported(connection):
+        return
+
+    Course = apps.get_model('courses', 'Course')
+    search.rebuild_index(
+        Course.objects.values_list('id', 'title', 'description').iterator(),
+        connection,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_lesson_category_lesson_difficulty'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
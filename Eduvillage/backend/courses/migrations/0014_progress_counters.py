@@ -0,0 +1,77 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:58
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_progress_counters(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Progress = apps.get_model('courses', 'Progress')
+
+    def count_of(queryset, group_by):
+        return Coalesce(
+            Subquery(
+                queryset.order_by()
+                .values(group_by)
+                .annotate(total=Count('id'))
+                .values('total')
+            ),
+            Value(0),
+        )
+
+    Course.objects.update(lesson_count=count_of(
+        Lesson.objects.filter(course=OuterRef('pk'), is_active=True), 'course'
+    ))
+    Enrollment.objects.update(
+        total_lessons=count_of(
+            Lesson.objects.filter(course=OuterRef('course'), is_active=True),
+            'course'
+        ),
+        completed_count=count_of(
+            Progress.objects.filter(
+                enrollment=OuterRef('pk'),
+                completed=True,
+                lesson__is_active=True
+            ),
+            'enrollment'
+        ),
+    )
+    Enrollment.objects.filter(
+        total_lessons__gt=0,
+        completed_count__gte=F('total_lessons')
+    ).update(completed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_course_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='total_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_progress_counters, migrations.RunPython.noop),
+    ]
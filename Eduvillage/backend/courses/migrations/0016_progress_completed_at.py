@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_course_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progress',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
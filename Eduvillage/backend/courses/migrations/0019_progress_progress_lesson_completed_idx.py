@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_enrollment_enrollment_enrolled_at_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progress',
+            index=models.Index(fields=['lesson', 'completed'], name='progress_lesson_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_enrollment_count(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+
+    Course.objects.update(enrollment_count=Coalesce(
+        Subquery(
+            Enrollment.objects.filter(course=OuterRef('pk'))
+            .order_by()
+            .values('course')
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_course_course_title_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['enrollment_count', 'id'], name='course_enrollment_count_idx'),
+        ),
+        migrations.RunPython(backfill_enrollment_count, migrations.RunPython.noop),
+    ]
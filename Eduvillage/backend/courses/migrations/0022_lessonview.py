@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_course_enrollment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrollment_id', models.BigIntegerField()),
+                ('lesson_id', models.BigIntegerField()),
+            ],
+        ),
+    ]
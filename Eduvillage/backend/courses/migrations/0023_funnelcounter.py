@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0022_lessonview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FunnelCounter',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='funnel_counter', serialize=False, to='courses.lesson')),
+                ('completed', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
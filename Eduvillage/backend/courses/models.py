@@ -28,8 +28,22 @@ class Course(models.Model):
         related_name="created_courses"
     )
 
+    # Number of active lessons, maintained by courses/progress.py
+    lesson_count = models.PositiveIntegerField(default=0)
+    # Number of enrollments, maintained by courses/progress.py
+    enrollment_count = models.PositiveIntegerField(default=0)
+
+    # Bumped whenever the lesson list changes; versions the cached outline
+    content_version = models.PositiveIntegerField(default=1)
+
     class Meta:
         ordering = ['category', 'title']
+        indexes = [
+            # Admin course list sorted by title
+            models.Index(fields=["title", "id"], name="course_title_idx"),
+            # Admin dashboards: most enrolled courses first
+            models.Index(fields=["enrollment_count", "id"], name="course_enrollment_count_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -70,6 +84,14 @@ class Lesson(models.Model):
     class Meta:
         ordering = ['order']  # IMPORTANT for lesson flow
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so signals can tell what changed
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        instance._loaded_course_id = instance.__dict__.get('course_id')
+        return instance
+
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
@@ -108,8 +130,57 @@ class Enrollment(models.Model):
     phone_number = models.CharField(max_length=15)
     enrolled_at = models.DateTimeField(auto_now_add=True)
 
+    # Progress counters, maintained by courses/progress.py
+    completed_count = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    # Unlock frontier, maintained by courses/frontier.py: the first
+    # frontier_position lessons are completed and next_lesson is unlocked.
+    # Only valid while frontier_version matches Course.content_version.
+    next_lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+"
+    )
+    frontier_position = models.PositiveIntegerField(default=0)
+    frontier_version = models.PositiveIntegerField(default=0)
+
     class Meta:
         unique_together = ("user", "course")
+        indexes = [
+            # Rollup watermark scans (dashboard/rollups.py)
+            models.Index(fields=["enrolled_at"], name="enrollment_enrolled_at_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.total_lessons:
+            # Read the live count; the related Course instance may be stale
+            self.total_lessons = (
+                Course.objects.filter(pk=self.course_id)
+                .values_list('lesson_count', flat=True)
+                .first()
+            ) or 0
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored name so signals can tell when it changes
+        instance._loaded_full_name = instance.__dict__.get('full_name')
+        return instance
+
+    @property
+    def is_completed(self):
+        return self.completed_at is not None
+
+    @property
+    def progress_percent(self):
+        if not self.total_lessons:
+            return 0
+        return int((self.completed_count / self.total_lessons) * 100)
 
     def __str__(self):
         return f"{self.user} - {self.course}"
@@ -127,10 +198,43 @@ class Progress(models.Model):
         on_delete=models.CASCADE
     )
     completed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         unique_together = ("enrollment", "lesson")
+        indexes = [
+            # Rollup watermark scans (dashboard/rollups.py)
+            models.Index(fields=["completed_at"], name="progress_completed_at_idx"),
+            # Drop-off funnel: completions per lesson, index only (courses/funnel.py)
+            models.Index(fields=["lesson", "completed"], name="progress_lesson_completed_idx"),
+        ]
 
     def __str__(self):
         return f"{self.enrollment.user} - {self.lesson.title}"
 
+
+
+class LessonView(models.Model):
+    """
+    A queued "lesson viewed" event when the cache cannot buffer them
+    (courses/lesson_views.py). Insert-only: flush_lesson_views turns the
+    rows into Progress rows and deletes them. Plain ids rather than foreign
+    keys, so an insert checks no constraints.
+    """
+    enrollment_id = models.BigIntegerField()
+    lesson_id = models.BigIntegerField()
+
+
+class FunnelCounter(models.Model):
+    """
+    Completed Progress rows of one lesson, for the drop-off funnel
+    (courses/funnel.py). Adjusted with F() updates as lessons are
+    completed and enrollments deleted; rebuilt by recount_progress.
+    """
+    lesson = models.OneToOneField(
+        Lesson,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="funnel_counter"
+    )
+    completed = models.BigIntegerField(default=0)
@@ -0,0 +1,111 @@
+"""
+Sparse lesson ordering for drag-and-drop reordering.
+
+Lessons are numbered in steps of ORDER_STEP, so moving a lesson between two
+neighbours just gives it the midpoint of their orders: a single-row UPDATE.
+Only when two neighbours have no gap left is the whole course renumbered,
+with one bulk_update inside a transaction.
+
+Lesson.order is updated with queryset methods that skip the Lesson signals,
+so every change bumps the course's content version explicitly.
+"""
+from django.db import transaction
+from django.db.models import Max, Q
+
+from .models import Lesson
+from .outline import bump_course_version
+
+ORDER_STEP = 1024
+
+
+def next_order(course_id):
+    """Order value for a lesson appended at the end of the course."""
+    last_order = (
+        Lesson.objects.filter(course_id=course_id)
+        .aggregate(Max("order"))["order__max"]
+    )
+    return (last_order or 0) + ORDER_STEP
+
+
+def renumber(course_id, lesson_ids):
+    """
+    Give the lessons of a course fresh, evenly spaced orders following
+    `lesson_ids`; lessons not listed keep their relative order after them.
+    """
+    with transaction.atomic():
+        lessons = list(
+            Lesson.objects.select_for_update()
+            .filter(course_id=course_id)
+            .only("id", "order")
+            .order_by("order", "id")
+        )
+        position = {lesson_id: index for index, lesson_id in enumerate(lesson_ids)}
+        lessons.sort(key=lambda lesson: position.get(lesson.id, len(position)))
+
+        changed = []
+        for index, lesson in enumerate(lessons, start=1):
+            if lesson.order != index * ORDER_STEP:
+                lesson.order = index * ORDER_STEP
+                changed.append(lesson)
+
+        Lesson.objects.bulk_update(changed, ["order"], batch_size=500)
+        bump_course_version(course_id)
+
+    return len(changed)
+
+
+def move_lesson(lesson, after_id=None):
+    """
+    Move `lesson` to directly after the lesson `after_id` in the same
+    course, or to the front when `after_id` is None.
+
+    Returns True if the move fit into the existing gaps (one row updated),
+    False if the course had to be renumbered.
+    """
+    course_lessons = Lesson.objects.filter(course_id=lesson.course_id).exclude(
+        pk=lesson.pk
+    )
+
+    with transaction.atomic():
+        if after_id is None:
+            previous_order = None
+            following = course_lessons.order_by("order", "id").first()
+        else:
+            previous = course_lessons.get(pk=after_id)
+            previous_order = previous.order
+            following = (
+                course_lessons.filter(
+                    Q(order__gt=previous.order) |
+                    Q(order=previous.order, id__gt=previous.id)
+                )
+                .order_by("order", "id")
+                .first()
+            )
+
+        if following is None:
+            new_order = (previous_order or 0) + ORDER_STEP
+        elif previous_order is None:
+            new_order = following.order // 2
+        else:
+            new_order = (previous_order + following.order) // 2
+
+        fits = (
+            (previous_order is None or new_order > previous_order) and
+            (following is None or new_order < following.order)
+        )
+
+        if fits:
+            Lesson.objects.filter(pk=lesson.pk).update(order=new_order)
+            bump_course_version(lesson.course_id)
+            lesson.order = new_order
+            return True
+
+        # No room left between the neighbours: renumber the whole course
+        ordered_ids = list(
+            course_lessons.order_by("order", "id").values_list("id", flat=True)
+        )
+        insert_at = 0 if after_id is None else ordered_ids.index(after_id) + 1
+        ordered_ids.insert(insert_at, lesson.pk)
+        renumber(lesson.course_id, ordered_ids)
+        lesson.refresh_from_db(fields=["order"])
+        return False
@@ -0,0 +1,77 @@
+"""
+Cached lesson outline per course.
+
+The outline is the ordered list of a course's lessons with just the fields
+navigation needs (id, title, order, is_active), so lesson pages can build
+the sidebar, unlock state and prev/next links without loading every
+lesson's content. Cache entries are keyed by Course.content_version, which
+the Lesson signals bump whenever a lesson is created, edited, reordered or
+soft-deleted, so a stale outline is never read.
+"""
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Course, Lesson
+
+OUTLINE_CACHE_TIMEOUT = 24 * 60 * 60
+OUTLINE_FIELDS = ("id", "title", "order", "is_active")
+
+
+def outline_cache_key(course_id, version):
+    return f"courses:outline:{course_id}:v{version}"
+
+
+def get_course_outline(course):
+    """Return the course's lessons in order as a list of small dicts."""
+    key = outline_cache_key(course.id, course.content_version)
+    outline = cache.get(key)
+    if outline is None:
+        outline = list(
+            Lesson.objects.filter(course_id=course.id)
+            .order_by("order", "id")
+            .values(*OUTLINE_FIELDS)
+        )
+        cache.set(key, outline, OUTLINE_CACHE_TIMEOUT)
+    return outline
+
+
+def get_course_outlines(courses):
+    """
+    {course id: outline} for several courses: one cache read for all of
+    them and one query for those not cached.
+    """
+    keys = {outline_cache_key(course.id, course.content_version): course.id for course in courses}
+    cached = cache.get_many(keys)
+    outlines = {keys[key]: outline for key, outline in cached.items()}
+
+    missing = {course_id: key for key, course_id in keys.items() if key not in cached}
+    if missing:
+        loaded = {course_id: [] for course_id in missing}
+        lessons = (
+            Lesson.objects.filter(course_id__in=missing)
+            .order_by("course_id", "order", "id")
+            .values("course_id", *OUTLINE_FIELDS)
+        )
+        for lesson in lessons:
+            loaded[lesson.pop("course_id")].append(lesson)
+        cache.set_many(
+            {missing[course_id]: outline for course_id, outline in loaded.items()},
+            OUTLINE_CACHE_TIMEOUT,
+        )
+        outlines.update(loaded)
+    return outlines
+
+
+def active_lessons(outline):
+    return [lesson for lesson in outline if lesson["is_active"]]
+
+
+def get_active_outline(course):
+    return active_lessons(get_course_outline(course))
+
+
+def bump_course_version(*course_ids):
+    """Invalidate the cached outline of the given courses."""
+    Course.objects.filter(pk__in=course_ids).update(
+        content_version=F("content_version") + 1
+    )
@@ -0,0 +1,198 @@
+"""
+Stored progress counters.
+
+Course.lesson_count / enrollment_count and Enrollment.completed_count /
+total_lessons / completed_at are kept up to date here so pages can read a
+student's progress and a course's size without counting Lesson, Progress
+and Enrollment rows:
+
+* complete_lesson() flips one Progress row, bumps the enrollment,
+  advances its stored unlock frontier (see courses.frontier) and the
+  lesson's drop-off funnel counter (see courses.funnel)
+* lesson_added() / lesson_removed() are called by the Lesson signals when a
+  lesson is created, deleted, deactivated or reactivated
+* enrollment_added() / enrollment_removed() by the Enrollment signals
+* recount() rebuilds everything from the base tables (funnel counters
+  included), recount_enrollments() just the completion counters of a few
+  enrollments
+
+Only active lessons count towards a course.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import frontier, funnel
+from .models import Course, Enrollment, Lesson, Progress
+
+# Lessons whose funnel counters are rebuilt per query
+RECOUNT_BATCH_SIZE = 500
+
+
+def _sync_completed_at(enrollments):
+    """Stamp newly completed enrollments and clear ones that fell behind."""
+    enrollments.filter(
+        completed_at__isnull=True,
+        total_lessons__gt=0,
+        completed_count__gte=F("total_lessons"),
+    ).update(completed_at=timezone.now())
+
+    enrollments.filter(completed_at__isnull=False).filter(
+        Q(total_lessons=0) | Q(completed_count__lt=F("total_lessons"))
+    ).update(completed_at=None)
+
+
+def complete_lesson(enrollment, lesson):
+    """
+    Mark `lesson` completed for `enrollment`.
+
+    Returns True if this call completed the lesson, False if it was already
+    completed. The enrollment's counter fields are refreshed in place.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        flipped = Progress.objects.filter(
+            enrollment=enrollment,
+            lesson=lesson,
+            completed=False
+        ).update(completed=True, completed_at=now)
+
+        if not flipped:
+            _, flipped = Progress.objects.get_or_create(
+                enrollment=enrollment,
+                lesson=lesson,
+                defaults={"completed": True, "completed_at": now}
+            )
+
+        if flipped:
+            funnel.record_completions({lesson.id: 1})
+        if flipped and lesson.is_active:
+            counted = Enrollment.objects.filter(pk=enrollment.pk)
+            counted.update(completed_count=F("completed_count") + 1)
+            _sync_completed_at(counted)
+
+    enrollment.refresh_from_db(
+        fields=["completed_count", "total_lessons", "completed_at"]
+    )
+    if flipped and lesson.is_active:
+        frontier.advance(enrollment, lesson.course, lesson.id)
+    return bool(flipped)
+
+
+def lesson_added(course_id, lesson_id):
+    """
+    An active lesson joined the course (created or reactivated). A
+    reactivated lesson counts again for the enrollments that completed it.
+    """
+    with transaction.atomic():
+        Course.objects.filter(pk=course_id).update(
+            lesson_count=F("lesson_count") + 1
+        )
+        enrollments = Enrollment.objects.filter(course_id=course_id)
+        enrollments.update(total_lessons=F("total_lessons") + 1)
+        enrollments.filter(
+            progress__lesson_id=lesson_id,
+            progress__completed=True,
+        ).update(completed_count=F("completed_count") + 1)
+        _sync_completed_at(enrollments)
+
+
+def lesson_removed(course_id, lesson_id):
+    """An active lesson left the course (deleted or deactivated)."""
+    with transaction.atomic():
+        Course.objects.filter(pk=course_id, lesson_count__gt=0).update(
+            lesson_count=F("lesson_count") - 1
+        )
+        enrollments = Enrollment.objects.filter(course_id=course_id)
+        enrollments.filter(total_lessons__gt=0).update(
+            total_lessons=F("total_lessons") - 1
+        )
+        enrollments.filter(
+            completed_count__gt=0,
+            progress__lesson_id=lesson_id,
+            progress__completed=True,
+        ).update(completed_count=F("completed_count") - 1)
+        _sync_completed_at(enrollments)
+
+
+def enrollment_added(course_id):
+    Course.objects.filter(pk=course_id).update(
+        enrollment_count=F("enrollment_count") + 1
+    )
+
+
+def enrollment_removed(course_id):
+    Course.objects.filter(pk=course_id, enrollment_count__gt=0).update(
+        enrollment_count=F("enrollment_count") - 1
+    )
+
+
+def _completed_lessons_subquery():
+    return (
+        Progress.objects.filter(
+            enrollment=OuterRef("pk"),
+            completed=True,
+            lesson__is_active=True,
+        )
+        .order_by()
+        .values("enrollment")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+
+
+def recount_enrollments(enrollment_ids):
+    """Recompute completed_count / completed_at for specific enrollments."""
+    enrollments = Enrollment.objects.filter(pk__in=enrollment_ids)
+    with transaction.atomic():
+        enrollments.update(
+            completed_count=Coalesce(Subquery(_completed_lessons_subquery()), Value(0))
+        )
+        _sync_completed_at(enrollments)
+
+
+def recount(course_ids=None):
+    """Recompute every stored counter from Lesson and Progress rows."""
+    courses = Course.objects.all()
+    enrollments = Enrollment.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+        enrollments = enrollments.filter(course_id__in=course_ids)
+
+    active_lessons = (
+        Lesson.objects.filter(course=OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("course")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    enrollment_lessons = (
+        Lesson.objects.filter(course=OuterRef("course"), is_active=True)
+        .order_by()
+        .values("course")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    course_enrollments = (
+        Enrollment.objects.filter(course=OuterRef("pk"))
+        .order_by()
+        .values("course")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    with transaction.atomic():
+        courses.update(
+            lesson_count=Coalesce(Subquery(active_lessons), Value(0)),
+            enrollment_count=Coalesce(Subquery(course_enrollments), Value(0)),
+        )
+        enrollments.update(
+            total_lessons=Coalesce(Subquery(enrollment_lessons), Value(0)),
+            completed_count=Coalesce(Subquery(_completed_lessons_subquery()), Value(0)),
+        )
+        _sync_completed_at(enrollments)
+        lesson_ids = list(
+            Lesson.objects.filter(course__in=courses).values_list("id", flat=True)
+        )
+        for start in range(0, len(lesson_ids), RECOUNT_BATCH_SIZE):
+            funnel.rebuild(lesson_ids[start:start + RECOUNT_BATCH_SIZE])
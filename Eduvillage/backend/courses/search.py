@@ -0,0 +1,242 @@
+"""
+Full-text search index for the course catalog.
+
+The index lives in a side table keyed by course id:
+
+* SQLite  -> an FTS5 virtual table ranked with bm25()
+* PostgreSQL -> a weighted tsvector column with a GIN index ranked with ts_rank()
+
+Other database backends fall back to the old icontains filter.
+The index is kept in sync by the Course signals in courses/signals.py and
+can be rebuilt with `python manage.py rebuild_search_index`.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db import models
+
+from eduvillage.pagination import KeysetPage, decode_cursor, encode_cursor, paginate_keyset
+
+SEARCH_TABLE = "courses_course_search"
+# Ranked results are paged with keyset cursors on (score, id)
+SEARCH_PAGE_SIZE = 24
+
+# Title matches count ten times as much as description matches
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+POSTGRES_CONFIG = "english"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_supported(connection=None):
+    connection = connection or default_connection
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def tokenize(query):
+    """Split a user query into plain word tokens (drops all operators)."""
+    return TOKEN_RE.findall(query.lower())
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+def create_index(connection=None):
+    connection = connection or default_connection
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                "USING fts5(title, description, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                "course_id bigint PRIMARY KEY "
+                "REFERENCES courses_course(id) ON DELETE CASCADE "
+                "DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin "
+                f"ON {SEARCH_TABLE} USING GIN (document)"
+            )
+
+
+def drop_index(connection=None):
+    connection = connection or default_connection
+
+    if not is_supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+def index_course(course_id, title, description, connection=None):
+    """Insert or replace the index entry for one course."""
+    connection = connection or default_connection
+    title = title or ""
+    description = description or ""
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [course_id]
+            )
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, description) "
+                "VALUES (%s, %s, %s)",
+                [course_id, title, description],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (course_id, document) VALUES ("
+                "%s, "
+                f"setweight(to_tsvector('{POSTGRES_CONFIG}', %s), 'A') || "
+                f"setweight(to_tsvector('{POSTGRES_CONFIG}', %s), 'B')"
+                ") ON CONFLICT (course_id) DO UPDATE "
+                "SET document = EXCLUDED.document",
+                [course_id, title, description],
+            )
+
+
+def remove_course(course_id, connection=None):
+    connection = connection or default_connection
+
+    if not is_supported(connection):
+        return
+
+    column = "rowid" if connection.vendor == "sqlite" else "course_id"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE {column} = %s", [course_id]
+        )
+
+
+def rebuild_index(courses, connection=None):
+    """
+    Drop and repopulate the whole index from an iterable of
+    (id, title, description) rows. Returns the number of indexed courses.
+    """
+    connection = connection or default_connection
+
+    if not is_supported(connection):
+        return 0
+
+    drop_index(connection)
+    create_index(connection)
+
+    indexed = 0
+    for course_id, title, description in courses:
+        index_course(course_id, title, description, connection)
+        indexed += 1
+    return indexed
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def search_course_ids(query, limit=SEARCH_PAGE_SIZE, after=None, category=None,
+                      connection=None):
+    """
+    Return up to `limit` (course id, score) pairs matching `query`, best
+    match (lowest score) first.
+
+    Every token is treated as a prefix so results keep up with the user
+    while they type. `after` is the (score, id) of the last row of the
+    previous page; the next page continues strictly after it. Returns None
+    when the backend has no index, so the caller can fall back to a plain
+    filter.
+    """
+    connection = connection or default_connection
+
+    tokens = tokenize(query)
+    if not tokens or not is_supported(connection):
+        return None
+
+    if connection.vendor == "sqlite":
+        id_column = "rowid"
+        score = f"bm25({SEARCH_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})"
+        source = SEARCH_TABLE
+        condition = f"{SEARCH_TABLE} MATCH %s"
+        params = [" AND ".join(f'"{token}"*' for token in tokens)]
+    else:
+        id_column = "course_id"
+        # Negated so that, as with bm25(), lower scores rank higher
+        score = "-ts_rank(document, query)::float8"
+        source = f"{SEARCH_TABLE}, to_tsquery('{POSTGRES_CONFIG}', %s) query"
+        condition = "document @@ query"
+        params = [" & ".join(f"{token}:*" for token in tokens)]
+
+    if category:
+        condition += (
+            f" AND {id_column} IN "
+            "(SELECT id FROM courses_course WHERE category = %s)"
+        )
+        params.append(category)
+    if after is not None:
+        condition += (
+            f" AND ({score} > %s OR ({score} = %s AND {id_column} > %s))"
+        )
+        params += [after[0], after[0], after[1]]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {id_column}, {score} FROM {source} "
+            f"WHERE {condition} "
+            f"ORDER BY {score}, {id_column} "
+            "LIMIT %s",
+            params + [limit],
+        )
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+def search_courses(queryset, query, cursor=None, per_page=SEARCH_PAGE_SIZE,
+                   category=None):
+    """
+    Return one KeysetPage of the courses in `queryset` matching `query`,
+    ordered by relevance. `cursor` is the next_cursor of the previous page.
+    """
+    after = decode_cursor(cursor, 2)
+    if after is not None and not all(
+        isinstance(value, (int, float)) for value in after
+    ):
+        after = None
+
+    rows = search_course_ids(query, per_page + 1, after, category)
+
+    if rows is None:
+        queryset = queryset.filter(
+            models.Q(title__icontains=query) |
+            models.Q(description__icontains=query)
+        )
+        if category:
+            queryset = queryset.filter(category=category)
+        return paginate_keyset(queryset, ["title", "id"], cursor, per_page)
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        score, course_id = rows[-1][1], rows[-1][0]
+        next_cursor = encode_cursor([score, course_id])
+
+    course_ids = [course_id for course_id, _ in rows]
+    courses = {
+        course.id: course
+        for course in queryset.filter(id__in=course_ids)
+    }
+    return KeysetPage(
+        [courses[course_id] for course_id in course_ids if course_id in courses],
+        next_cursor,
+    )
@@ -0,0 +1,107 @@
+"""
+Read-side helpers that assemble a student's enrollments, lessons and
+certificates with a fixed number of queries, however many courses the
+student is enrolled in.
+"""
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+
+from . import frontier
+from .models import Enrollment, Progress
+
+
+def completed_lessons_by_enrollment(enrollments):
+    """Return {enrollment id: set of completed lesson ids} in one query."""
+    completed = {enrollment.id: set() for enrollment in enrollments}
+    rows = Progress.objects.filter(
+        enrollment__in=completed.keys(),
+        completed=True,
+    ).values_list("enrollment_id", "lesson_id")
+
+    for enrollment_id, lesson_id in rows:
+        completed[enrollment_id].add(lesson_id)
+    return completed
+
+
+def student_course_data(user):
+    """
+    Everything the student dashboard shows, per enrolled course.
+
+    One query for the enrollments with course and certificate, one cache
+    read for the lesson outlines of every course (plus one query for the
+    outlines not cached) and, when a course edit made stored frontiers
+    stale, one query for the completed lessons of those enrollments. The
+    stale frontiers are recomputed in memory; nothing is written.
+    """
+    enrollments = list(
+        Enrollment.objects.filter(user=user)
+        .select_related("course", "certificate")
+        .order_by("enrolled_at", "id")
+    )
+    stale = [
+        enrollment for enrollment in enrollments
+        if not frontier.is_current(enrollment, enrollment.course)
+    ]
+    frontiers = frontier.get_frontiers(enrollments, completed_lessons_by_enrollment(stale))
+
+    course_data = []
+    for enrollment in enrollments:
+        # ⏭️ First lesson not completed yet
+        next_lesson_id = frontiers[enrollment.id].next_lesson_id
+
+        course_data.append({
+            "enrollment": enrollment,
+            "course": enrollment.course,
+            "next_lesson_id": next_lesson_id,
+            "progress_percent": enrollment.progress_percent,
+            # 🎓 Certificate (only exists after completion)
+            "certificate": getattr(enrollment, "certificate", None),
+        })
+
+    return course_data
+
+
+def student_progress_summary(user):
+    """
+    Progress for every enrollment of `user` plus their certificates, in a
+    single query: the counters are stored on Enrollment, the percentage is
+    computed by the database and certificates come from the reverse
+    one-to-one join.
+    """
+    enrollments = (
+        Enrollment.objects.filter(user=user)
+        .select_related("course", "certificate")
+        .annotate(
+            percent_complete=Case(
+                When(total_lessons=0, then=Value(0.0)),
+                default=Round(
+                    Cast("completed_count", FloatField()) * 100
+                    / F("total_lessons")
+                ),
+                output_field=FloatField(),
+            )
+        )
+        .order_by("enrolled_at", "id")
+    )
+
+    courses = []
+    certificates = []
+    for enrollment in enrollments:
+        courses.append({
+            "enrollment": enrollment,
+            "course": enrollment.course,
+            "completed": enrollment.completed_count,
+            "total": enrollment.total_lessons,
+            "progress_percent": enrollment.percent_complete,
+            "is_completed": enrollment.is_completed,
+        })
+        certificate = getattr(enrollment, "certificate", None)
+        if certificate is not None:
+            certificates.append(certificate)
+
+    return {
+        "courses": courses,
+        "certificates": certificates,
+        "total_courses_enrolled": len(courses),
+        "total_lessons_completed": sum(item["completed"] for item in courses),
+    }
@@ -1,5 +1,8 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
 from certificates.models import Certificate
-from courses.models import Lesson, Progress
+from courses import catalog, funnel, outline, progress, search
+from courses.models import Course, Enrollment, Lesson, Progress
 
 def sync_certificate(user, course):
     print("🔵 sync_certificate CALLED")
@@ -28,3 +31,78 @@ def sync_certificate(user, course):
             course=course
         ).delete()
         print("❌ CERTIFICATE REMOVED (NOT COMPLETED)")
+
+
+@receiver(post_save, sender=Course)
+def index_course_for_search(sender, instance, raw=False, **_kwargs):
+    if raw or not search.is_supported():
+        return
+    search.index_course(instance.id, instance.title, instance.description)
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_from_search(sender, instance, **_kwargs):
+    search.remove_course(instance.id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_catalog_cache(sender, **_kwargs):
+    catalog.invalidate_cache()
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, raw=False, **_kwargs):
+    if raw:
+        return
+
+    if created:
+        was_active, previous_course_id = False, None
+    else:
+        was_active = getattr(instance, '_loaded_is_active', instance.is_active)
+        previous_course_id = getattr(instance, '_loaded_course_id', instance.course_id)
+
+    moved = previous_course_id != instance.course_id
+
+    if was_active and (moved or not instance.is_active):
+        progress.lesson_removed(previous_course_id, instance.id)
+    if instance.is_active and (moved or not was_active):
+        progress.lesson_added(instance.course_id, instance.id)
+
+    # Any lesson change invalidates the cached course outline
+    if moved and previous_course_id is not None:
+        outline.bump_course_version(instance.course_id, previous_course_id)
+    else:
+        outline.bump_course_version(instance.course_id)
+
+    instance._loaded_is_active = instance.is_active
+    instance._loaded_course_id = instance.course_id
+
+
+@receiver(pre_delete, sender=Lesson)
+def count_deleted_lesson(sender, instance, **_kwargs):
+    # pre_delete: the lesson's Progress rows are still there to be counted
+    if getattr(instance, '_loaded_is_active', instance.is_active):
+        progress.lesson_removed(instance.course_id, instance.id)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, **_kwargs):
+    outline.bump_course_version(instance.course_id)
+
+
+@receiver(post_save, sender=Enrollment)
+def count_created_enrollment(sender, instance, created, raw=False, **_kwargs):
+    if created and not raw:
+        progress.enrollment_added(instance.course_id)
+
+
+@receiver(pre_delete, sender=Enrollment)
+def uncount_funnel_completions(sender, instance, **_kwargs):
+    # pre_delete: the enrollment's Progress rows are still there to be counted
+    funnel.enrollment_deleted(instance.id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def count_deleted_enrollment(sender, instance, **_kwargs):
+    progress.enrollment_removed(instance.course_id)
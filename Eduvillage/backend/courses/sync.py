@@ -0,0 +1,228 @@
+"""
+Bulk progress sync for learners who work offline.
+
+A client collects lesson completions while offline and sends them in one
+request. Each event carries the lesson id, the client-side completion time
+and an idempotency key, so retrying a sync after a dropped connection never
+double-applies anything.
+"""
+import datetime
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from certificates.issuance import issue_certificate
+from . import frontier, funnel
+from .models import Enrollment, Lesson, Progress
+from .progress import recount_enrollments
+
+MAX_SYNC_EVENTS = 500
+MAX_IDEMPOTENCY_KEY_LENGTH = 100
+
+# Processed idempotency keys are remembered for this long
+IDEMPOTENCY_TIMEOUT = 7 * 24 * 60 * 60
+
+
+class SyncError(ValueError):
+    """The sync payload is malformed; nothing was applied."""
+
+
+def _idempotency_cache_key(user_id, key):
+    return f"courses:progress-sync:{user_id}:{key}"
+
+
+def parse_events(payload):
+    """
+    Validate a sync payload ({"events": [...]}) and return a list of
+    (idempotency_key, lesson_id, completed_at) tuples, one per event. A key
+    repeated within the payload is kept; sync_progress() reports the
+    repeats as duplicates.
+    """
+    events = payload.get("events") if isinstance(payload, dict) else None
+    if not isinstance(events, list):
+        raise SyncError("Expected an object with an 'events' list.")
+    if len(events) > MAX_SYNC_EVENTS:
+        raise SyncError(f"At most {MAX_SYNC_EVENTS} events per sync.")
+
+    now = timezone.now()
+    parsed = []
+
+    for position, event in enumerate(events):
+        if not isinstance(event, dict):
+            raise SyncError(f"Event {position} is not an object.")
+
+        key = event.get("idempotency_key")
+        if not isinstance(key, str) or not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise SyncError(f"Event {position} has an invalid idempotency_key.")
+
+        lesson_id = event.get("lesson_id")
+        if not isinstance(lesson_id, int) or isinstance(lesson_id, bool):
+            raise SyncError(f"Event {position} has an invalid lesson_id.")
+
+        completed_at = now
+        if event.get("completed_at"):
+            try:
+                completed_at = parse_datetime(str(event["completed_at"]))
+            except ValueError:
+                completed_at = None
+            if completed_at is None:
+                raise SyncError(f"Event {position} has an invalid completed_at.")
+            if timezone.is_naive(completed_at):
+                completed_at = timezone.make_aware(completed_at, datetime.timezone.utc)
+            # Client clocks drift; never record a completion in the future
+            completed_at = min(completed_at, now)
+
+        parsed.append((key, lesson_id, completed_at))
+
+    return parsed
+
+
+def sync_progress(user, events):
+    """
+    Apply parsed completion events for `user`.
+
+    Lessons are checked against the user's enrollments in bulk, Progress
+    rows are upserted in one statement, stored counters are recounted for
+    the touched enrollments and certificates are issued for courses that
+    became complete (and pre-rendered in the background).
+    Returns a JSON-serialisable result.
+    """
+    known_keys = cache.get_many(
+        [_idempotency_cache_key(user.id, key) for key, _, _ in events]
+    )
+    duplicates = []
+    pending = []
+    seen_keys = set()
+    for key, lesson_id, completed_at in events:
+        # Processed by an earlier sync, or earlier in this payload
+        if _idempotency_cache_key(user.id, key) in known_keys or key in seen_keys:
+            duplicates.append(key)
+        else:
+            pending.append((key, lesson_id, completed_at))
+        seen_keys.add(key)
+
+    lessons = dict(
+        Lesson.objects.filter(
+            id__in={lesson_id for _, lesson_id, _ in pending},
+            is_active=True,
+        ).values_list("id", "course_id")
+    )
+    enrollment_by_course = dict(
+        Enrollment.objects.filter(
+            user=user,
+            course_id__in=set(lessons.values()),
+        ).values_list("course_id", "id")
+    )
+
+    accepted = []
+    rejected = []
+    completions = {}
+    for key, lesson_id, completed_at in pending:
+        course_id = lessons.get(lesson_id)
+        if course_id is None:
+            rejected.append({"idempotency_key": key, "lesson_id": lesson_id, "error": "unknown lesson"})
+            continue
+        enrollment_id = enrollment_by_course.get(course_id)
+        if enrollment_id is None:
+            rejected.append({"idempotency_key": key, "lesson_id": lesson_id, "error": "not enrolled"})
+            continue
+
+        accepted.append(key)
+        pair = (enrollment_id, lesson_id)
+        # Keep the earliest completion time if a lesson appears twice
+        if pair not in completions or completed_at < completions[pair]:
+            completions[pair] = completed_at
+
+    issued = []
+    with transaction.atomic():
+        if completions:
+            enrollment_ids = {enrollment_id for enrollment_id, _ in completions}
+
+            # Rows completed earlier keep their original completion time
+            already_completed = set(
+                Progress.objects.filter(
+                    enrollment_id__in=enrollment_ids,
+                    lesson_id__in={lesson_id for _, lesson_id in completions},
+                    completed=True,
+                ).values_list("enrollment_id", "lesson_id")
+            )
+
+            newly_completed_lessons = [
+                (enrollment_id, lesson_id, completed_at)
+                for (enrollment_id, lesson_id), completed_at in completions.items()
+                if (enrollment_id, lesson_id) not in already_completed
+            ]
+            Progress.objects.bulk_create(
+                [
+                    Progress(
+                        enrollment_id=enrollment_id,
+                        lesson_id=lesson_id,
+                        completed=True,
+                        completed_at=completed_at,
+                    )
+                    for enrollment_id, lesson_id, completed_at in newly_completed_lessons
+                ],
+                update_conflicts=True,
+                unique_fields=["enrollment", "lesson"],
+                update_fields=["completed", "completed_at"],
+            )
+            recount_enrollments(enrollment_ids)
+            # Completions can arrive in any order; recompute on next read
+            frontier.invalidate(enrollment_ids)
+
+            funnel.record_completions(Counter(
+                lesson_id for _, lesson_id, _ in newly_completed_lessons
+            ))
+
+            # 🎓 Issue certificates for courses completed by this sync
+            newly_completed = Enrollment.objects.filter(
+                id__in=enrollment_ids,
+                completed_at__isnull=False,
+                certificate__isnull=True,
+            )
+            for enrollment in newly_completed:
+                issued.append(issue_certificate(enrollment))
+
+        # Remember the keys only once the writes are committed
+        processed_keys = {
+            _idempotency_cache_key(user.id, key): True for key in accepted
+        }
+        transaction.on_commit(
+            lambda: cache.set_many(processed_keys, IDEMPOTENCY_TIMEOUT)
+        )
+
+    touched_courses = {lessons[lesson_id] for _, lesson_id, _ in pending if lesson_id in lessons}
+    state = Enrollment.objects.filter(
+        user=user, course_id__in=touched_courses
+    ).order_by("course_id")
+
+    return {
+        "status": "ok",
+        "accepted": accepted,
+        "duplicates": duplicates,
+        "rejected": rejected,
+        "courses": [
+            {
+                "course_id": enrollment.course_id,
+                "completed_count": enrollment.completed_count,
+                "total_lessons": enrollment.total_lessons,
+                "progress_percent": enrollment.progress_percent,
+                "completed_at": enrollment.completed_at,
+            }
+            for enrollment in state
+        ],
+        "certificates": [
+            {
+                "id": certificate.id,
+                "course_id": certificate.enrollment.course_id,
+                "verification_code": str(certificate.verification_code),
+                "issued_at": certificate.issued_at,
+                "url": reverse("certificates:certificate_detail", args=[certificate.id]),
+            }
+            for certificate in issued
+        ],
+    }
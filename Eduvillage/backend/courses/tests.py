@@ -1,3 +1,892 @@
-from django.test import TestCase
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from certificates.models import Certificate
+from . import catalog, funnel, lesson_views, ordering, progress, search, services, sync
+from .models import Course, Enrollment, FunnelCounter, Lesson, LessonView, Progress
+from .outline import get_active_outline, get_course_outline
+
+User = get_user_model()
+
+# The default file cache would outlive the test database
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ProgressCounterTests(TestCase):
+    """Stored counters on Enrollment and Course (courses/progress.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher", password="pw")
+        self.student = User.objects.create_user(username="student", password="pw")
+        self.course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f"Lesson {n}", order=n)
+            for n in range(1, 4)
+        ]
+        self.enrollment = Enrollment.objects.create(
+            user=self.student, course=self.course, full_name="Student", phone_number="1"
+        )
+
+    def assertCounters(self, completed, total):
+        self.enrollment.refresh_from_db()
+        self.course.refresh_from_db()
+        self.assertEqual(
+            (self.enrollment.completed_count, self.enrollment.total_lessons),
+            (completed, total),
+        )
+        self.assertEqual(self.course.lesson_count, total)
+        self.assertEqual(self.enrollment.is_completed, total > 0 and completed >= total)
+
+    def assertMatchesRecount(self):
+        self.enrollment.refresh_from_db()
+        stored = (self.enrollment.completed_count, self.enrollment.total_lessons, self.enrollment.is_completed)
+        progress.recount([self.course.id])
+        self.enrollment.refresh_from_db()
+        self.assertEqual(
+            stored,
+            (self.enrollment.completed_count, self.enrollment.total_lessons, self.enrollment.is_completed),
+        )
+
+    def complete_all(self):
+        for lesson in self.lessons:
+            progress.complete_lesson(self.enrollment, lesson)
+
+    def test_enrollment_starts_with_course_lesson_count(self):
+        self.assertCounters(0, 3)
+
+    def test_complete_lesson_counts_once(self):
+        self.assertTrue(progress.complete_lesson(self.enrollment, self.lessons[0]))
+        self.assertFalse(progress.complete_lesson(self.enrollment, self.lessons[0]))
+        self.assertCounters(1, 3)
+
+    def test_completing_every_lesson_completes_enrollment(self):
+        self.complete_all()
+        self.assertCounters(3, 3)
+        self.assertMatchesRecount()
+
+    def test_new_lesson_reopens_completed_enrollment(self):
+        self.complete_all()
+        Lesson.objects.create(course=self.course, title="Lesson 4", order=4)
+        self.assertCounters(3, 4)
+        self.assertMatchesRecount()
+
+    def test_deactivating_and_reactivating_a_completed_lesson(self):
+        self.complete_all()
+        lesson = Lesson.objects.get(pk=self.lessons[2].pk)
+
+        lesson.is_active = False
+        lesson.save()
+        self.assertCounters(2, 2)
+        self.assertMatchesRecount()
+
+        lesson.is_active = True
+        lesson.save()
+        self.assertCounters(3, 3)
+        self.assertMatchesRecount()
+
+    def test_reactivating_an_uncompleted_lesson(self):
+        progress.complete_lesson(self.enrollment, self.lessons[0])
+        progress.complete_lesson(self.enrollment, self.lessons[1])
+        lesson = Lesson.objects.get(pk=self.lessons[2].pk)
+
+        lesson.is_active = False
+        lesson.save()
+        self.assertCounters(2, 2)
+
+        lesson.is_active = True
+        lesson.save()
+        self.assertCounters(2, 3)
+        self.assertMatchesRecount()
+
+    def test_deleting_a_completed_lesson(self):
+        progress.complete_lesson(self.enrollment, self.lessons[0])
+        Lesson.objects.get(pk=self.lessons[0].pk).delete()
+        self.assertCounters(0, 2)
+        self.assertMatchesRecount()
+
+    def test_moving_a_lesson_to_another_course(self):
+        other = Course.objects.create(
+            title="Other", description="d", created_by=self.course.created_by
+        )
+        progress.complete_lesson(self.enrollment, self.lessons[0])
+        lesson = Lesson.objects.get(pk=self.lessons[0].pk)
+        lesson.course = other
+        lesson.save()
+
+        self.assertCounters(0, 2)
+        other.refresh_from_db()
+        self.assertEqual(other.lesson_count, 1)
+
+    def test_recount_repairs_drifted_counters(self):
+        progress.complete_lesson(self.enrollment, self.lessons[0])
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completed_count=0, total_lessons=9)
+        Course.objects.filter(pk=self.course.pk).update(lesson_count=0)
+
+        progress.recount()
+        self.assertCounters(1, 3)
+        self.assertEqual(Progress.objects.filter(completed=True).count(), 1)
+
+
+# Plain static storage: the manifest only exists after collectstatic
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class LessonOrderingTests(TestCase):
+    """Sparse lesson ordering and moves (courses/ordering.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teacher", password="pw")
+        self.teacher.profile.role = "teacher"
+        self.teacher.profile.save()
+        self.course = Course.objects.create(title="Course", description="d", created_by=self.teacher)
+        self.lessons = [self.add_lesson(f"Lesson {n}") for n in range(1, 5)]
+
+    def add_lesson(self, title):
+        return Lesson.objects.create(
+            course=self.course, title=title, order=ordering.next_order(self.course.id)
+        )
+
+    def outline_ids(self):
+        self.course.refresh_from_db()
+        return [lesson["id"] for lesson in get_active_outline(self.course)]
+
+    def ids(self, *positions):
+        return [self.lessons[position].id for position in positions]
+
+    def test_lessons_are_appended_in_steps(self):
+        self.assertEqual(
+            [lesson.order for lesson in self.lessons],
+            [n * ordering.ORDER_STEP for n in range(1, 5)],
+        )
+
+    def test_move_takes_the_midpoint(self):
+        lesson = self.lessons[3]
+        self.assertTrue(ordering.move_lesson(lesson, after_id=self.lessons[0].id))
+        self.assertEqual(lesson.order, (self.lessons[0].order + self.lessons[1].order) // 2)
+        self.assertEqual(self.outline_ids(), self.ids(0, 3, 1, 2))
+
+    def test_move_to_front_and_back(self):
+        ordering.move_lesson(self.lessons[2], after_id=None)
+        self.assertEqual(self.outline_ids(), self.ids(2, 0, 1, 3))
+
+        ordering.move_lesson(self.lessons[2], after_id=self.lessons[3].id)
+        self.assertEqual(self.outline_ids(), self.ids(0, 1, 3, 2))
+
+    def test_exhausted_gap_renumbers_the_course(self):
+        first, second = self.lessons[0], self.lessons[1]
+        Lesson.objects.filter(pk=second.pk).update(order=first.order + 1)
+        self.course.refresh_from_db()
+        version = self.course.content_version
+
+        self.assertFalse(ordering.move_lesson(self.lessons[3], after_id=first.id))
+        self.assertEqual(self.outline_ids(), self.ids(0, 3, 1, 2))
+        self.assertEqual(
+            list(Lesson.objects.order_by("order").values_list("order", flat=True)),
+            [n * ordering.ORDER_STEP for n in range(1, 5)],
+        )
+        self.assertGreater(self.course.content_version, version)
+
+    def test_renumber_keeps_unlisted_lessons_after_listed_ones(self):
+        ordering.renumber(self.course.id, self.ids(3, 1))
+        self.assertEqual(self.outline_ids(), self.ids(3, 1, 0, 2))
+
+    def test_move_endpoint(self):
+        client = self.client
+        client.force_login(self.teacher)
+        url = reverse("courses:move_lesson", args=[self.lessons[0].id])
+
+        response = client.post(
+            url, json.dumps({"after_id": self.lessons[2].id}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.outline_ids(), self.ids(1, 2, 0, 3))
+
+        self.assertEqual(client.get(url).status_code, 405)
+        response = client.post(
+            url, json.dumps({"after_id": self.lessons[0].id}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_move_endpoint_rejects_other_teachers(self):
+        other = User.objects.create_user(username="other", password="pw")
+        self.client.force_login(other)
+        response = self.client.post(
+            reverse("courses:move_lesson", args=[self.lessons[0].id]),
+            json.dumps({"after_id": None}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_lesson_page_shows_outline_position_not_order_key(self):
+        ordering.move_lesson(self.lessons[3], after_id=self.lessons[0].id)
+        self.client.force_login(self.teacher)
+        response = self.client.get(
+            reverse("courses:lesson_detail", args=[self.course.id, self.lessons[3].id])
+        )
+        self.assertContains(response, "Lesson 2 of 4")
+        self.assertNotContains(response, f"Lesson {self.lessons[3].order} of")
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class OutlineCacheTests(TestCase):
+    """Versioned lesson outline per course (courses/outline.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        self.student = User.objects.create_user(username="student")
+        self.course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f"Lesson {n}", order=n, content="x" * 1000)
+            for n in range(1, 4)
+        ]
+        Enrollment.objects.create(
+            user=self.student, course=self.course, full_name="Student", phone_number="1"
+        )
+
+    def outline(self):
+        return get_course_outline(Course.objects.get(pk=self.course.pk))
+
+    def test_outline_is_cached_without_lesson_content(self):
+        course = Course.objects.get(pk=self.course.pk)
+        outline = get_course_outline(course)
+        self.assertEqual([lesson["id"] for lesson in outline], [lesson.id for lesson in self.lessons])
+        self.assertNotIn("content", outline[0])
+        with self.assertNumQueries(0):
+            get_course_outline(course)
+
+    def test_lesson_changes_are_seen_at_once(self):
+        self.outline()
+        lesson = Lesson.objects.get(pk=self.lessons[0].pk)
+        lesson.title = "Renamed"
+        lesson.save()
+        self.assertEqual(self.outline()[0]["title"], "Renamed")
+
+        lesson.is_active = False
+        lesson.save()
+        self.assertFalse(self.outline()[0]["is_active"])
+
+        added = Lesson.objects.create(course=self.course, title="Lesson 4", order=4)
+        self.assertEqual(self.outline()[-1]["id"], added.id)
+
+        Lesson.objects.get(pk=added.pk).delete()
+        self.assertEqual(len(self.outline()), 3)
+
+    def test_lesson_page_query_count_does_not_grow_with_lessons(self):
+        self.client.force_login(self.student)
+        url = reverse("courses:lesson_detail", args=[self.course.id, self.lessons[0].id])
+
+        def count_queries():
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            return len(queries)
+
+        before = count_queries()
+        for n in range(4, 20):
+            Lesson.objects.create(course=self.course, title=f"Lesson {n}", order=n)
+        self.assertEqual(count_queries(), before)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FrontierTests(TestCase):
+    """Stored unlock frontier (courses/frontier.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        self.student = User.objects.create_user(username="student")
+        self.course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f"Lesson {n}", order=n)
+            for n in range(1, 4)
+        ]
+        self.enrollment = Enrollment.objects.create(
+            user=self.student, course=self.course, full_name="Student", phone_number="1"
+        )
+        self.complete(self.lessons[0])
+        self.client.force_login(self.student)
+
+    def complete(self, lesson):
+        # Fresh rows, as a request would load them
+        progress.complete_lesson(
+            Enrollment.objects.get(pk=self.enrollment.pk),
+            Lesson.objects.select_related("course").get(pk=lesson.pk),
+        )
+
+    def stored(self):
+        return Enrollment.objects.values_list(
+            "frontier_position", "next_lesson_id", "frontier_version"
+        ).get(pk=self.enrollment.pk)
+
+    def test_completion_advances_the_stored_frontier(self):
+        self.course.refresh_from_db()
+        self.assertEqual(self.stored(), (1, self.lessons[1].id, self.course.content_version))
+
+    def test_stale_frontier_is_computed_on_read_without_writing(self):
+        # Any lesson edit bumps the course version
+        self.lessons[0].title = "Renamed"
+        self.lessons[0].save()
+        before = self.stored()
+        self.course.refresh_from_db()
+        self.assertNotEqual(before[2], self.course.content_version)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("courses:lesson_detail", args=[self.course.id, self.lessons[1].id])
+            )
+            self.client.get(reverse("courses:course_detail", args=[self.course.id]))
+            self.client.get(reverse("courses:student_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context["unlocked_lessons"], {self.lessons[0].id, self.lessons[1].id}
+        )
+        writes = [
+            query["sql"] for query in queries
+            if query["sql"].startswith(("UPDATE", "INSERT", "DELETE"))
+            and "courses_lessonview" not in query["sql"]
+            and "django_session" not in query["sql"]
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(self.stored(), before)
+
+        # The next completion stores it again
+        self.complete(self.lessons[1])
+        self.course.refresh_from_db()
+        self.assertEqual(self.stored(), (2, self.lessons[2].id, self.course.content_version))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LessonViewBufferTests(TestCase):
+    """Buffered lesson view events (courses/lesson_views.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        student = User.objects.create_user(username="student")
+        self.course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f"Lesson {n}", order=n)
+            for n in range(1, 4)
+        ]
+        self.enrollment = Enrollment.objects.create(
+            user=student, course=self.course, full_name="Student", phone_number="1"
+        )
+        self.client.force_login(student)
+
+    def viewed(self):
+        return set(
+            Progress.objects.filter(enrollment=self.enrollment).values_list("lesson_id", flat=True)
+        )
+
+    def redis(self):
+        # LocMemCache's incr()/add() are atomic within the process, like Redis
+        return mock.patch("courses.lesson_views.buffers_in_cache", return_value=True)
+
+    def test_without_redis_views_queue_in_the_database(self):
+        self.assertFalse(lesson_views.buffers_in_cache())
+        lesson_views.record_lesson_view(self.enrollment.id, self.lessons[0].id)
+        lesson_views.record_lesson_view(self.enrollment.id, self.lessons[0].id)
+        lesson_views.record_lesson_view(self.enrollment.id, self.lessons[1].id)
+        self.assertEqual(lesson_views.pending_count(), 3)
+        self.assertEqual(cache.get(lesson_views.SEQUENCE_KEY), None)
+        self.assertEqual(self.viewed(), set())
+
+        self.assertEqual(lesson_views.flush(batch_size=2), 2)
+        self.assertEqual(self.viewed(), {self.lessons[0].id, self.lessons[1].id})
+        self.assertEqual(lesson_views.pending_count(), 0)
+
+    def test_deleted_lessons_are_skipped(self):
+        lesson_views.record_lesson_view(self.enrollment.id, self.lessons[2].id)
+        self.lessons[2].delete()
+        lesson_views.flush()
+        self.assertEqual(self.viewed(), set())
+        self.assertFalse(LessonView.objects.exists())
+
+    def test_lesson_page_queues_only_the_first_view(self):
+        url = reverse("courses:lesson_detail", args=[self.course.id, self.lessons[0].id])
+        self.client.get(url)
+        self.assertEqual(lesson_views.pending_count(), 1)
+        lesson_views.flush()
+
+        self.client.get(url)
+        self.assertEqual(lesson_views.pending_count(), 0)
+        self.assertEqual(self.viewed(), {self.lessons[0].id})
+
+    def test_redis_views_are_written_one_flush_after_they_are_queued(self):
+        with self.redis():
+            lesson_views.record_lesson_view(self.enrollment.id, self.lessons[0].id)
+            lesson_views.record_lesson_view(self.enrollment.id, self.lessons[0].id)
+            self.assertEqual(self.viewed(), set())
+            self.assertFalse(LessonView.objects.exists())
+
+            self.assertEqual(lesson_views.flush(), 0)
+            lesson_views.record_lesson_view(self.enrollment.id, self.lessons[1].id)
+            self.assertEqual(lesson_views.flush(), 1)
+            self.assertEqual(self.viewed(), {self.lessons[0].id})
+
+            self.assertEqual(lesson_views.flush(), 1)
+            self.assertEqual(self.viewed(), {self.lessons[0].id, self.lessons[1].id})
+            self.assertEqual(lesson_views.pending_count(), 0)
+
+    def test_redis_claimed_but_unwritten_slot_is_not_skipped(self):
+        with self.redis():
+            # A view between incr() and add() when the flush runs
+            slot = lesson_views._next_slot()
+            lesson_views.flush()
+            cache.add(lesson_views._event_key(slot), (self.enrollment.id, self.lessons[2].id))
+
+            lesson_views.flush()
+            self.assertEqual(self.viewed(), {self.lessons[2].id})
+
+    def test_redis_lost_event_slot_is_skipped(self):
+        with self.redis():
+            lesson_views._next_slot()
+            lesson_views.record_lesson_view(self.enrollment.id, self.lessons[0].id)
+            lesson_views.flush()
+
+            self.assertEqual(lesson_views.flush(), 1)
+            self.assertEqual(self.viewed(), {self.lessons[0].id})
+            self.assertEqual(lesson_views.pending_count(), 0)
+
+    def test_redis_flush_also_drains_the_database_queue(self):
+        lesson_views.record_lesson_view(self.enrollment.id, self.lessons[0].id)
+        with self.redis():
+            self.assertEqual(lesson_views.flush(), 1)
+        self.assertEqual(self.viewed(), {self.lessons[0].id})
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class CourseSearchTests(TestCase):
+    """Ranked catalog search paged with keyset cursors (courses/search.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        for n in range(search.SEARCH_PAGE_SIZE + 6):
+            Course.objects.create(
+                title=f"Python {n}",
+                description="python " * (n % 4),
+                category="data-science" if n % 3 else "design",
+                created_by=teacher,
+            )
+        Course.objects.create(title="Cooking", description="d", created_by=teacher)
+
+    def walk(self, **kwargs):
+        titles, cursor = [], None
+        while True:
+            page = search.search_courses(Course.objects.all(), "pyth", cursor, **kwargs)
+            titles.append([course.title for course in page])
+            if not page.has_next:
+                return titles
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_match_once(self):
+        pages = self.walk(per_page=7)
+        titles = [title for page in pages for title in page]
+        self.assertEqual(len(titles), search.SEARCH_PAGE_SIZE + 6)
+        self.assertEqual(len(set(titles)), len(titles))
+        self.assertNotIn("Cooking", titles)
+        self.assertEqual([len(page) for page in pages], [7, 7, 7, 7, 2])
+
+    def test_category_is_filtered_before_paging(self):
+        pages = self.walk(per_page=3, category="design")
+        expected = Course.objects.filter(category="design", title__startswith="Python").count()
+        self.assertEqual(sum(len(page) for page in pages), expected)
+
+    def test_unusable_cursor_starts_from_the_first_page(self):
+        first = [c.id for c in search.search_courses(Course.objects.all(), "pyth", per_page=5)]
+        for cursor in ("garbage", "WyJhIiwiYiJd"):
+            with self.subTest(cursor=cursor):
+                page = search.search_courses(Course.objects.all(), "pyth", cursor, per_page=5)
+                self.assertEqual([c.id for c in page], first)
+
+    def test_catalog_links_to_the_next_page_of_results(self):
+        url = reverse("courses:course_list")
+        response = self.client.get(url, {"search": "python"})
+        next_cursor = response.context["search_next_cursor"]
+        self.assertEqual(response.context["all_courses_count"], search.SEARCH_PAGE_SIZE)
+        self.assertContains(response, f"after={next_cursor}")
+
+        response = self.client.get(url, {"search": "python", "after": next_cursor})
+        self.assertEqual(response.context["all_courses_count"], 6)
+        self.assertIsNone(response.context["search_next_cursor"])
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class CatalogTests(TestCase):
+    """Paginated catalog listing with cached facets (courses/catalog.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teacher")
+        self.add_courses("design", 5)
+        self.add_courses("business", 2)
+
+    def add_courses(self, category, count):
+        start = Course.objects.filter(category=category).count()
+        for n in range(start, start + count):
+            Course.objects.create(
+                title=f"{category} {n:02d}", description="long text " * 100,
+                category=category, created_by=self.teacher,
+            )
+
+    def test_first_pages_of_every_category_in_one_query(self):
+        catalog.category_facets()
+        with self.assertNumQueries(1):
+            sections = dict(catalog.browse_first_pages(per_page=3))
+
+        self.assertEqual(
+            {category: (len(section["courses"]), section["total"]) for category, section in sections.items()},
+            {"business": (2, 2), "design": (3, 5)},
+        )
+        self.assertIsNone(sections["business"]["next_cursor"])
+        course = sections["design"]["courses"][0]
+        self.assertIn("description", course.get_deferred_fields())
+        self.assertLessEqual(len(course.summary), catalog.CARD_SUMMARY_LENGTH)
+
+    def test_category_pages_cover_every_course_once(self):
+        titles, cursor = [], None
+        while True:
+            sections = catalog.browse_category("design", cursor, per_page=2)
+            section = sections[0][1]
+            titles += [course.title for course in section["courses"]]
+            cursor = section["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(titles, [f"design {n:02d}" for n in range(5)])
+
+    def test_facets_are_cached_until_a_course_changes(self):
+        self.assertEqual(catalog.category_facets(), {"design": 5, "business": 2})
+        with self.assertNumQueries(0):
+            catalog.category_facets()
+        self.add_courses("business", 1)
+        self.assertEqual(catalog.category_facets()["business"], 3)
+
+    def test_catalog_query_count_does_not_grow_with_courses(self):
+        def count_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("courses:course_list"))
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        before = count_queries()
+        self.add_courses("design", 20)
+        self.add_courses("web-development", 4)
+        self.assertEqual(count_queries(), before)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StudentCourseDataTests(TestCase):
+    """Fixed number of queries for the student dashboard (courses/services.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        self.student = User.objects.create_user(username="student")
+        self.courses = []
+        for n in range(3):
+            course = Course.objects.create(title=f"Course {n}", description="d", created_by=teacher)
+            lessons = [
+                Lesson.objects.create(course=course, title=f"Lesson {m}", order=m)
+                for m in range(1, 4)
+            ]
+            enrollment = Enrollment.objects.create(
+                user=self.student, course=course, full_name="Student", phone_number="1"
+            )
+            progress.complete_lesson(
+                Enrollment.objects.get(pk=enrollment.pk),
+                Lesson.objects.select_related("course").get(pk=lessons[0].pk),
+            )
+            self.courses.append((course, lessons))
+
+    def next_lessons(self):
+        return [data["next_lesson_id"] for data in services.student_course_data(self.student)]
+
+    def test_cold_cache_and_stale_frontiers(self):
+        # A title edit in every course makes every stored frontier stale
+        for _, lessons in self.courses:
+            lessons[2].title = "Renamed"
+            lessons[2].save()
+        cache.clear()
+
+        # Enrollments, the outlines not cached, completed lessons of the stale ones
+        with self.assertNumQueries(3):
+            next_lessons = self.next_lessons()
+        self.assertEqual(next_lessons, [lessons[1].id for _, lessons in self.courses])
+
+        # Outlines are cached now and nothing was written
+        with self.assertNumQueries(2):
+            self.next_lessons()
+
+    def test_warm_cache_and_current_frontiers(self):
+        self.next_lessons()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.next_lessons(), [lessons[1].id for _, lessons in self.courses])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class StudentProgressSummaryTests(TestCase):
+    """Student profile statistics in one query (courses/services.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        self.student = User.objects.create_user(username="student")
+        for n in range(3):
+            course = Course.objects.create(title=f"Course {n}", description="d", created_by=teacher)
+            lessons = [
+                Lesson.objects.create(course=course, title=f"Lesson {m}", order=m)
+                for m in range(1, 4)
+            ]
+            enrollment = Enrollment.objects.create(
+                user=self.student, course=course, full_name="Student", phone_number="1"
+            )
+            # Course n has n lessons completed
+            for lesson in lessons[:n]:
+                progress.complete_lesson(
+                    Enrollment.objects.get(pk=enrollment.pk),
+                    Lesson.objects.select_related("course").get(pk=lesson.pk),
+                )
+        Certificate.objects.create(enrollment=enrollment)
+
+    def test_one_query_for_any_number_of_enrollments(self):
+        with self.assertNumQueries(1):
+            summary = services.student_progress_summary(self.student)
+            rows = [
+                (item["course"].title, item["completed"], item["total"],
+                 item["progress_percent"], item["is_completed"])
+                for item in summary["courses"]
+            ]
+            certificates = [certificate.enrollment_id for certificate in summary["certificates"]]
+
+        self.assertEqual(rows, [
+            ("Course 0", 0, 3, 0, False),
+            ("Course 1", 1, 3, 33, False),
+            ("Course 2", 2, 3, 67, False),
+        ])
+        self.assertEqual(len(certificates), 1)
+        self.assertEqual(summary["total_courses_enrolled"], 3)
+        self.assertEqual(summary["total_lessons_completed"], 3)
+
+    def test_profile_page(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse("accounts:student_profile"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_lessons_completed"], 3)
+        self.assertEqual(response.context["total_certificates"], 1)
+        self.assertEqual(len(response.context["courses_in_progress"]), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FunnelTests(TestCase):
+    """Drop-off funnel counters stored in the database (courses/funnel.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        self.course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f"Lesson {n}", order=n)
+            for n in range(1, 4)
+        ]
+        self.enrollments = []
+        for n in range(3):
+            student = User.objects.create_user(username=f"student{n}")
+            self.enrollments.append(Enrollment.objects.create(
+                user=student, course=self.course, full_name="Student", phone_number="1"
+            ))
+
+    def complete(self, enrollment, lesson):
+        progress.complete_lesson(
+            Enrollment.objects.get(pk=enrollment.pk),
+            Lesson.objects.select_related("course").get(pk=lesson.pk),
+        )
+
+    def funnel(self):
+        enrolled, steps = funnel.get_funnel(Course.objects.get(pk=self.course.pk))
+        return enrolled, [step.completed for step in steps]
+
+    def test_counts_follow_completions_and_sync(self):
+        self.assertEqual(self.funnel(), (3, [0, 0, 0]))
+        self.complete(self.enrollments[0], self.lessons[0])
+        self.complete(self.enrollments[0], self.lessons[0])
+        self.complete(self.enrollments[1], self.lessons[0])
+        self.complete(self.enrollments[0], self.lessons[1])
+
+        events = [
+            ("a", self.lessons[0].id, timezone.now()),
+            ("b", self.lessons[1].id, timezone.now()),
+        ]
+        sync.sync_progress(self.enrollments[2].user, events)
+        sync.sync_progress(self.enrollments[2].user, events)
+        self.assertEqual(self.funnel(), (3, [3, 2, 0]))
+
+    def test_deleted_enrollment_is_taken_off(self):
+        self.funnel()
+        self.complete(self.enrollments[0], self.lessons[0])
+        self.complete(self.enrollments[1], self.lessons[0])
+        self.enrollments[0].delete()
+        self.assertEqual(self.funnel(), (2, [1, 0, 0]))
+
+    def test_missing_counters_are_counted_from_progress(self):
+        self.complete(self.enrollments[0], self.lessons[0])
+        FunnelCounter.objects.all().delete()
+        self.assertEqual(self.funnel(), (3, [1, 0, 0]))
+
+        FunnelCounter.objects.update(completed=42)
+        progress.recount([self.course.id])
+        self.assertEqual(self.funnel(), (3, [1, 0, 0]))
+
+    def test_reading_costs_one_query_with_a_cached_outline(self):
+        self.funnel()
+        course = Course.objects.get(pk=self.course.pk)
+        with self.assertNumQueries(1):
+            funnel.get_funnel(course)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ProgressSyncTests(TestCase):
+    """Offline progress sync (courses/sync.py)"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher")
+        self.student = User.objects.create_user(username="student")
+        self.course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f"Lesson {n}", order=n)
+            for n in range(1, 4)
+        ]
+        self.enrollment = Enrollment.objects.create(
+            user=self.student, course=self.course, full_name="Student", phone_number="1"
+        )
+        self.client.force_login(self.student)
+
+    def post(self, events):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("courses:sync_progress"),
+                json.dumps({"events": events}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def completed(self):
+        return dict(
+            Progress.objects.filter(enrollment=self.enrollment, completed=True)
+            .values_list("lesson_id", "completed_at")
+        )
+
+    def test_retried_sync_is_applied_once(self):
+        events = [
+            {"idempotency_key": "a", "lesson_id": self.lessons[0].id,
+             "completed_at": "2026-01-01T10:00:00Z"},
+            {"idempotency_key": "b", "lesson_id": self.lessons[1].id},
+        ]
+        result = self.post(events)
+        self.assertEqual((result["accepted"], result["duplicates"]), (["a", "b"], []))
+        self.assertEqual(result["courses"][0]["completed_count"], 2)
+        completed = self.completed()
+
+        result = self.post(events)
+        self.assertEqual((result["accepted"], result["duplicates"]), ([], ["a", "b"]))
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollment.pk).completed_count, 2)
+        self.assertEqual(self.completed(), completed)
+        self.assertEqual(
+            completed[self.lessons[0].id].isoformat(), "2026-01-01T10:00:00+00:00"
+        )
+
+    def test_key_repeated_in_one_payload_is_reported_as_duplicate(self):
+        result = self.post([
+            {"idempotency_key": "a", "lesson_id": self.lessons[0].id},
+            {"idempotency_key": "a", "lesson_id": self.lessons[1].id},
+        ])
+        self.assertEqual((result["accepted"], result["duplicates"]), (["a"], ["a"]))
+        self.assertEqual(set(self.completed()), {self.lessons[0].id})
+
+    def test_existing_rows_are_updated_and_completion_times_kept(self):
+        earlier = timezone.now() - datetime.timedelta(days=3)
+        # Viewed but not completed, and completed online earlier
+        Progress.objects.create(enrollment=self.enrollment, lesson=self.lessons[0])
+        Progress.objects.create(
+            enrollment=self.enrollment, lesson=self.lessons[1], completed=True, completed_at=earlier
+        )
+        progress.recount_enrollments([self.enrollment.id])
+
+        result = self.post([
+            {"idempotency_key": "a", "lesson_id": self.lessons[0].id},
+            {"idempotency_key": "b", "lesson_id": self.lessons[1].id},
+            {"idempotency_key": "c", "lesson_id": self.lessons[0].id,
+             "completed_at": "2026-01-01T10:00:00Z"},
+        ])
+        self.assertEqual(result["accepted"], ["a", "b", "c"])
+        self.assertEqual(Progress.objects.filter(enrollment=self.enrollment).count(), 2)
+
+        completed = self.completed()
+        # The earliest time in the payload wins for a new completion
+        self.assertEqual(completed[self.lessons[0].id].isoformat(), "2026-01-01T10:00:00+00:00")
+        self.assertEqual(completed[self.lessons[1].id], earlier)
+        self.assertEqual(result["courses"][0]["completed_count"], 2)
+
+    def test_unknown_lessons_and_other_courses_are_rejected(self):
+        other = Course.objects.create(
+            title="Other", description="d", created_by=self.course.created_by
+        )
+        other_lesson = Lesson.objects.create(course=other, title="Other", order=1)
+        result = sync.sync_progress(self.student, [
+            ("a", other_lesson.id, timezone.now()),
+            ("b", 0, timezone.now()),
+        ])
+        self.assertEqual(
+            [(entry["idempotency_key"], entry["error"]) for entry in result["rejected"]],
+            [("a", "not enrolled"), ("b", "unknown lesson")],
+        )
+        self.assertEqual(result["accepted"], [])
+
+    def test_completing_the_course_issues_a_certificate(self):
+        result = sync.sync_progress(self.student, [
+            (f"k{lesson.id}", lesson.id, timezone.now()) for lesson in self.lessons
+        ])
+        self.assertEqual(len(result["certificates"]), 1)
+        self.assertEqual(result["courses"][0]["progress_percent"], 100)
+
+    def test_malformed_payloads_apply_nothing(self):
+        for payload in [
+            {},
+            {"events": [{"idempotency_key": "", "lesson_id": 1}]},
+            {"events": [{"idempotency_key": "a", "lesson_id": True}]},
+            {"events": [{"idempotency_key": "a", "lesson_id": 1, "completed_at": "soon"}]},
+        ]:
+            with self.assertRaises(sync.SyncError):
+                sync.parse_events(payload)
@@ -14,8 +14,11 @@ urlpatterns = [
     path("course/<int:course_id>/lesson/<int:lesson_id>/", views.lesson_detail, name='lesson_detail'),
     path("certificates/download/<int:course_id>/", views.download_certificate, name="download_certificate"),
     path("lesson/<int:lesson_id>/complete/",views.mark_lesson_completed,name="mark_lesson_completed"),
+    path("progress/sync/", views.sync_progress, name="sync_progress"),
     path('course/<int:course_id>/add-lesson/', views.add_lesson, name='add_lesson'),
     path('lesson/<int:lesson_id>/edit/', views.edit_lesson, name='edit_lesson'),
+    path('lesson/<int:lesson_id>/move/', views.move_lesson, name='move_lesson'),
+    path('course/<int:course_id>/lessons/reorder/', views.reorder_lessons, name='reorder_lessons'),
     path('dashboard/student/', views.student_dashboard, name='student_dashboard'),
     path('dashboard/teacher/', views.teacher_dashboard, name='teacher_dashboard'),
     path("course/create/", views.create_course, name="create_course"),
@@ -1,12 +1,24 @@
 
-from django.http import FileResponse
+from django.http import FileResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render
 from django.contrib.auth import get_user_model
 from certificates.models import Certificate
-from certificates.pdf import generate_certificate_pdf
+from accounts.decorators import role_required, teacher_required
+from accounts.roles import user_role
+from certificates.issuance import issue_certificate
+from certificates.pdf_cache import open_certificate_pdf
 from.models import Course,Enrollment
 from .forms import EnrollmentForm
+from . import catalog
+from .lesson_views import record_lesson_view
+from .frontier import get_frontier
+from .funnel import get_funnel
+from .outline import get_active_outline
+from . import ordering
+from .progress import complete_lesson
+from .services import student_course_data
+from . import sync as progress_sync
 from django.http import HttpResponse
 from .models import Lesson, Enrollment, Progress
 from django.shortcuts import redirect
@@ -18,50 +30,54 @@ from django.contrib.auth import authenticate, login
 
 User = get_user_model()
 def course_list(request):
-    courses = Course.objects.all()
-    
     # Get search query from request
     search_query = request.GET.get('search', '').strip()
     
     # Get category filter from request
     selected_category = request.GET.get('category', '').strip()
-    
-    # Filter courses by title or description if search query exists
+    category_display_names = dict(Course.CATEGORY_CHOICES)
+    valid_category = selected_category in category_display_names
+
+    # Keyset cursor for the next page of a category or of search results
+    cursor = request.GET.get('after', '').strip()
+    search_next_cursor = None
+
     if search_query:
-        courses = courses.filter(
-            models.Q(title__icontains=search_query) | 
-            models.Q(description__icontains=search_query)
+        # Full-text search over title and description, best matches first
+        courses_by_category, search_next_cursor = catalog.search_catalog(
+            search_query,
+            selected_category if valid_category else None,
+            cursor,
         )
-    
-    # Filter courses by category if selected
-    if selected_category and selected_category in dict(Course.CATEGORY_CHOICES):
-        courses = courses.filter(category=selected_category)
-    
-    # Group courses by category
-    courses_by_category = {}
-    category_display_names = dict(Course.CATEGORY_CHOICES)
-    
-    for course in courses:
-        category_key = course.category
-        if category_key not in courses_by_category:
-            courses_by_category[category_key] = {
-                'display_name': category_display_names.get(category_key, 'Other'),
-                'courses': []
-            }
-        courses_by_category[category_key]['courses'].append(course)
-    
-    # Sort categories
-    sorted_categories = sorted(courses_by_category.items())
-    
-    # Get all categories for filter buttons
-    all_categories = Course.CATEGORY_CHOICES
+    elif valid_category:
+        courses_by_category = catalog.browse_category(selected_category, cursor)
+    else:
+        courses_by_category = catalog.browse_first_pages()
+
+    # Category filter buttons with cached course counts
+    facets = catalog.category_facets()
+    all_categories = [
+        (key, name, facets.get(key, 0))
+        for key, name in Course.CATEGORY_CHOICES
+    ]
+
+    if search_query:
+        all_courses_count = sum(
+            section['total'] for _, section in courses_by_category
+        )
+    elif valid_category:
+        all_courses_count = facets.get(selected_category, 0)
+    else:
+        all_courses_count = sum(facets.values())
     
     return render(request, "courses/course_list.html", {
-        "courses_by_category": sorted_categories,
+        "courses_by_category": courses_by_category,
         "search_query": search_query,
         "selected_category": selected_category,
         "all_categories": all_categories,
-        "all_courses_count": len(courses)
+        "all_courses_count": all_courses_count,
+        "cursor": cursor,
+        "search_next_cursor": search_next_cursor,
     })
 
 @login_required
@@ -76,11 +92,6 @@ def course_detail(request, course_id):
         return redirect("courses:enroll_course", course_id=course.id)
 
 
-    # All lessons of the course
-    lessons = Lesson.objects.filter(course=course).order_by('id')
-
-    
-
     # Completed lessons ids
     completed_lessons = set(
         Progress.objects.filter(
@@ -91,16 +102,9 @@ def course_detail(request, course_id):
 
     certificate=Certificate.objects.filter(enrollment=enrollment).first()
 
-    # Determine the next lesson to complete
-    next_lesson_id = None
-    if lessons:
-        next_lesson_id = lessons.first().id
-        for lesson in lessons:
-            if lesson.id not in completed_lessons:
-                next_lesson_id = lesson.id
-                break
-
-
+    # Lessons in course order and the stored next lesson to complete
+    lessons = get_active_outline(course)
+    next_lesson_id = get_frontier(enrollment, course, completed_lessons).next_lesson_id
 
     return render(
         request,
@@ -117,20 +121,17 @@ def course_detail(request, course_id):
    
 
 @login_required
-def download_certificate(request, certificate_id):
+def download_certificate(request, course_id):
     certificate = get_object_or_404(
-        Certificate,
-        id=certificate_id,
+        Certificate.objects.select_related("enrollment__course", "enrollment__user"),
+        enrollment__course_id=course_id,
         enrollment__user=request.user
     )
 
-    pdf_buffer = generate_certificate_pdf(
-        certificate,
-        request.user
-    )
+    pdf_file = open_certificate_pdf(certificate)
 
     return FileResponse(
-        pdf_buffer,
+        pdf_file,
         as_attachment=True,
         filename=f"{certificate.enrollment.course.title}_certificate.pdf"
     )
@@ -201,33 +202,20 @@ from certificates.models import Certificate
 
 @login_required
 def mark_lesson_completed(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), id=lesson_id)
     enrollment = get_object_or_404(
         Enrollment,
         user=request.user,
         course=lesson.course
     )
 
-    # Mark progress
-    progress, _ = Progress.objects.get_or_create(
-        enrollment=enrollment,
-        lesson=lesson
-    )
-    progress.completed = True
-    progress.save()
+    # Mark progress (also updates the enrollment's stored counters)
+    complete_lesson(enrollment, lesson)
 
     # Check if all lessons are completed
-    total_lessons = Lesson.objects.filter(course=lesson.course).count()
-    completed_lessons = Progress.objects.filter(
-        enrollment=enrollment,
-        completed=True
-    ).count()
-
-    if total_lessons == completed_lessons:
-        # ✅ Create or get certificate
-        certificate, _ = Certificate.objects.get_or_create(
-            enrollment=enrollment
-        )
+    if enrollment.is_completed:
+        # ✅ Issue certificate (the PDF is pre-rendered in the background)
+        certificate = issue_certificate(enrollment)
 
         # ✅ Redirect to certificate page
         return redirect(
@@ -244,65 +232,28 @@ def mark_lesson_completed(request, lesson_id):
 
 
 @login_required
-def student_dashboard(request):
-    if request.user.profile.role != "student":
-        return redirect('home')
-
-
-    enrollments = Enrollment.objects.filter(user=request.user)
-    course_data = []
+def sync_progress(request):
+    """Apply a batch of offline lesson completions (JSON POST)."""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'error': 'POST required'}, status=405)
 
-    for enrollment in enrollments:
-        # 📚 Ordered lessons for this course
-        lessons = list(
-            Lesson.objects.filter(
-                course=enrollment.course
-            ).order_by("order")
-        )
+    try:
+        events = progress_sync.parse_events(json.loads(request.body))
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'error': str(exc)}, status=400)
 
-        # ✅ Completed lesson IDs for this enrollment
-        completed_lessons = set(
-            Progress.objects.filter(
-                enrollment=enrollment,
-                completed=True
-            ).values_list("lesson_id", flat=True)
-        )
+    return JsonResponse(
+        progress_sync.sync_progress(request.user, events)
+    )
 
-        total_lessons = len(lessons)
-        completed_count = len(completed_lessons)
 
-        # 📊 Progress %
-        progress_percent = (
-            int((completed_count / total_lessons) * 100)
-            if total_lessons > 0 else 0
-        )
+@login_required
+@role_required("student", redirect_to="home")
+def student_dashboard(request):
 
-        # ⏭️ NEXT LESSON LOGIC (CRITICAL FIX)
-        next_lesson_id = None
-
-        if lessons:
-            if completed_count == 0:
-                # 🔓 First lesson unlocked by default
-                next_lesson_id = lessons[0].id
-            else:
-                for lesson in lessons:
-                    if lesson.id not in completed_lessons:
-                        next_lesson_id = lesson.id
-                        break
-
-        # 🎓 Certificate (only exists after completion)
-        certificate = Certificate.objects.filter(
-            enrollment=enrollment
-        ).first()
-
-        course_data.append({
-            "course": enrollment.course,
-            "lessons": lessons,
-            "completed_lessons": completed_lessons,
-            "next_lesson_id": next_lesson_id,
-            "progress_percent": progress_percent,
-            "certificate": certificate,
-        })
+    # Fixed number of queries however many courses the student takes
+    course_data = student_course_data(request.user)
+    enrollments = [data["enrollment"] for data in course_data]
 
     return render(
         request,
@@ -319,7 +270,7 @@ def lesson_detail(request, course_id, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id, course=course)
 
     # Teachers and course creators can view lessons without enrollment
-    if request.user.profile.role == 'teacher' or course.created_by == request.user:
+    if request.role == 'teacher' or course.created_by_id == request.user.id:
         enrollment = None
     else:
         enrollment = Enrollment.objects.filter(
@@ -330,28 +281,30 @@ def lesson_detail(request, course_id, lesson_id):
         if not enrollment:
             return render(request, "courses/not_enrolled.html")
 
-    lessons = list(
-        Lesson.objects.filter(course=course).order_by("order")
-    )
-
-    progress_qs = Progress.objects.filter(
-        enrollment=enrollment,
-        completed=True
-    ).values_list("lesson_id", flat=True)
-
-    completed_lessons = set(progress_qs)
-
-    # 🔓 Unlock logic
-    unlocked_lessons = set()
-    if lessons:
-        unlocked_lessons.add(lessons[0].id)  # First lesson always unlocked
-        for lesson_obj in lessons:
-            if lesson_obj.id in completed_lessons:
-                unlocked_lessons.add(lesson_obj.id)
-            else:
-                break
+    # Cached navigation outline (id, title, order) instead of every lesson
+    lessons = get_active_outline(course)
+    lesson_ids = [lesson_obj["id"] for lesson_obj in lessons]
+    if lesson.id not in lesson_ids:
+        raise Http404("Lesson is not available")
+
+    # Lessons viewed (a Progress row exists) and completed
+    viewed_lessons = set()
+    completed_lessons = set()
+    for viewed_id, completed in Progress.objects.filter(
+        enrollment=enrollment
+    ).values_list("lesson_id", "completed"):
+        viewed_lessons.add(viewed_id)
+        if completed:
+            completed_lessons.add(viewed_id)
+
+    # 🔓 Unlocked: the completed prefix plus the stored next lesson.
+    # Teachers see every lesson.
+    if enrollment:
+        unlocked_lessons = get_frontier(enrollment, course, completed_lessons).unlocked_ids
+    else:
+        unlocked_lessons = set(lesson_ids)
 
-    current_index = lessons.index(lesson)
+    current_index = lesson_ids.index(lesson.id)
 
     prev_lesson = lessons[current_index - 1] if current_index > 0 else None
     next_lesson = (
@@ -360,18 +313,21 @@ def lesson_detail(request, course_id, lesson_id):
         else None
     )
 
-    # Only create progress for enrolled students, not for teachers
+    # Only track progress for enrolled students, not for teachers.
+    # The first view is queued and written later (courses/lesson_views.py).
     progress = None
     if enrollment:
-        progress, _ = Progress.objects.get_or_create(
-            enrollment=enrollment,
-            lesson=lesson
-        )
+        progress = {"completed": lesson.id in completed_lessons}
+        if lesson.id not in viewed_lessons:
+            record_lesson_view(enrollment.id, lesson.id)
 
     context = {
         "course": course,
         "lesson": lesson,
         "lessons": lessons,
+        "total_lessons": len(lessons),
+        # Position in the active outline; Lesson.order is a sparse sort key
+        "lesson_number": current_index + 1,
         "completed_lessons": completed_lessons,
         "unlocked_lessons": unlocked_lessons,
         "prev_lesson": prev_lesson,
@@ -381,24 +337,18 @@ def lesson_detail(request, course_id, lesson_id):
 
     return render(request, "courses/lesson_detail.html", context)
 def home(request):
-    from django.db.models import Count
-    from accounts.models import Profile
-    from certificates.models import Certificate
-    
-    courses = Course.objects.all()
-    
-    # Get statistics for home page
-    total_users = User.objects.count()
-    total_courses = Course.objects.count()
-    total_instructors = User.objects.filter(profile__role='teacher').count()
-    total_certificates = Certificate.objects.count()
+    from dashboard.stats import get_platform_stats
+
+    # Served from the platform counters and catalog cache, so the home page
+    # never counts or scans the big tables
+    stats = get_platform_stats()
     
     return render(request, "home.html", {
-        "courses": courses,
-        "total_users": total_users,
-        "total_courses": total_courses,
-        "total_instructors": total_instructors,
-        "total_certificates": total_certificates,
+        "courses": catalog.featured_courses(),
+        "total_users": stats["users"],
+        "total_courses": stats["courses"],
+        "total_instructors": stats["teachers"],
+        "total_certificates": stats["certificates"],
     })
 
 def teacher_dashboard(request):
@@ -410,7 +360,7 @@ def teacher_dashboard(request):
 
         user = authenticate(request, username=username, password=password)
 
-        if user and user.profile.role == "teacher":
+        if user and user_role(user) == "teacher":
             login(request, user)
             return redirect("courses:teacher_dashboard")
         else:
@@ -421,7 +371,7 @@ def teacher_dashboard(request):
             )
 
     # Logged in teacher → dashboard
-    if request.user.is_authenticated and request.user.profile.role == "teacher":
+    if request.user.is_authenticated and request.role == "teacher":
         courses = Course.objects.filter(created_by=request.user)
         return render(
     request,
@@ -434,10 +384,8 @@ def teacher_dashboard(request):
 
 
 @login_required
+@teacher_required
 def add_lesson(request, course_id):
-    if request.user.profile.role != 'teacher':
-        return redirect("courses:home")
-
     course = get_object_or_404(Course, id=course_id)
 
     if request.method == "POST":
@@ -455,21 +403,13 @@ def add_lesson(request, course_id):
                 }
             )
 
-        # 🔢 Auto-calculate lesson order
-        last_order = (
-            Lesson.objects
-            .filter(course=course)
-            .aggregate(models.Max("order"))["order__max"]
-        )
-
-        next_order = (last_order or 0) + 1
-
+        # 🔢 Auto-calculate lesson order (sparse, see courses/ordering.py)
         Lesson.objects.create(
             course=course,
             title=title,
             content=content,
             video=video,
-            order=next_order
+            order=ordering.next_order(course.id)
         )
 
         return redirect("courses:teacher_course_detail", course_id=course.id)
@@ -478,15 +418,13 @@ def add_lesson(request, course_id):
 
 @login_required
 def dashboard_router(request):
-    profile = request.user.profile
-
-    if profile.role == "student":
+    if request.role == "student":
         return redirect("courses:student_dashboard")
 
-    elif profile.role == "teacher":
+    elif request.role == "teacher":
         return redirect("courses:teacher_dashboard")
 
-    elif profile.role == "admin":
+    elif request.role == "admin":
         return redirect("/admin/")
 
     return redirect("home")
@@ -517,7 +455,7 @@ def teacher_dashboard(request):
 
         user = authenticate(request, username=username, password=password)
 
-        if user and user.profile.role == "teacher":
+        if user and user_role(user) == "teacher":
             login(request, user)
             return redirect("courses:teacher_dashboard")
         else:
@@ -528,7 +466,7 @@ def teacher_dashboard(request):
             )
 
     # If user is authenticated and teacher → show dashboard
-    if request.user.is_authenticated and request.user.profile.role == "teacher":
+    if request.user.is_authenticated and request.role == "teacher":
         courses = Course.objects.filter(created_by=request.user)
         return render(
             request,
@@ -541,7 +479,7 @@ def teacher_dashboard(request):
 
 @login_required
 def teacher_course_detail(request, course_id):
-    if request.user.profile.role != "teacher":
+    if request.role != "teacher":
         return redirect("courses:student_dashboard")
 
     course = get_object_or_404(
@@ -551,6 +489,7 @@ def teacher_course_detail(request, course_id):
     )
 
     lessons = course.lessons.all()
+    enrolled, funnel_steps = get_funnel(course)
 
     return render(
         request,
@@ -558,6 +497,8 @@ def teacher_course_detail(request, course_id):
         {
             "course": course,
             "lessons": lessons,
+            "enrolled": enrolled,
+            "funnel": funnel_steps,
         }
     )
 
@@ -566,7 +507,7 @@ def teacher_course_detail(request, course_id):
 def edit_lesson(request, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id, is_active=True)
 
-    if request.user.profile.role != 'teacher':
+    if request.role != 'teacher':
         return redirect('home')
 
     if request.method == 'POST':
@@ -579,19 +520,66 @@ def edit_lesson(request, lesson_id):
 
     return render(request, 'courses/edit_lesson.html', {'lesson': lesson})
 
+def _can_manage_course(user, course):
+    return user.is_superuser or course.created_by_id == user.id
+
+
 @login_required
-def reorder_lessons(request):
-    if request.method == 'POST':
+def move_lesson(request, lesson_id):
+    """Drag & drop: move one lesson to just after another (JSON POST)."""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'error': 'POST required'}, status=405)
+
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), id=lesson_id)
+    if not _can_manage_course(request.user, lesson.course):
+        return JsonResponse({'status': 'error', 'error': 'Not your course'}, status=403)
+
+    try:
         data = json.loads(request.body)
-        for item in data:
-            Lesson.objects.filter(id=item['id']).update(order=item['order'])
-        return JsonResponse({'status': 'ok'})
+        after_id = data.get('after_id')
+        if after_id is not None:
+            after_id = int(after_id)
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'status': 'error', 'error': 'Invalid JSON body'}, status=400)
+
+    if after_id == lesson.id:
+        return JsonResponse({'status': 'error', 'error': 'Cannot move a lesson after itself'}, status=400)
+
+    try:
+        in_place = ordering.move_lesson(lesson, after_id)
+    except Lesson.DoesNotExist:
+        return JsonResponse({'status': 'error', 'error': 'Unknown lesson'}, status=400)
+
+    return JsonResponse({
+        'status': 'ok',
+        'order': lesson.order,
+        'renumbered': not in_place,
+    })
+
+
+@login_required
+def reorder_lessons(request, course_id):
+    """Apply a complete lesson order (JSON POST of lesson ids) in one transaction."""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'error': 'POST required'}, status=405)
+
+    course = get_object_or_404(Course, id=course_id)
+    if not _can_manage_course(request.user, course):
+        return JsonResponse({'status': 'error', 'error': 'Not your course'}, status=403)
+
+    try:
+        lesson_ids = [int(lesson_id) for lesson_id in json.loads(request.body)['lesson_ids']]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'status': 'error', 'error': 'Expected {"lesson_ids": [...]}'}, status=400)
+
+    updated = ordering.renumber(course.id, lesson_ids)
+    return JsonResponse({'status': 'ok', 'updated': updated})
     
 @login_required
 def delete_lesson(request, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id)
 
-    if request.user.profile.role == 'teacher':
+    if request.role == 'teacher':
         lesson.is_active = False
         lesson.save()
 
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from dashboard import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the platform counters from the base tables and fix any drift'
+
+    def handle(self, *args, **options):
+        changes = stats.reconcile()
+
+        for name, (stored, actual) in changes.items():
+            if stored == actual:
+                self.stdout.write(f'{name}: {actual}')
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: {stored} -> {actual} (drift {actual - stored:+d})'
+                ))
+
+        self.stdout.write(self.style.SUCCESS('Platform counters reconciled'))
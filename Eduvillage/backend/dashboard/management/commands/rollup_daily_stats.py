@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from dashboard import rollups
+
+
+class Command(BaseCommand):
+    help = 'Add the enrollments, completions and certificate events since the last run to the daily rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-days',
+            type=int,
+            help='Recount the last N days from the base tables instead',
+        )
+
+    def handle(self, *args, **options):
+        counted = rollups.run(rebuild_days=options['rebuild_days'])
+
+        for metric, total in counted.items():
+            self.stdout.write(f'{metric}: {total}')
+
+        self.stdout.write(self.style.SUCCESS('Daily rollup updated'))
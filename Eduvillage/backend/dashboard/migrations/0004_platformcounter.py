@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_platform_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Profile = apps.get_model('accounts', 'Profile')
+    Course = apps.get_model('courses', 'Course')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Certificate = apps.get_model('certificates', 'Certificate')
+    PlatformCounter = apps.get_model('dashboard', 'PlatformCounter')
+
+    counts = {
+        'users': User.objects.count(),
+        'students': Profile.objects.filter(role='student').count(),
+        'teachers': Profile.objects.filter(role='teacher').count(),
+        'courses': Course.objects.count(),
+        'enrollments': Enrollment.objects.count(),
+        'certificates': Certificate.objects.count(),
+    }
+    PlatformCounter.objects.bulk_create([
+        PlatformCounter(name=name, value=value)
+        for name, value in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_remove_course_created_at_remove_course_teacher_and_more'),
+        ('accounts', '0002_alter_profile_user'),
+        ('certificates', '0004_certificate_revoked'),
+        ('courses', '0013_course_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_platform_counters, migrations.RunPython.noop),
+    ]
@@ -16,3 +16,51 @@ class Course(models.Model):
     def __str__(self):
         return self.title
 
+
+class PlatformCounter(models.Model):
+    """
+    Materialized platform-wide totals (users, courses, certificates ...)
+    kept up to date by the signals in dashboard/signals.py.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class DailyCourseStats(models.Model):
+    """
+    Per-course, per-day activity totals, filled incrementally by
+    `python manage.py rollup_daily_stats` (see dashboard/rollups.py).
+    """
+    course = models.ForeignKey(
+        "courses.Course",
+        on_delete=models.CASCADE,
+        related_name="daily_stats"
+    )
+    day = models.DateField()
+    enrollments = models.PositiveIntegerField(default=0)
+    lesson_completions = models.PositiveIntegerField(default=0)
+    certificates_issued = models.PositiveIntegerField(default=0)
+    downloads = models.PositiveIntegerField(default=0)
+    revocations = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("course", "day")
+        indexes = [
+            models.Index(fields=["day"], name="dailycoursestats_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} @ {self.day}"
+
+
+class RollupWatermark(models.Model):
+    """Newest event timestamp already counted into DailyCourseStats, per source"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
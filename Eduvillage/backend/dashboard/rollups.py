@@ -0,0 +1,177 @@
+"""
+Daily activity rollups for the admin dashboard trend charts.
+
+DailyCourseStats holds one row per course and day with the number of
+enrollments, lesson completions, certificates issued, downloads and
+revocations. `python manage.py rollup_daily_stats` (run it from cron,
+e.g. every 15 minutes) adds only the events newer than each source's
+RollupWatermark, so a run costs the same however large the history is.
+The charts read nothing but the rollup.
+
+Events younger than ROLLUP_LAG are left for the next run, so rows still
+being written by open transactions are not skipped. Offline progress
+sync (courses/sync.py) can record completions with an earlier, client
+side timestamp; `rollup_daily_stats --rebuild-days N` recounts the last
+N days from the base tables to pick those up.
+"""
+import datetime
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from certificates.models import Certificate
+from courses.models import Enrollment, Progress
+from .models import DailyCourseStats, RollupWatermark
+
+ROLLUP_LAG = datetime.timedelta(minutes=5)
+
+METRICS = (
+    "enrollments",
+    "lesson_completions",
+    "certificates_issued",
+    "downloads",
+    "revocations",
+)
+
+
+def _sources():
+    """DailyCourseStats field -> (rows, timestamp field, course id path)"""
+    return {
+        "enrollments": (Enrollment.objects.all(), "enrolled_at", "course_id"),
+        "lesson_completions": (
+            Progress.objects.filter(completed=True), "completed_at", "enrollment__course_id"
+        ),
+        "certificates_issued": (Certificate.objects.all(), "issued_at", "enrollment__course_id"),
+        "downloads": (
+            Certificate.objects.filter(downloaded=True), "downloaded_at", "enrollment__course_id"
+        ),
+        "revocations": (
+            Certificate.objects.filter(revoked=True), "revoked_at", "enrollment__course_id"
+        ),
+    }
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _daily_counts(rows, field, course_path, lower, upto):
+    """(course id, day, count) for the rows timestamped in (lower, upto]"""
+    rows = rows.filter(**{f"{field}__lte": upto, **lower})
+    return (
+        rows.annotate(day=TruncDate(field))
+        .order_by()
+        .values(course_path, "day")
+        .annotate(total=Count("pk"))
+        .values_list(course_path, "day", "total")
+    )
+
+
+def _apply(deltas):
+    """Add {(course id, day): Counter} to the stored rows."""
+    if not deltas:
+        return
+    existing = {
+        (row.course_id, row.day): row
+        for row in DailyCourseStats.objects.select_for_update().filter(
+            course_id__in={course_id for course_id, _ in deltas},
+            day__in={day for _, day in deltas},
+        )
+    }
+
+    created = []
+    for (course_id, day), counts in deltas.items():
+        row = existing.get((course_id, day))
+        if row is None:
+            created.append(DailyCourseStats(course_id=course_id, day=day, **counts))
+            continue
+        for metric, total in counts.items():
+            setattr(row, metric, getattr(row, metric) + total)
+
+    DailyCourseStats.objects.bulk_create(created)
+    DailyCourseStats.objects.bulk_update(existing.values(), METRICS)
+
+
+def run(now=None, rebuild_days=None):
+    """
+    Roll up the events since the last run. With rebuild_days, the last
+    `rebuild_days` days (including today) are recounted from scratch.
+    Returns {metric: events counted}.
+    """
+    upto = (now or timezone.now()) - ROLLUP_LAG
+    since = None
+    if rebuild_days:
+        first_day = timezone.localdate(upto) - datetime.timedelta(days=rebuild_days - 1)
+        since = _day_start(first_day)
+
+    counted = Counter()
+    deltas = defaultdict(Counter)
+    with transaction.atomic():
+        watermarks = dict(
+            RollupWatermark.objects.select_for_update().values_list("name", "value")
+        )
+        if since is not None:
+            DailyCourseStats.objects.filter(day__gte=since.date()).delete()
+
+        for metric, (rows, field, course_path) in _sources().items():
+            watermark = watermarks.get(metric)
+            if since is not None and (watermark is None or watermark >= since):
+                lower = {f"{field}__gte": since}
+            elif watermark is not None:
+                lower = {f"{field}__gt": watermark}
+            else:
+                # First run: everything so far
+                lower = {}
+
+            for course_id, day, total in _daily_counts(rows, field, course_path, lower, upto):
+                deltas[(course_id, day)][metric] += total
+                counted[metric] += total
+
+            RollupWatermark.objects.update_or_create(
+                name=metric, defaults={"value": upto}
+            )
+
+        _apply(deltas)
+
+    return {metric: counted[metric] for metric in METRICS}
+
+
+def daily_totals(days=30):
+    """Platform-wide totals for each of the last `days` days, oldest first"""
+    today = timezone.localdate()
+    first_day = today - datetime.timedelta(days=days - 1)
+    stored = {
+        row.pop("day"): row
+        for row in DailyCourseStats.objects.filter(day__gte=first_day)
+        .values("day")
+        .annotate(**{metric: Sum(metric) for metric in METRICS})
+        .order_by()
+    }
+
+    empty = dict.fromkeys(METRICS, 0)
+    return [
+        {"day": day, **stored.get(day, empty)}
+        for day in (first_day + datetime.timedelta(days=offset) for offset in range(days))
+    ]
+
+
+def weekly_totals(metric, weeks=12):
+    """[(week start, total)] of one metric for the last `weeks` weeks"""
+    today = timezone.localdate()
+    this_week = today - datetime.timedelta(days=today.weekday())
+    first_week = this_week - datetime.timedelta(weeks=weeks - 1)
+    stored = dict(
+        DailyCourseStats.objects.filter(day__gte=first_week)
+        .annotate(week=TruncWeek("day"))
+        .order_by()
+        .values("week")
+        .annotate(total=Sum(metric))
+        .values_list("week", "total")
+    )
+    return [
+        (week, stored.get(week, 0))
+        for week in (first_week + datetime.timedelta(weeks=offset) for offset in range(weeks))
+    ]
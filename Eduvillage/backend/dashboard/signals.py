@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from accounts.models import Profile
+from certificates.models import Certificate
+from courses.models import Course, Enrollment
+from . import stats
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def count_created_user(sender, instance, created, **_kwargs):
+    if created:
+        stats.increment(stats.USERS)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def count_deleted_user(sender, instance, **_kwargs):
+    stats.increment(stats.USERS, -1)
+
+
+@receiver(post_save, sender=Profile)
+def count_profile_role(sender, instance, created, **_kwargs):
+    # Role the row had before this save (None for a brand new profile)
+    previous_role = None if created else getattr(instance, '_loaded_role', None)
+
+    if previous_role != instance.role:
+        if previous_role in stats.ROLE_COUNTERS:
+            stats.increment(stats.ROLE_COUNTERS[previous_role], -1)
+        if instance.role in stats.ROLE_COUNTERS:
+            stats.increment(stats.ROLE_COUNTERS[instance.role])
+
+    instance._loaded_role = instance.role
+
+
+@receiver(post_delete, sender=Profile)
+def count_deleted_profile(sender, instance, **_kwargs):
+    role = getattr(instance, '_loaded_role', instance.role)
+    if role in stats.ROLE_COUNTERS:
+        stats.increment(stats.ROLE_COUNTERS[role], -1)
+
+
+# Models whose row count is a platform counter
+ROW_COUNTERS = {
+    Course: stats.COURSES,
+    Enrollment: stats.ENROLLMENTS,
+    Certificate: stats.CERTIFICATES,
+}
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_save, sender=Certificate)
+def count_created_row(sender, instance, created, **_kwargs):
+    if created:
+        stats.increment(ROW_COUNTERS[sender])
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=Certificate)
+def count_deleted_row(sender, instance, **_kwargs):
+    stats.increment(ROW_COUNTERS[sender], -1)
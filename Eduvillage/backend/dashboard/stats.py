@@ -0,0 +1,95 @@
+"""
+Platform-wide counters for the home page and admin dashboard.
+
+Counts are stored in PlatformCounter rows and adjusted incrementally by the
+signals in dashboard/signals.py, so reading them never touches the large
+tables. `python manage.py reconcile_platform_stats` recomputes them from
+scratch if they ever drift.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PlatformCounter
+
+USERS = "users"
+STUDENTS = "students"
+TEACHERS = "teachers"
+COURSES = "courses"
+ENROLLMENTS = "enrollments"
+CERTIFICATES = "certificates"
+
+COUNTERS = (USERS, STUDENTS, TEACHERS, COURSES, ENROLLMENTS, CERTIFICATES)
+
+# Profile.role -> counter
+ROLE_COUNTERS = {
+    "student": STUDENTS,
+    "teacher": TEACHERS,
+}
+
+STATS_CACHE_KEY = "dashboard:platform-stats"
+STATS_CACHE_TIMEOUT = 5 * 60
+
+
+def increment(name, delta=1):
+    """Atomically add `delta` to one counter."""
+    updated = PlatformCounter.objects.filter(name=name).update(
+        value=F("value") + delta,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # Counter row missing (fresh database): rebuild it from the source
+        reconcile([name])
+        return
+
+    # Drop the cached totals once the new value is visible to other requests
+    transaction.on_commit(lambda: cache.delete(STATS_CACHE_KEY))
+
+
+def get_platform_stats():
+    """Return {counter name: value} for every counter, served from cache."""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = dict.fromkeys(COUNTERS, 0)
+        stats.update(PlatformCounter.objects.values_list("name", "value"))
+        cache.set(STATS_CACHE_KEY, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def compute_counts(names=COUNTERS):
+    """Count every counter straight from the base tables."""
+    from accounts.models import Profile
+    from certificates.models import Certificate
+    from courses.models import Course, Enrollment
+
+    sources = {
+        USERS: lambda: get_user_model().objects.count(),
+        STUDENTS: lambda: Profile.objects.filter(role="student").count(),
+        TEACHERS: lambda: Profile.objects.filter(role="teacher").count(),
+        COURSES: lambda: Course.objects.count(),
+        ENROLLMENTS: lambda: Enrollment.objects.count(),
+        CERTIFICATES: lambda: Certificate.objects.count(),
+    }
+    return {name: sources[name]() for name in names}
+
+
+def reconcile(names=COUNTERS):
+    """
+    Overwrite the stored counters with freshly computed values.
+    Returns {counter name: (stored value, actual value)}.
+    """
+    changes = {}
+    with transaction.atomic():
+        for name, actual in compute_counts(names).items():
+            counter, _ = PlatformCounter.objects.select_for_update().get_or_create(
+                name=name
+            )
+            changes[name] = (counter.value, actual)
+            if counter.value != actual:
+                counter.value = actual
+                counter.save(update_fields=["value", "updated_at"])
+
+    cache.delete(STATS_CACHE_KEY)
+    return changes
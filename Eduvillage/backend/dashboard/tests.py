@@ -1,3 +1,331 @@
-from django.test import TestCase
+import datetime
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from certificates.models import Certificate
+from courses import progress
+from courses.models import Course, Enrollment, Lesson, Progress
+from dashboard import rollups, stats
+from dashboard.models import DailyCourseStats, PlatformCounter, RollupWatermark
+from eduvillage.pagination import decode_cursor, encode_cursor, paginate_keyset
+
+User = get_user_model()
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+STATIC_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+class KeysetPaginationTests(TestCase):
+    """eduvillage/pagination.py"""
+
+    @classmethod
+    def setUpTestData(cls):
+        joined = timezone.now()
+        # Several users share a date_joined, so the id has to break ties
+        for n in range(7):
+            User.objects.create(
+                username=f"user{n}",
+                date_joined=joined - datetime.timedelta(days=n // 3),
+            )
+
+    def walk(self, ordering, per_page):
+        pages, cursor = [], None
+        while True:
+            page = paginate_keyset(User.objects.all(), ordering, cursor, per_page)
+            pages.append([user.username for user in page])
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for ordering in (["-date_joined", "-id"], ["date_joined", "id"], ["username", "id"]):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(ordering, per_page=3)
+                expected = list(User.objects.order_by(*ordering).values_list("username", flat=True))
+                self.assertEqual([name for page in pages for name in page], expected)
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+    def test_exact_multiple_of_page_size_has_no_empty_last_page(self):
+        User.objects.filter(username="user6").delete()
+        self.assertEqual([len(page) for page in self.walk(["-id"], per_page=3)], [3, 3])
+
+    def test_cursor_round_trip_keeps_datetime_precision(self):
+        value = timezone.now().replace(microsecond=123456)
+        self.assertEqual(decode_cursor(encode_cursor([value, 5]), 2), [value.isoformat(), 5])
+
+    def test_unusable_cursor_starts_from_the_first_page(self):
+        first = [user.id for user in paginate_keyset(User.objects.all(), ["-date_joined", "-id"], None, 3)]
+        for cursor in ("garbage", encode_cursor([1]), encode_cursor(["not-a-date", 1])):
+            with self.subTest(cursor=cursor):
+                page = paginate_keyset(User.objects.all(), ["-date_joined", "-id"], cursor, 3)
+                self.assertEqual([user.id for user in page], first)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES=STATIC_STORAGES)
+class AdminListTests(TestCase):
+    """Paginated admin user, course and enrollment lists"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", None)
+        self.client.force_login(self.admin)
+        teacher = User.objects.create_user(username="teacher")
+        self.courses = [
+            Course.objects.create(title=title, description="d", created_by=teacher)
+            for title in ("Python Basics", "Advanced Python", "Design")
+        ]
+        for n, course in enumerate([0, 0, 0, 1, 1, 2]):
+            student = User.objects.create_user(username=f"student{n}")
+            Enrollment.objects.create(
+                user=student, course=self.courses[course], full_name=f"Student {n}", phone_number="1"
+            )
+
+    def test_enrollment_count_is_maintained(self):
+        counts = lambda: [
+            Course.objects.get(pk=course.pk).enrollment_count for course in self.courses
+        ]
+        self.assertEqual(counts(), [3, 2, 1])
+        Enrollment.objects.filter(course=self.courses[0]).first().delete()
+        self.assertEqual(counts(), [2, 2, 1])
+
+    def test_users_page_through_with_cursor(self):
+        url = reverse("dashboard:admin_users")
+        seen, params = [], {"sort": "username"}
+        with mock.patch("dashboard.views.ADMIN_LIST_PAGE_SIZE", 3):
+            while True:
+                page = self.client.get(url, params).context["users"]
+                seen += [user.username for user in page]
+                if not page.has_next:
+                    break
+                params["after"] = page.next_cursor
+        self.assertEqual(seen, sorted(User.objects.values_list("username", flat=True)))
+
+    def test_top_courses_come_from_the_stored_counter(self):
+        response = self.client.get(reverse("dashboard:admin_enrollments"))
+        self.assertEqual(
+            [course.title for course in response.context["top_courses"]],
+            ["Python Basics", "Advanced Python", "Design"],
+        )
+        response = self.client.get(reverse("dashboard:admin_courses"))
+        self.assertEqual(
+            [(course.title, course.student_count) for course in response.context["popular_courses"]],
+            [("Python Basics", 3), ("Advanced Python", 2), ("Design", 1)],
+        )
+
+    def test_enrollments_filtered_by_course_id_and_title_search(self):
+        url = reverse("dashboard:admin_enrollments")
+
+        response = self.client.get(url, {"course": self.courses[1].id})
+        self.assertEqual(response.context["matching_total"], 2)
+        self.assertEqual(response.context["course_query"], "Advanced Python")
+        self.assertEqual({e.course_id for e in response.context["enrollments"]}, {self.courses[1].id})
+
+        response = self.client.get(url, {"course_q": "python"})
+        self.assertEqual(response.context["matching_total"], 5)
+        self.assertEqual(len(response.context["enrollments"]), 5)
+
+    def test_course_autocomplete(self):
+        url = reverse("dashboard:admin_course_search")
+        response = self.client.get(url, {"q": "pyth"})
+        self.assertEqual(
+            [course["title"] for course in response.json()["courses"]],
+            ["Advanced Python", "Python Basics"],
+        )
+        self.assertEqual(self.client.get(url).json(), {"courses": []})
+
+    def test_lists_are_for_superusers_only(self):
+        self.client.force_login(User.objects.get(username="teacher"))
+        for name in ("admin_users", "admin_courses", "admin_enrollments", "admin_course_search"):
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(reverse(f"dashboard:{name}")).status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES=STATIC_STORAGES)
+class AdminStatisticsTests(TestCase):
+    """Course and user statistics from correlated subqueries (dashboard/views.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", None)
+        self.client.force_login(self.admin)
+        self.teacher = User.objects.create_user(username="teacher")
+        self.teacher.profile.role = "teacher"
+        self.teacher.profile.save()
+        self.course = self.add_course("Course", students=3, lessons_done=[2, 1, 0])
+
+    def add_course(self, title, students, lessons_done):
+        course = Course.objects.create(title=title, description="d", created_by=self.teacher)
+        lessons = [
+            Lesson.objects.create(course=course, title=f"Lesson {n}", order=n)
+            for n in range(1, 3)
+        ]
+        for n in range(students):
+            student = User.objects.create_user(username=f"{title}-student{n}")
+            enrollment = Enrollment.objects.create(
+                user=student, course=course, full_name="Student", phone_number="1"
+            )
+            for lesson in lessons[:lessons_done[n]]:
+                progress.complete_lesson(
+                    Enrollment.objects.get(pk=enrollment.pk),
+                    Lesson.objects.select_related("course").get(pk=lesson.pk),
+                )
+            if lessons_done[n] == len(lessons):
+                Certificate.objects.create(enrollment=enrollment)
+        return course
+
+    def count_queries(self, name):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse(f"dashboard:{name}")).status_code, 200)
+        return len(queries)
+
+    def test_course_figures_are_not_multiplied_by_joins(self):
+        response = self.client.get(reverse("dashboard:admin_courses"))
+        course = next(course for course in response.context["courses"] if course.pk == self.course.pk)
+        # 3 students, 1 finished; 3 lessons completed in total
+        self.assertEqual(
+            (course.student_count, course.completed_students, course.completions),
+            (3, 1, 3),
+        )
+        self.assertAlmostEqual(course.completion_rate, 100 / 3)
+
+    def test_dashboard_user_figures(self):
+        response = self.client.get(reverse("dashboard:admin_dashboard"))
+        teacher = next(user for user in response.context["teachers"] if user.pk == self.teacher.pk)
+        self.assertEqual((teacher.course_count, teacher.student_count), (1, 3))
+        finished = next(user for user in response.context["students"] if user.username == "Course-student0")
+        self.assertEqual((finished.enrollment_count, finished.certificate_count), (1, 1))
+
+    def test_query_count_does_not_grow_with_the_data(self):
+        before = {name: self.count_queries(name) for name in ("admin_dashboard", "admin_courses")}
+        self.add_course("Second", students=4, lessons_done=[2, 2, 1, 0])
+        self.add_course("Third", students=2, lessons_done=[0, 0])
+        after = {name: self.count_queries(name) for name in ("admin_dashboard", "admin_courses")}
+        self.assertEqual(after, before)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DailyRollupTests(TestCase):
+    """Incremental daily rollups (dashboard/rollups.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        teacher = User.objects.create_user(username="teacher")
+        self.course = Course.objects.create(title="Course", description="d", created_by=teacher)
+        self.lesson = Lesson.objects.create(course=self.course, title="Lesson", order=1)
+        self.students = 0
+
+    def enroll(self, at):
+        self.students += 1
+        student = User.objects.create_user(username=f"student{self.students}")
+        enrollment = Enrollment.objects.create(
+            user=student, course=self.course, full_name="Student", phone_number="1"
+        )
+        Enrollment.objects.filter(pk=enrollment.pk).update(enrolled_at=at)
+        return enrollment
+
+    def totals(self, metric):
+        return sum(row[metric] for row in rollups.daily_totals(days=7))
+
+    def test_each_event_is_counted_once(self):
+        self.enroll(self.now - datetime.timedelta(hours=2))
+        self.enroll(self.now - datetime.timedelta(hours=1))
+        self.assertEqual(rollups.run(now=self.now)["enrollments"], 2)
+        self.assertEqual(rollups.run(now=self.now)["enrollments"], 0)
+        self.assertEqual(
+            RollupWatermark.objects.get(name="enrollments").value,
+            self.now - rollups.ROLLUP_LAG,
+        )
+
+        # Inside the lag of the last run, so after its watermark
+        self.enroll(self.now - datetime.timedelta(minutes=3))
+        self.assertEqual(rollups.run(now=self.now + rollups.ROLLUP_LAG)["enrollments"], 1)
+        self.assertEqual(self.totals("enrollments"), 3)
+
+    def test_events_within_the_lag_wait_for_the_next_run(self):
+        self.enroll(self.now - datetime.timedelta(minutes=1))
+        self.assertEqual(rollups.run(now=self.now)["enrollments"], 0)
+        self.assertEqual(
+            rollups.run(now=self.now + rollups.ROLLUP_LAG)["enrollments"], 1
+        )
+
+    def test_rebuild_days_picks_up_backdated_completions(self):
+        enrollment = self.enroll(self.now - datetime.timedelta(hours=1))
+        rollups.run(now=self.now)
+
+        # Synced from an offline client: older than the watermark
+        two_days_ago = self.now - datetime.timedelta(days=2)
+        Progress.objects.create(
+            enrollment=enrollment, lesson=self.lesson, completed=True, completed_at=two_days_ago
+        )
+        self.assertEqual(rollups.run(now=self.now)["lesson_completions"], 0)
+        self.assertEqual(self.totals("lesson_completions"), 0)
+
+        with mock.patch("dashboard.rollups.timezone.now", return_value=self.now):
+            call_command("rollup_daily_stats", "--rebuild-days", "3", stdout=io.StringIO())
+        self.assertEqual(self.totals("lesson_completions"), 1)
+        self.assertEqual(self.totals("enrollments"), 1)
+        self.assertEqual(
+            DailyCourseStats.objects.get(day=timezone.localdate(two_days_ago)).lesson_completions, 1
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PlatformCounterTests(TestCase):
+    """Materialized platform counters (dashboard/stats.py)"""
+
+    def setUp(self):
+        cache.clear()
+        stats.reconcile()
+        self.teacher = User.objects.create_user(username="teacher")
+        self.course = Course.objects.create(title="Course", description="d", created_by=self.teacher)
+
+    def stored(self):
+        return dict(PlatformCounter.objects.values_list("name", "value"))
+
+    def test_counters_follow_creates_deletes_and_role_changes(self):
+        student = User.objects.create_user(username="student")
+        enrollment = Enrollment.objects.create(
+            user=student, course=self.course, full_name="Student", phone_number="1"
+        )
+        Certificate.objects.create(enrollment=enrollment)
+        profile = User.objects.get(pk=self.teacher.pk).profile
+        profile.role = "teacher"
+        profile.save()
+        self.assertEqual(self.stored(), stats.compute_counts())
+
+        student.delete()
+        self.assertEqual(self.stored(), stats.compute_counts())
+        self.assertEqual(
+            self.stored(),
+            {"users": 1, "students": 0, "teachers": 1, "courses": 1, "enrollments": 0, "certificates": 0},
+        )
+
+    def test_reads_are_cached_until_a_change_commits(self):
+        stats.get_platform_stats()
+        with self.assertNumQueries(0):
+            self.assertEqual(stats.get_platform_stats()["courses"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(title="Second", description="d", created_by=self.teacher)
+        self.assertEqual(stats.get_platform_stats()["courses"], 2)
+
+    def test_reconcile_repairs_drift(self):
+        PlatformCounter.objects.filter(name=stats.COURSES).update(value=42)
+        PlatformCounter.objects.filter(name=stats.USERS).delete()
+        changes = stats.reconcile()
+        self.assertEqual(changes[stats.COURSES], (42, 1))
+        self.assertEqual(self.stored(), stats.compute_counts())
@@ -8,4 +8,5 @@ urlpatterns = [
     path('users/', views.admin_users, name='admin_users'),
     path('courses/', views.admin_courses, name='admin_courses'),
     path('enrollments/', views.admin_enrollments, name='admin_enrollments'),
+    path('courses/search/', views.admin_course_search, name='admin_course_search'),
 ]
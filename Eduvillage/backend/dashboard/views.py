@@ -1,13 +1,114 @@
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
-from courses.models import Course, Enrollment, Lesson
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from courses.models import Course, Enrollment, Progress
 from certificates.models import Certificate
 from accounts.models import Profile
+from eduvillage.pagination import paginate_keyset
+from . import rollups
+from .stats import ROLE_COUNTERS, get_platform_stats
 
 User = get_user_model()
 
+ADMIN_LIST_PAGE_SIZE = 50
+
+# ?sort= value -> (label, keyset ordering); the first entry is the default.
+# Every ordering ends in the primary key and is backed by an index.
+USER_SORTS = {
+    'newest': ('Newest first', ['-date_joined', '-id']),
+    'oldest': ('Oldest first', ['date_joined', 'id']),
+    'username': ('Username', ['username', 'id']),
+}
+COURSE_SORTS = {
+    'newest': ('Newest first', ['-id']),
+    'oldest': ('Oldest first', ['id']),
+    'title': ('Title', ['title', 'id']),
+}
+ENROLLMENT_SORTS = {
+    'newest': ('Newest first', ['-enrolled_at', '-id']),
+    'oldest': ('Oldest first', ['enrolled_at', 'id']),
+}
+
+# Most enrolled courses first, read from course_enrollment_count_idx
+MOST_ENROLLED = ['-enrollment_count', '-id']
+TOP_COURSES = 6
+COURSE_SEARCH_LIMIT = 10
+
+def _count_of(rows, outer_field):
+    """Correlated COUNT of `rows` whose `outer_field` is the outer row"""
+    return Coalesce(
+        Subquery(
+            rows.filter(**{outer_field: OuterRef('pk')})
+            .order_by()
+            .values(outer_field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def _course_stats(courses):
+    """
+    Annotate student_count (the stored Course.enrollment_count),
+    completed_students, completions (lessons completed) and
+    completion_rate (% of enrolled students who finished the course).
+    Course.lesson_count is a stored counter already.
+    """
+    return courses.annotate(
+        student_count=F('enrollment_count'),
+        completed_students=_count_of(
+            Enrollment.objects.filter(completed_at__isnull=False), 'course'
+        ),
+        completions=_count_of(
+            Progress.objects.filter(completed=True), 'enrollment__course'
+        ),
+    ).annotate(
+        completion_rate=Case(
+            When(student_count=0, then=Value(0.0)),
+            default=Value(100.0) * F('completed_students') / F('student_count'),
+            output_field=FloatField(),
+        )
+    )
+
+
+def _keyset_list(request, queryset, sorts):
+    """
+    One keyset page of `queryset` in the order picked by ?sort= (a key of
+    `sorts`, the first one by default), continuing after ?after=. Returns
+    the page and the template context for the sort menu and pager.
+    """
+    sort = request.GET.get('sort')
+    if sort not in sorts:
+        sort = next(iter(sorts))
+    cursor = request.GET.get('after')
+    page = paginate_keyset(queryset, sorts[sort][1], cursor, ADMIN_LIST_PAGE_SIZE)
+
+    # Current filters and sort without the cursor, for the pager links
+    filters = request.GET.copy()
+    filters.pop('after', None)
+
+    return page, {
+        'sort': sort,
+        'sort_options': [(key, label) for key, (label, _) in sorts.items()],
+        'cursor': cursor,
+        'filters': filters.urlencode(),
+    }
+
+
+def _chart(title, color, points):
+    """Bar chart data for the dashboard template: [(date, value)] points"""
+    return {
+        'title': title,
+        'color': color,
+        'points': points,
+        'max': max((value for _, value in points), default=0),
+    }
+
+
 @login_required
 def admin_dashboard(request):
     """Professional Admin Dashboard with comprehensive statistics"""
@@ -17,37 +118,28 @@ def admin_dashboard(request):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden("Access Denied: Only administrators can view this page.")
     
-    # Get overall statistics
-    total_users = User.objects.count()
-    total_students = Profile.objects.filter(role='student').count()
-    total_teachers = Profile.objects.filter(role='teacher').count()
-    total_courses = Course.objects.count()
-    total_enrollments = Enrollment.objects.count()
-    total_certificates = Certificate.objects.count()
-    
-    # Course statistics
-    courses = Course.objects.annotate(
-        student_count=Count('enrollments', distinct=True),
-        lesson_count=Count('lessons', distinct=True),
-        completion_rate=Count(
-            'enrollments__progress',
-            filter=Q(enrollments__progress__completed=True),
-            distinct=True
-        )
-    ).order_by('-student_count')
+    # Get overall statistics from the materialized platform counters
+    stats = get_platform_stats()
+    total_users = stats['users']
+    total_students = stats['students']
+    total_teachers = stats['teachers']
+    total_courses = stats['courses']
+    total_enrollments = stats['enrollments']
+    total_certificates = stats['certificates']
     
-    # User statistics - Fix: use 'enrollment' (default reverse relation for ForeignKey without related_name)
+    # Course statistics: the ten most enrolled courses by the stored
+    # counter, then one correlated subquery per figure for those rows only
+    courses = _course_stats(Course.objects.select_related('created_by')).order_by(*MOST_ENROLLED)
+    
+    # User statistics
     students = User.objects.filter(profile__role='student').annotate(
-        enrollment_count=Count('enrollment', distinct=True),
-        certificate_count=Count('enrollment__certificate', distinct=True)
+        enrollment_count=_count_of(Enrollment.objects.all(), 'user'),
+        certificate_count=_count_of(Certificate.objects.all(), 'enrollment__user'),
     ).order_by('-enrollment_count')[:10]
     
     teachers = User.objects.filter(profile__role='teacher').annotate(
-        course_count=Count('created_courses', distinct=True),
-        student_count=Count(
-            'created_courses__enrollments',
-            distinct=True
-        )
+        course_count=_count_of(Course.objects.all(), 'created_by'),
+        student_count=_count_of(Enrollment.objects.all(), 'course__created_by'),
     ).order_by('-course_count')
     
     # Recent enrollments
@@ -59,6 +151,18 @@ def admin_dashboard(request):
         'enrollment__course'
     ).order_by('-issued_at')[:5]
     
+    # Trend charts, read from the daily rollup only
+    daily = rollups.daily_totals(days=30)
+    weekly_certificates = rollups.weekly_totals('certificates_issued', weeks=12)
+    trend_charts = [
+        _chart('Enrollments per day', '#2563eb', [(row['day'], row['enrollments']) for row in daily]),
+        _chart('Lesson completions per day', '#10b981', [(row['day'], row['lesson_completions']) for row in daily]),
+        _chart('Certificates per week', '#8b5cf6', weekly_certificates),
+    ]
+    trend_totals = {
+        metric: sum(row[metric] for row in daily) for metric in rollups.METRICS
+    }
+
     context = {
         'total_users': total_users,
         'total_students': total_students,
@@ -71,6 +175,8 @@ def admin_dashboard(request):
         'teachers': teachers,
         'recent_enrollments': recent_enrollments,
         'recent_certificates': recent_certificates,
+        'trend_charts': trend_charts,
+        'trend_totals': trend_totals,
     }
     
     return render(request, 'admin/dashboard.html', context)
@@ -83,19 +189,26 @@ def admin_users(request):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden("Access Denied")
     
-    users = User.objects.all().select_related('profile').order_by('-date_joined')
+    users = User.objects.select_related('profile')
+    stats = get_platform_stats()
+    total = stats['users']
     
     # Filter by role if provided
     role = request.GET.get('role')
     if role:
         users = users.filter(profile__role=role)
+        total = stats[ROLE_COUNTERS[role]] if role in ROLE_COUNTERS else users.count()
     
+    page, listing = _keyset_list(request, users, USER_SORTS)
+
     context = {
-        'users': users,
-        'total_users': User.objects.count(),
-        'students': User.objects.filter(profile__role='student').count(),
-        'teachers': User.objects.filter(profile__role='teacher').count(),
+        'users': page,
+        'total_users': stats['users'],
+        'students': stats['students'],
+        'teachers': stats['teachers'],
         'current_role': role,
+        'matching_total': total,
+        **listing,
     }
     
     return render(request, 'admin/users.html', context)
@@ -108,14 +221,14 @@ def admin_courses(request):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden("Access Denied")
     
-    courses = Course.objects.annotate(
-        student_count=Count('enrollments', distinct=True),
-        lesson_count=Count('lessons', distinct=True)
-    ).order_by('-id')
+    courses = _course_stats(Course.objects.select_related('created_by'))
+    page, listing = _keyset_list(request, courses, COURSE_SORTS)
     
     context = {
-        'courses': courses,
-        'total_courses': Course.objects.count(),
+        'courses': page,
+        'popular_courses': courses.filter(enrollment_count__gt=0).order_by(*MOST_ENROLLED)[:TOP_COURSES],
+        'total_courses': get_platform_stats()['courses'],
+        **listing,
     }
     
     return render(request, 'admin/courses.html', context)
@@ -128,11 +241,60 @@ def admin_enrollments(request):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden("Access Denied")
     
-    enrollments = Enrollment.objects.select_related('user', 'course').order_by('-enrolled_at')
+    enrollments = Enrollment.objects.select_related('user', 'course__created_by')
+    total_enrollments = get_platform_stats()['enrollments']
+    total = total_enrollments
+
+    # Filter by course: ?course=<id> from the course cards, or a title
+    # search typed into the filter box; totals come from the stored counters
+    course_id = request.GET.get('course')
+    course_query = (request.GET.get('course_q') or '').strip()
+    if course_id and course_id.isdigit():
+        course = Course.objects.filter(pk=course_id).only('title', 'enrollment_count').first()
+        enrollments = enrollments.filter(course_id=course_id)
+        total = course.enrollment_count if course else 0
+        course_query = course.title if course else ''
+    elif course_query:
+        course_id = None
+        matching = Course.objects.filter(title__icontains=course_query)
+        enrollments = enrollments.filter(course__in=matching.values('id'))
+        total = matching.aggregate(total=Sum('enrollment_count'))['total'] or 0
+    else:
+        course_id = None
+
+    page, listing = _keyset_list(request, enrollments, ENROLLMENT_SORTS)
+
+    # Busiest courses, for the statistics cards
+    top_courses = Course.objects.select_related('created_by').filter(
+        enrollment_count__gt=0
+    ).order_by(*MOST_ENROLLED)[:TOP_COURSES]
     
     context = {
-        'enrollments': enrollments,
-        'total_enrollments': Enrollment.objects.count(),
+        'enrollments': page,
+        'total_enrollments': total_enrollments,
+        'matching_total': total,
+        'current_course': course_id,
+        'course_query': course_query,
+        'top_courses': top_courses,
+        **listing,
     }
     
     return render(request, 'admin/enrollments.html', context)
+
+
+@login_required
+def admin_course_search(request):
+    """Course titles matching ?q=, for the enrollment filter's autocomplete (JSON)"""
+    if not request.user.is_superuser:
+        from django.http import HttpResponseForbidden
+        return HttpResponseForbidden("Access Denied")
+
+    query = (request.GET.get('q') or '').strip()
+    courses = []
+    if query:
+        courses = list(
+            Course.objects.filter(title__icontains=query)
+            .order_by('title', 'id')
+            .values('id', 'title')[:COURSE_SEARCH_LIMIT]
+        )
+    return JsonResponse({'courses': courses})
@@ -0,0 +1,106 @@
+"""
+Keyset (cursor) pagination shared by the catalog and dashboard listings.
+
+Instead of OFFSET, each page remembers the sort key of its last row and the
+next page asks for rows strictly after it, so every page is a bounded range
+scan no matter how deep the user pages.
+"""
+import base64
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str = None
+    ordering: list = field(default_factory=list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values):
+    # DjangoJSONEncoder trims datetimes to milliseconds, which would make the
+    # cursor land between rows, so keep the full precision here.
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    payload = json.dumps(values, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """Return the decoded cursor values, or None if the cursor is unusable."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _row_value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def after_filter(ordering, values):
+    """
+    Build the "row comes after `values`" predicate for an ordering such as
+    ["category", "title", "id"] or ["-enrolled_at", "-id"].
+    """
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, values):
+        field_name = name.lstrip("-")
+        lookup = "lt" if name.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{field_name}__{lookup}": value})
+        equal &= Q(**{field_name: value})
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=20):
+    """
+    Return one KeysetPage of `queryset` sorted by `ordering`.
+
+    The last ordering field must be unique (normally "id" / "-id") so the
+    cursor identifies exactly one row.
+    """
+    values = decode_cursor(cursor, len(ordering))
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        try:
+            queryset = queryset.filter(after_filter(ordering, values))
+        except (ValueError, TypeError, ValidationError):
+            # Tampered or stale cursor: start again from the first page
+            pass
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            [_row_value(last, name.lstrip("-")) for name in ordering]
+        )
+
+    return KeysetPage(rows, next_cursor, list(ordering))
@@ -49,12 +49,19 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.roles.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'eduvillage.urls'
+# Loads request.user together with its Profile (role checks need no query).
+# ModelBackend stays listed so sessions created under it keep working.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 LOGIN_URL = 'accounts:role_login'
 LOGIN_REDIRECT_URL = 'home'
 
@@ -93,6 +100,32 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by every web worker and the management commands. Redis when
+# REDIS_URL is set (required when the app runs on more than one host);
+# otherwise a file cache, which all processes on this host share. The file
+# cache has no atomic incr()/add() and culls entries at random, so lesson
+# views (courses/lesson_views.py) are only buffered in the cache on Redis
+# and go to a database queue otherwise. Redis must not evict keys without
+# a timeout (maxmemory-policy noeviction or volatile-*).
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -137,6 +170,14 @@ STATIC_URL = '/static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
+# Ed25519 key (base64url) that signs the payload in certificate QR codes
+# so they can be verified offline; create one with
+# `python manage.py generate_signing_key`. Unset: plain verification links.
+CERTIFICATE_SIGNING_KEY = os.environ.get('CERTIFICATE_SIGNING_KEY', '')
+# Public URL of the site, printed in certificate QR codes as the base of
+# the verification link
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -1,20 +1,31 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from accounts.models import Profile
 from .models import User
 
+
+class ProfileInline(admin.StackedInline):
+    model = Profile
+    can_delete = False
+    fields = ('role',)
+
+
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     model = User
+    inlines = [ProfileInline]
 
     fieldsets = UserAdmin.fieldsets + (
         ('Role Info', {'fields': ('role',)}),
     )
 
-    add_fieldsets = UserAdmin.add_fieldsets + (
-        ('Role Info', {'fields': ('role',)}),
-    )
+    # The role is edited on the profile; User.role is a copy of it
+    readonly_fields = ('role',)
 
     list_display = ('username', 'email', 'role', 'is_staff')
 
-
-
+    def get_inline_instances(self, request, obj=None):
+        # New users get their profile from the post_save signal
+        if obj is None:
+            return []
+        return super().get_inline_instances(request, obj)
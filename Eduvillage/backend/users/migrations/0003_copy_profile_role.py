@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:29
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def copy_profile_role(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Profile = apps.get_model('accounts', 'Profile')
+
+    # User.role becomes a copy of Profile.role; users without a profile keep theirs
+    User.objects.filter(profile__isnull=False).update(role=Subquery(
+        Profile.objects.filter(user=OuterRef('pk')).values('role')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_user_date_joined_idx'),
+        ('accounts', '0002_alter_profile_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_profile_role, migrations.RunPython.noop),
+    ]
@@ -16,6 +16,12 @@ class User(AbstractUser):
         default='student'
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Admin user list, newest / oldest first
+            models.Index(fields=["date_joined", "id"], name="user_date_joined_idx"),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -1,3 +1,78 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY, authenticate, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.backends import ProfileModelBackend
+from accounts.roles import RoleMiddleware
+
+User = get_user_model()
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+STATIC_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES=STATIC_STORAGES)
+class RoleResolutionTests(TestCase):
+    """ProfileModelBackend and RoleMiddleware (accounts/roles.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teacher", password="pw")
+        self.teacher.profile.role = "teacher"
+        self.teacher.profile.save()
+
+    def resolve(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return RoleMiddleware(lambda request: request)(request)
+
+    def test_role_comes_with_the_user_query(self):
+        user = ProfileModelBackend().get_user(self.teacher.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolve(user).role, "teacher")
+        self.assertFalse(self.resolve(AnonymousUser()).role)
+
+    def test_role_change_is_seen_on_the_next_request(self):
+        profile = User.objects.get(pk=self.teacher.pk).profile
+        profile.role = "student"
+        profile.save()
+        self.assertEqual(User.objects.get(pk=self.teacher.pk).role, "student")
+
+        user = ProfileModelBackend().get_user(self.teacher.pk)
+        self.assertEqual(self.resolve(user).role, "student")
+
+    def test_login_with_matching_role(self):
+        response = self.client.post(
+            reverse("accounts:role_login"),
+            {"username": "teacher", "password": "pw", "role": "teacher"},
+        )
+        self.assertRedirects(response, reverse("courses:teacher_dashboard"), fetch_redirect_response=False)
+        self.assertEqual(
+            self.client.session[BACKEND_SESSION_KEY], "accounts.backends.ProfileModelBackend"
+        )
+
+    def test_login_with_other_role_is_refused(self):
+        self.client.post(
+            reverse("accounts:role_login"),
+            {"username": "teacher", "password": "pw", "role": "student"},
+        )
+        self.assertNotIn(SESSION_KEY, self.client.session)
+
+    def test_wrong_password_is_checked_once(self):
+        # ModelBackend comes second only for existing sessions
+        with mock.patch.object(ModelBackend, "authenticate", autospec=True, return_value=None) as check:
+            self.assertIsNone(authenticate(username="teacher", password="wrong"))
+        self.assertEqual(check.call_count, 1)
+
+    def test_session_from_plain_model_backend_still_works(self):
+        self.client.force_login(self.teacher, backend="django.contrib.auth.backends.ModelBackend")
+        response = self.client.get(reverse("courses:teacher_dashboard"))
+        self.assertEqual(response.status_code, 200)